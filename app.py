@@ -5,66 +5,39 @@ import streamlit.web.cli as stcli
 from streamlit import runtime
 
 import src.pages
-import src.pages.home
-import src.pages.definitions
-import src.pages.academic_department_credits
-import src.pages.academic_department_enrollment
-import src.pages.academic_program_enrollment
-import src.pages.academic_program_enrollment_gender
-import src.pages.academic_program_enrollment_race_ethnicity
-import src.pages.academic_program_graduates
-import src.pages.admissions_current_deposits
-import src.pages.admissions_historic_data_by_stage
-import src.pages.cacs_gpa_trend_analysis
-import src.pages.college_enrollment_total
-import src.pages.college_enrollment_historic
-import src.pages.college_enrollment_attrition
-# import src.pages.college_enrollment_retention
-import src.pages.college_enrollment_attend_status
-import src.pages.college_enrollment_class_level
-import src.pages.college_enrollment_degree
-import src.pages.college_enrollment_gender
-import src.pages.college_enrollment_race_ethnicity
-import src.pages.faculty_teaching
-import src.pages.program_review_course_enrollment
-import src.pages.registrar_class_times
-import src.pages.registrar_course_completion_rates
-import src.pages.registrar_course_scheduling
-import src.pages.registrar_gpa_distribution
-import src.pages.registrar_grade_distribution
-import src.pages.registrar_section_sizes
-import src.pages.about
+import src.profiling
+import src.warmup
 
 PAGES = {
-    "Home": src.pages.home,
-    "Definitions": src.pages.definitions, 
-    "Academic Department - Credits": src.pages.academic_department_credits, 
-    "Academic Department - Enrollment": src.pages.academic_department_enrollment, 
-    "Academic Program - Enrollment": src.pages.academic_program_enrollment, 
-    "Academic Program - Gender": src.pages.academic_program_enrollment_gender,
-    "Academic Program - Race/Ethnicity": src.pages.academic_program_enrollment_race_ethnicity,
-    "Academic Program - Graduates": src.pages.academic_program_graduates,
-    "Admissions - Current Deposits": src.pages.admissions_current_deposits,
-    "Admissions - Historic Data By Stage": src.pages.admissions_historic_data_by_stage,
-    "CACS - GPA Trend Analysis": src.pages.cacs_gpa_trend_analysis,
-    "College Enrollment - Total": src.pages.college_enrollment_total,
-    "College Enrollment - Historic": src.pages.college_enrollment_historic,
-    "College Enrollment - Attrition": src.pages.college_enrollment_attrition,
-    # "College Enrollment - Retention": src.pages.college_enrollment_retention,
-    "College Enrollment - Attend Status": src.pages.college_enrollment_attend_status,
-    "College Enrollment - Class Level": src.pages.college_enrollment_class_level,
-    "College Enrollment - Degree": src.pages.college_enrollment_degree,
-    "College Enrollment - Gender": src.pages.college_enrollment_gender,
-    "College Enrollment - Race/Ethnicity": src.pages.college_enrollment_race_ethnicity,
-    "Faculty - Teaching": src.pages.faculty_teaching, 
-    "Program Review - Course Enrollment": src.pages.program_review_course_enrollment,
-    "Registrar - Class Times": src.pages.registrar_class_times,
-    "Registrar - Course Completion Rates": src.pages.registrar_course_completion_rates,
-    "Registrar - Course Scheduling": src.pages.registrar_course_scheduling,
-    "Registrar - GPA Distribution": src.pages.registrar_gpa_distribution,
-    "Registrar - Grade Distribution": src.pages.registrar_grade_distribution,
-    "Registrar - Section Sizes": src.pages.registrar_section_sizes,
-    "About": src.pages.about,
+    "Home": "home",
+    "Definitions": "definitions", 
+    "Academic Department - Credits": "academic_department_credits", 
+    "Academic Department - Enrollment": "academic_department_enrollment", 
+    "Academic Program - Enrollment": "academic_program_enrollment", 
+    "Academic Program - Gender": "academic_program_enrollment_gender",
+    "Academic Program - Race/Ethnicity": "academic_program_enrollment_race_ethnicity",
+    "Academic Program - Graduates": "academic_program_graduates",
+    "Admissions - Current Deposits": "admissions_current_deposits",
+    "Admissions - Historic Data By Stage": "admissions_historic_data_by_stage",
+    "CACS - GPA Trend Analysis": "cacs_gpa_trend_analysis",
+    "College Enrollment - Total": "college_enrollment_total",
+    "College Enrollment - Historic": "college_enrollment_historic",
+    "College Enrollment - Attrition": "college_enrollment_attrition",
+    # "College Enrollment - Retention": "college_enrollment_retention",
+    "College Enrollment - Attend Status": "college_enrollment_attend_status",
+    "College Enrollment - Class Level": "college_enrollment_class_level",
+    "College Enrollment - Degree": "college_enrollment_degree",
+    "College Enrollment - Gender": "college_enrollment_gender",
+    "College Enrollment - Race/Ethnicity": "college_enrollment_race_ethnicity",
+    "Faculty - Teaching": "faculty_teaching", 
+    "Program Review - Course Enrollment": "program_review_course_enrollment",
+    "Registrar - Class Times": "registrar_class_times",
+    "Registrar - Course Completion Rates": "registrar_course_completion_rates",
+    "Registrar - Course Scheduling": "registrar_course_scheduling",
+    "Registrar - GPA Distribution": "registrar_gpa_distribution",
+    "Registrar - Grade Distribution": "registrar_grade_distribution",
+    "Registrar - Section Sizes": "registrar_section_sizes",
+    "About": "about",
 }
 
 
@@ -83,15 +56,23 @@ def main():
         link="https://www.paulsmiths.edu"
     )
 
+    # times pc.select() calls for the profiling panel and log
+    src.profiling.install()
+
+    # pre-builds the heaviest page caches in the background, once per process
+    src.warmup.start()
+
     st.sidebar.title("IR Dashboard")
     st.sidebar.markdown("---")
     st.sidebar.title("Navigation")
     selection = st.sidebar.radio("Go to", list(PAGES.keys()), index=0)
     
-    page = PAGES[selection]
     with st.spinner(f"Selecting {selection} ..."):
+        page = src.pages.load_page(PAGES[selection])
         src.pages.write_page(page)
     
+    src.profiling.sidebar_panel()
+
     st.sidebar.markdown("---")
     st.sidebar.title("Info")
     st.sidebar.write(
@@ -0,0 +1,10 @@
+"""Benchmarks of the dashboard pages on synthetic PowerCampus data
+
+synthetic - deterministic PowerCampus tables, census file and admissions data
+standin - local stand-ins for the powercampus and local_db modules
+run - runs every page headlessly and reports time and peak memory per page
+
+e.g. from the repository root:
+
+    python -m bench.run --students 10000 --years 8 --output bench_10k.json
+"""
@@ -0,0 +1,212 @@
+"""Benchmark of every dashboard page on synthetic PowerCampus data
+
+Generates the synthetic data, points the powercampus/local_db stand-ins and
+the on-disk caches at a scratch directory, and renders each page headlessly
+(Streamlit "bare" mode, widgets at their defaults). For each page it reports
+the time of a cold render (empty caches), of a warm render right after it,
+the peak Python memory of a cold render and the SQL statements it ran.
+
+    python -m bench.run --students 10000 --years 8 --output bench_10k.json
+    python -m bench.run --students 10000 --years 8 --baseline bench_10k.json
+
+With --baseline, the run fails (exit status 1) when a page errors or is more
+than --tolerance slower or bigger than in the baseline results.
+"""
+import argparse
+import json
+import logging
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+import tracemalloc
+from pathlib import Path
+import pandas as pd
+
+from bench import standin, synthetic
+
+# pages that read files the synthetic data does not include
+SKIPPED_PAGES = {
+    'college_enrollment_historic': "reads RUNENROLL.xlsx",
+    'college_enrollment_attrition': "reads net_attrition.csv",
+}
+
+# differences below these are noise, whatever the tolerance
+MIN_SECONDS = 0.05
+MIN_PEAK_MB = 5.0
+
+
+def prepare(workdir, students, years, seed) -> dict:
+    """
+    returns the paths of the synthetic database, census file and admissions
+    file written to workdir
+    """
+    started = time.perf_counter()
+    tables = synthetic.generate(students=students, years=years, seed=seed)
+    paths = {
+        'database': workdir / "powercampus.sqlite",
+        'census': workdir / "census_db.arr",
+        'admissions': workdir / "stage_data",
+    }
+    synthetic.write_database(tables, paths['database'])
+    synthetic.write_census(tables['census'], paths['census'])
+    try:
+        synthetic.write_admissions(tables['admissions'], paths['admissions'])
+    except ImportError:
+        # PyTables is needed for HDF files
+        paths['admissions'] = None
+    rows = sum(len(df) for df in tables.values())
+    print(f"synthetic data: {students} students, {years} years, {rows:,} rows "
+          f"in {time.perf_counter() - started:.1f}s")
+    return paths
+
+
+def _point_caches_at(cache_root, paths):
+    import src.census
+    import src.course_facts
+    import src.partitions
+    import src.profiling
+    import src.query_cache
+
+    src.profiling.LOG_ENABLED = False
+    src.query_cache.CACHE_ROOT = cache_root
+    src.query_cache.CACHE_DIR = cache_root / "query"
+    src.partitions.PARTITION_DIR = cache_root / "partitions"
+    src.course_facts.FACT_DIR = cache_root / "facts"
+    src.census.CUBE_DIR = cache_root / "census"
+    src.census.CENSUS_DB_FILE = paths['census']
+
+
+def _clear_caches(cache_root):
+    import streamlit as st
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    shutil.rmtree(cache_root, ignore_errors=True)
+
+
+def _render(page):
+    import src.pages
+    started = time.perf_counter()
+    before = standin.statements()
+    src.pages.write_page(page)
+    return time.perf_counter() - started, standin.statements() - before
+
+
+def bench_page(name, cache_root, paths, memory=True) -> dict:
+    """
+    returns the benchmark results of one page: cold and warm render seconds,
+    peak MB of a cold render and SQL statements of a cold render
+    """
+    import src.pages
+
+    result = {'page': name, 'cold_s': None, 'warm_s': None, 'peak_mb': None,
+        'statements': None, 'status': 'ok'}
+    if name in SKIPPED_PAGES:
+        result['status'] = f"skipped: {SKIPPED_PAGES[name]}"
+        return result
+    if name == 'admissions_historic_data_by_stage' and paths['admissions'] is None:
+        result['status'] = "skipped: PyTables is not installed"
+        return result
+    try:
+        page = src.pages.load_page(name)
+        if name == 'admissions_historic_data_by_stage':
+            page.DATA_FILE = paths['admissions']
+
+        _clear_caches(cache_root)
+        result['cold_s'], result['statements'] = _render(page)
+        result['warm_s'], _ = _render(page)
+
+        if memory:
+            _clear_caches(cache_root)
+            tracemalloc.start()
+            try:
+                _render(page)
+                result['peak_mb'] = tracemalloc.get_traced_memory()[1] / 1024**2
+            finally:
+                tracemalloc.stop()
+    except Exception as e:
+        traceback.print_exc()
+        result['status'] = f"error: {type(e).__name__}: {e}"
+    return result
+
+
+def regressions(results, baseline, tolerance) -> list:
+    """
+    returns a message for each page that errors, or is more than tolerance
+    (a fraction) slower or bigger than in baseline
+    """
+    previous = {r['page']: r for r in baseline}
+    messages = []
+    for r in results:
+        if r['status'].startswith('error'):
+            messages.append(f"{r['page']}: {r['status']}")
+            continue
+        old = previous.get(r['page'])
+        if old is None:
+            continue
+        for field, floor in [('cold_s', MIN_SECONDS), ('warm_s', MIN_SECONDS), ('peak_mb', MIN_PEAK_MB)]:
+            if r[field] is None or old.get(field) is None:
+                continue
+            if r[field] > old[field] * (1 + tolerance) and (r[field] - old[field]) > floor:
+                messages.append(f"{r['page']}: {field} {old[field]:.2f} -> {r[field]:.2f}")
+    return messages
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=10_000, help="students enrolled over the years")
+    parser.add_argument("--years", type=int, default=8, help="years of enrollment, ending this year")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the synthetic data")
+    parser.add_argument("--pages", help="comma-separated page modules, all pages if omitted")
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory render")
+    parser.add_argument("--workdir", type=Path, help="scratch directory, a temporary one if omitted")
+    parser.add_argument("--output", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--baseline", type=Path, help="compare with the results in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, e.g. 0.25 for 25%%")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix="psc-bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    paths = prepare(workdir, args.students, args.years, args.seed)
+
+    # must come before anything from src (or app) is imported
+    standin.install(paths['database'])
+    from app import PAGES
+    import streamlit.logger
+    # bare mode warns on every widget
+    streamlit.logger.set_log_level(logging.ERROR)
+
+    cache_root = workdir / "cache"
+    _point_caches_at(cache_root, paths)
+
+    names = args.pages.split(",") if args.pages else list(PAGES.values())
+    results = []
+    for name in names:
+        result = bench_page(name, cache_root, paths, memory=not args.no_memory)
+        results.append(result)
+        print(f"{name}: {result['status']}", file=sys.stderr)
+
+    df = pd.DataFrame(results).set_index('page').astype({'statements': 'Int64'})
+    with pd.option_context('display.max_rows', None, 'display.max_columns', None, 'display.width', 200,
+            'display.max_colwidth', 60, 'display.float_format', '{:.2f}'.format):
+        print(df)
+
+    if args.output:
+        meta = {'students': args.students, 'years': args.years, 'seed': args.seed,
+            'time': pd.Timestamp.now().isoformat(timespec='seconds')}
+        args.output.write_text(json.dumps({'meta': meta, 'pages': results}, indent=2))
+
+    failed = [f"{r['page']}: {r['status']}" for r in results if r['status'].startswith('error')]
+    if args.baseline:
+        failed = regressions(results, json.loads(args.baseline.read_text())['pages'], args.tolerance)
+    for message in failed:
+        print(f"FAILED {message}")
+
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
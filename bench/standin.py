@@ -0,0 +1,152 @@
+"""Local stand-ins for the powercampus and local_db modules
+
+install() registers modules named powercampus and local_db that read a SQLite
+database written by bench.synthetic.write_database(), so the pages and src
+modules run unchanged without SQL Server. It must run before anything from
+src is imported.
+
+The tables are reachable both as [TABLE] and dbo.[TABLE], and N'...' string
+literals are read as '...', so the SQL the pages send runs as written.
+"""
+import datetime as dt
+import re
+import sqlite3
+import sys
+import threading
+import types
+import pandas as pd
+
+# N'...' literals are SQL Server only
+_NATIONAL_LITERAL = re.compile(r"(?<![\w'])N'")
+
+# earliest year the pages' year selectors default to
+START_ACADEMIC_YEAR = '2012'
+
+_database = None
+_statements = 0
+_lock = threading.Lock()
+
+
+def _timestamp(value):
+    return dt.datetime.fromisoformat(value.decode('utf-8'))
+
+
+# datetime columns come back as datetimes, as they do from SQL Server
+sqlite3.register_converter("TIMESTAMP", _timestamp)
+
+
+class _Cursor(sqlite3.Cursor):
+    def execute(self, sql, *args):
+        global _statements
+        with _lock:
+            _statements += 1
+        return super().execute(_NATIONAL_LITERAL.sub("'", sql), *args)
+
+
+class _Connection(sqlite3.Connection):
+    def cursor(self, factory=_Cursor):
+        return super().cursor(factory)
+
+
+def connection():
+    """
+    returns a new read-only connection to the synthetic database, like
+    local_db.connection()
+    """
+    if _database is None:
+        raise RuntimeError("bench.standin.install() has not been called")
+    uri = f"file:{_database.as_posix()}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, factory=_Connection,
+        detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+    conn.execute(f"ATTACH DATABASE '{uri}' AS dbo")
+    return conn
+
+
+def statements() -> int:
+    """
+    returns the number of SQL statements run on the synthetic database so far
+    """
+    return _statements
+
+
+def select(table, fields=None, where=None, distinct=False) -> pd.DataFrame:
+    """
+    pc.select() on the synthetic database
+    """
+    field_list = ", ".join(f"[{f}]" for f in fields) if fields else "*"
+    sql = f"SELECT {'DISTINCT ' if distinct else ''}{field_list} FROM dbo.[{table}]"
+    if where:
+        sql += f" WHERE {where}"
+    conn = connection()
+    try:
+        return pd.read_sql_query(sql, conn)
+    finally:
+        conn.close()
+
+
+def add_col_yearterm(df):
+    """
+    adds a 'yearterm' column, e.g. '2024.Fall', to df
+    """
+    df['yearterm'] = df['ACADEMIC_YEAR'].astype(str) + '.' + df['ACADEMIC_TERM'].str.title()
+    return df
+
+
+def add_col_yearterm_sort(df):
+    """
+    adds a 'yearterm_sort' column, e.g. '202403' for 2024 FALL, to df
+    """
+    suffix = df['ACADEMIC_TERM'].str.upper().map({'SPRING': '01', 'SUMMER': '02', 'FALL': '03'}).fillna('00')
+    df['yearterm_sort'] = df['ACADEMIC_YEAR'].astype(str) + suffix
+    return df
+
+
+def current_yearterm() -> pd.DataFrame:
+    """
+    returns the term that started most recently in the synthetic calendar,
+    with columns term, year, yearterm and yearterm_sort
+    """
+    calendar = select("ACADEMICCALENDAR",
+        fields=['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'START_DATE'],
+        where=f"START_DATE<='{dt.date.today()}' AND ACADEMIC_TERM IN ('FALL', 'SPRING', 'SUMMER')",
+        )
+    current = calendar.sort_values('START_DATE').iloc[[-1]]
+    df = pd.DataFrame({
+        'term': current['ACADEMIC_TERM'].to_numpy(),
+        'year': current['ACADEMIC_YEAR'].to_numpy(),
+    })
+    df['yearterm'] = df['year'] + '.' + df['term'].str.title()
+    df['yearterm_sort'] = add_col_yearterm_sort(current.copy())['yearterm_sort'].to_numpy()
+    return df
+
+
+def install(database):
+    """
+    registers the powercampus and local_db stand-ins for the SQLite database
+    file database
+
+    Arguments:
+        database - pathlib.Path of a database from bench.synthetic.write_database()
+    """
+    global _database
+    for name in ['powercampus', 'local_db']:
+        module = sys.modules.get(name)
+        if module is not None and not getattr(module, 'standin', False):
+            raise RuntimeError(f"{name} was imported before bench.standin.install()")
+    _database = database.resolve()
+
+    first_year = select("ACADEMIC", fields=['ACADEMIC_YEAR'], distinct=True)['ACADEMIC_YEAR'].min()
+
+    pc = types.ModuleType('powercampus', "PowerCampus stand-in on the synthetic database")
+    pc.standin = True
+    pc.START_ACADEMIC_YEAR = min(first_year, START_ACADEMIC_YEAR)
+    pc.select = select
+    pc.add_col_yearterm = add_col_yearterm
+    pc.add_col_yearterm_sort = add_col_yearterm_sort
+    pc.current_yearterm = current_yearterm
+    sys.modules['powercampus'] = pc
+
+    local_db = types.ModuleType('local_db', "local_db stand-in on the synthetic database")
+    local_db.standin = True
+    local_db.connection = connection
+    sys.modules['local_db'] = local_db
@@ -0,0 +1,630 @@
+"""Deterministic synthetic PowerCampus data
+
+generate() builds the tables the pages read, shaped like PowerCampus, for a
+number of students enrolled over a number of years, along with the census
+frame and the weekly admissions frame. The same arguments always give the
+same data, so benchmark runs on different commits are comparable.
+"""
+import datetime as dt
+import sqlite3
+import warnings
+import numpy as np
+import pandas as pd
+
+# (start month, day), (end month, day) of each term
+TERM_DATES = {
+    'SPRING': ((1, 15), (5, 10)),
+    'SUMMER': ((5, 20), (8, 10)),
+    'FALL': ((8, 28), (12, 15)),
+}
+
+TERM_SORT = {'SPRING': '01', 'SUMMER': '02', 'FALL': '03'}
+
+# (CURRICULUM, PROGRAM, DEGREE, COLLEGE, DEPARTMENT, FORMAL_TITLE, share of students)
+CURRICULA = [
+    ('FOR', 'U', 'BS', 'FOR', 'FOR', 'Forestry', 8),
+    ('FTEC', 'U', 'AAS', 'FOR', 'FOR', 'Forest Technology', 6),
+    ('ENVS', 'U', 'BS', 'SCI', 'NRS', 'Environmental Studies', 7),
+    ('FWS', 'U', 'BS', 'SCI', 'NRS', 'Fisheries and Wildlife Sciences', 7),
+    ('BIO', 'U', 'BS', 'SCI', 'BIO', 'Biology', 5),
+    ('HOSP', 'U', 'BS', 'HOS', 'HOS', 'Hospitality Management', 5),
+    ('CUL', 'U', 'AOS', 'HOS', 'HOS', 'Culinary Arts', 5),
+    ('BUS', 'U', 'BS', 'BUS', 'BUS', 'Business', 5),
+    ('REC', 'U', 'BS', 'BUS', 'REC', 'Recreation and Ecotourism', 4),
+    ('LA', 'U', 'AA', 'LIB', 'LIB', 'Liberal Arts', 3),
+    ('PSY', 'U', 'BA', 'LIB', 'PSY', 'Psychology', 3),
+    ('NRC', 'U', 'CERTIF', 'SCI', 'NRS', 'Natural Resources Conservation', 1),
+    ('NRSM', 'G', 'MS', 'SCI', 'NRS', 'Natural Resources and Sustainability', 2),
+    ('UNDM', 'U', 'BS', 'LIB', 'LIB', 'Undeclared', 4),
+]
+
+COLLEGES = {
+    'FOR': 'Forestry',
+    'SCI': 'Natural Resources and Sciences',
+    'HOS': 'Hospitality and Culinary Arts',
+    'BUS': 'Business',
+    'LIB': 'Liberal Arts',
+}
+
+# course subjects taught by each department
+SUBJECTS = {
+    'FOR': ['FOR', 'SUR'], 'NRS': ['NRS', 'ENV'], 'BIO': ['BIO', 'CHM'],
+    'HOS': ['HOS', 'CUL'], 'BUS': ['BUS', 'ACC'], 'REC': ['REC'],
+    'LIB': ['ENG', 'HIS', 'MTH'], 'PSY': ['PSY'],
+}
+
+ETHNICITIES = ['WHITE', 'HISP', 'BLACK', 'ASIAN', 'AMIND', 'PACIF', 'MULTI', 'NRA', 'U']
+ETHNICITY_SHARES = [0.70, 0.08, 0.06, 0.02, 0.02, 0.01, 0.04, 0.02, 0.05]
+
+GRADES = ['A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'C-', 'D', 'F', 'W', 'I']
+GRADE_SHARES = [0.20, 0.10, 0.10, 0.14, 0.09, 0.07, 0.08, 0.04, 0.05, 0.05, 0.07, 0.01]
+
+# (EVENT_SUB_TYPE, share of sections, credits, DAY patterns, minutes per meeting)
+SECTION_TYPES = [
+    ('LEC', 0.62, 3, ['MWF', 'TR', 'MW'], [50, 75, 75]),
+    ('LAB', 0.18, 1, ['M', 'T', 'W', 'R'], [170, 170, 170, 170]),
+    ('COMB', 0.06, 4, ['TR'], [110]),
+    ('HYBD', 0.05, 3, ['T', 'R'], [75, 75]),
+    ('PRAC', 0.03, 3, ['F'], [170]),
+    ('ONLN', 0.06, 3, ['ONLN'], [0]),
+]
+
+SESSIONS = ['MAIN', 'EXT']
+SESSION_SHARES = [0.92, 0.08]
+
+BUILDINGS = ['FREER', 'PSC', 'LIB', 'SCI', 'HUT']
+ROOMS_PER_BUILDING = 24
+
+DAY_CODES = ['M', 'T', 'W', 'R', 'F', 'S', 'U', 'MW', 'MWF', 'TR', 'MTWRF', 'ONLN', 'TBD', 'CANC']
+DAY_COLUMNS = {
+    'DAY_SUNDAY': 'U', 'DAY_MONDAY': 'M', 'DAY_TUESDAY': 'T', 'DAY_WEDNESDAY': 'W',
+    'DAY_THURSDAY': 'R', 'DAY_FRIDAY': 'F', 'DAY_SATURDAY': 'S',
+}
+
+ADMISSIONS_STAGES = {'Applied': 4.0, 'Accepted': 3.0, 'Deposited': 1.0}
+ADMISSIONS_WEEKS = 54
+
+# a student takes this many sections a term, on average
+SECTIONS_PER_STUDENT = 4.5
+MEAN_SECTION_SIZE = 18
+SUMMER_SHARE = 0.10
+
+# the calendar starts here whatever years of enrollment are generated, since
+# the pages' year selectors default to years as early as 2010
+CALENDAR_START_YEAR = 2000
+
+
+def terms(start_year:int, end_year:int) -> pd.DataFrame:
+    """
+    returns one row per SPRING/SUMMER/FALL term from start_year to end_year,
+    in order, with its START_DATE and END_DATE
+    """
+    rows = []
+    for year in range(start_year, end_year + 1):
+        for term, ((sm, sd), (em, ed)) in TERM_DATES.items():
+            rows.append([str(year), term, pd.Timestamp(year, sm, sd), pd.Timestamp(year, em, ed)])
+    df = pd.DataFrame(rows, columns=['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'START_DATE', 'END_DATE'])
+    df['yearterm'] = df['ACADEMIC_YEAR'] + '.' + df['ACADEMIC_TERM'].str.title()
+    df['yearterm_sort'] = df['ACADEMIC_YEAR'] + df['ACADEMIC_TERM'].map(TERM_SORT)
+    return df
+
+
+def _people_ids(start, count):
+    return pd.Series(np.arange(start, start + count)).map('P{:09d}'.format).to_numpy(dtype=object)
+
+
+def _pick(rng, values, shares, size):
+    shares = np.asarray(shares, dtype=float)
+    return np.asarray(values, dtype=object)[rng.choice(len(values), size=size, p=shares / shares.sum())]
+
+
+def _students(rng, count, main_terms, last_entry):
+    """
+    returns one row per student: entry term (index into main_terms), number of
+    FALL/SPRING terms enrolled, curriculum and demographics
+    """
+    curricula = pd.DataFrame(CURRICULA,
+        columns=['CURRICULUM', 'PROGRAM', 'DEGREE', 'COLLEGE', 'DEPARTMENT', 'FORMAL_TITLE', 'share'])
+    choice = rng.choice(len(curricula), size=count, p=curricula['share'] / curricula['share'].sum())
+    students = curricula.iloc[choice].drop(columns='share').reset_index(drop=True)
+    students['PEOPLE_CODE_ID'] = _people_ids(1, count)
+
+    # most students start in a fall term
+    fall_terms = np.flatnonzero(main_terms['ACADEMIC_TERM'].to_numpy() == 'FALL')
+    fall_terms = fall_terms[fall_terms <= last_entry]
+    entry = rng.choice(fall_terms, size=count)
+    spring_start = rng.random(count) < 0.15
+    entry = np.where(spring_start, np.maximum(entry - 1, 0), entry)
+    # some students were already enrolled when the data starts
+    entry = np.where(rng.random(count) < 0.1, 0, entry)
+    students['entry'] = np.minimum(entry, last_entry)
+
+    expected = np.where(students['DEGREE'].isin(['AAS', 'AOS', 'AA']), 4,
+                    np.where(students['PROGRAM'] == 'G', 4,
+                        np.where(students['DEGREE'] == 'CERTIF', 2, 8)))
+    completes = rng.random(count) < 0.6
+    students['terms'] = np.where(completes, expected, rng.integers(1, expected + 1))
+    students['completes'] = completes
+
+    students['gender'] = _pick(rng, ['F', 'M', 'N'], [0.45, 0.53, 0.02], count)
+    students['ethnicity'] = _pick(rng, ETHNICITIES, ETHNICITY_SHARES, count)
+    students['BIRTH_DATE'] = (
+        main_terms['START_DATE'].to_numpy()[students['entry']]
+        - pd.to_timedelta(rng.integers(17 * 365, 30 * 365, count), unit='D')
+    )
+    return students
+
+
+def _student_terms(rng, students, main_terms, all_terms, last_term):
+    """
+    returns one row per student and term enrolled: the FALL/SPRING terms from
+    the student's entry term on, and some SUMMER terms
+    """
+    index = np.repeat(np.arange(len(students)), students['terms'])
+    k = np.arange(len(index)) - np.repeat(np.cumsum(students['terms']) - students['terms'], students['terms'])
+    term = students['entry'].to_numpy()[index] + k
+    keep = term <= last_term
+    st = pd.DataFrame({'student': index[keep], 'k': k[keep], 'main_term': term[keep]})
+    st['term_index'] = all_terms.index.get_indexer(
+        pd.MultiIndex.from_arrays([main_terms['ACADEMIC_YEAR'].to_numpy()[st['main_term']],
+                                   main_terms['ACADEMIC_TERM'].to_numpy()[st['main_term']]]))
+
+    # some students also take summer courses after a spring term
+    spring = (all_terms['ACADEMIC_TERM'].to_numpy()[st['term_index']] == 'SPRING')
+    summer = st.loc[spring & (rng.random(len(st)) < SUMMER_SHARE)].copy()
+    summer['term_index'] += 1
+    summer = summer.loc[summer['term_index'] < len(all_terms)]
+
+    st = pd.concat([st, summer], ignore_index=True).sort_values(['student', 'term_index'], kind='stable')
+    last = st.groupby('student')['k'].transform('max')
+    st['is_last'] = (st['k'] == last) & (all_terms['ACADEMIC_TERM'].to_numpy()[st['term_index']] != 'SUMMER')
+    return st.reset_index(drop=True)
+
+
+def _courses(rng, count):
+    """
+    returns the course catalog: subject, number, department and names
+    """
+    departments = sorted(SUBJECTS)
+    rows = []
+    seen = set()
+    while len(rows) < count:
+        department = departments[rng.integers(len(departments))]
+        subject = SUBJECTS[department][rng.integers(len(SUBJECTS[department]))]
+        number = int(rng.integers(100, 500))
+        if (subject, number) in seen:
+            continue
+        seen.add((subject, number))
+        rows.append([f"{subject} {number}", department, f"{subject} Topics {number}"])
+    courses = pd.DataFrame(rows, columns=['EVENT_ID', 'DEPARTMENT', 'EVENT_LONG_NAME'])
+    courses['EVENT_MED_NAME'] = courses['EVENT_LONG_NAME'].str.slice(0, 20)
+    dept = pd.DataFrame(CURRICULA,
+        columns=['CURRICULUM', 'PROGRAM', 'DEGREE', 'COLLEGE', 'DEPARTMENT', 'FORMAL_TITLE', 'share'])
+    dept = dept.drop_duplicates('DEPARTMENT').loc[:, ['DEPARTMENT', 'COLLEGE', 'CURRICULUM']]
+    courses = courses.merge(dept, how='left', on='DEPARTMENT')
+    courses['PROGRAM'] = np.where(courses['EVENT_ID'].str.slice(-3).astype(int) >= 400, 'G', 'U')
+    # PowerCampus pads some EVENT_IDs with trailing spaces
+    padded = rng.random(len(courses)) < 0.05
+    courses.loc[padded, 'EVENT_ID'] = courses.loc[padded, 'EVENT_ID'] + '   '
+    return courses
+
+
+def _sections(rng, courses, all_terms, enrolled):
+    """
+    returns one row per section offered in each term, sized to the number of
+    students enrolled in the term
+    """
+    counts = np.ceil(enrolled * SECTIONS_PER_STUDENT / MEAN_SECTION_SIZE)
+    counts = np.where(enrolled > 0, np.maximum(counts, 4), 0).astype(int)
+    term_index = np.repeat(np.arange(len(all_terms)), counts)
+    sections = pd.DataFrame({'term_index': term_index})
+    sections['course'] = rng.integers(0, len(courses), len(sections))
+    types = pd.DataFrame(SECTION_TYPES, columns=['EVENT_SUB_TYPE', 'share', 'CREDITS', 'days', 'minutes'])
+    type_index = rng.choice(len(types), size=len(sections), p=types['share'] / types['share'].sum())
+    sections['type'] = type_index
+    sections['EVENT_SUB_TYPE'] = types['EVENT_SUB_TYPE'].to_numpy()[type_index]
+    sections['CREDITS'] = types['CREDITS'].to_numpy()[type_index].astype(float)
+    sections['ACADEMIC_SESSION'] = _pick(rng, SESSIONS, SESSION_SHARES, len(sections))
+
+    number = sections.groupby(['term_index', 'course', 'EVENT_SUB_TYPE']).cumcount() + 1
+    online = sections['EVENT_SUB_TYPE'] == 'ONLN'
+    sections['SECTION'] = np.where(online, 'ON', '') + number.map('{:02d}'.format)
+
+    for col in ['EVENT_ID', 'EVENT_MED_NAME', 'EVENT_LONG_NAME', 'DEPARTMENT', 'COLLEGE', 'CURRICULUM', 'PROGRAM']:
+        sections[col] = courses[col].to_numpy()[sections['course']]
+    for col in ['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'START_DATE', 'END_DATE']:
+        sections[col] = all_terms[col].to_numpy()[sections['term_index']]
+    sections['EVENT_TYPE'] = 'COURSE'
+    sections['EVENT_STATUS'] = np.where(rng.random(len(sections)) < 0.02, 'C', 'A')
+    sections['MAX_PARTICIPANT'] = np.where(sections['EVENT_SUB_TYPE'] == 'LAB', 16, 30)
+    sections['WAIT_LIST'] = rng.integers(0, 4, len(sections))
+    sections['REVISION_DATE'] = sections['END_DATE']
+    return sections
+
+
+def _transcript(rng, student_terms, sections, all_terms, today):
+    """
+    returns one TRANSCRIPTDETAIL row per student and section taken
+    """
+    first_section = np.searchsorted(sections['term_index'].to_numpy(), np.arange(len(all_terms)))
+    n_sections = np.diff(np.append(first_section, len(sections)))
+
+    takes = rng.integers(3, 7, len(student_terms))
+    row = np.repeat(np.arange(len(student_terms)), takes)
+    t = student_terms['term_index'].to_numpy()[row]
+    section = first_section[t] + (rng.random(len(row)) * n_sections[t]).astype(int)
+    td = pd.DataFrame({'row': row, 'section': section}).drop_duplicates()
+
+    td['student'] = student_terms['student'].to_numpy()[td['row']]
+    for col in ['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION',
+            'EVENT_TYPE', 'EVENT_MED_NAME', 'EVENT_LONG_NAME', 'CREDITS']:
+        td[col] = sections[col].to_numpy()[td['section']]
+    td = td.rename(columns={'CREDITS': 'CREDIT'})
+    td['ORG_CODE_ID'] = 'O000000001'
+    td['CREDIT_TYPE'] = np.where(rng.random(len(td)) < 0.01, 'TRAN', 'STD')
+    td['ADD_DROP_WAIT'] = np.where(rng.random(len(td)) < 0.05, 'D', 'A')
+
+    ended = all_terms['END_DATE'].to_numpy()[student_terms['term_index'].to_numpy()[td['row']]] < np.datetime64(today)
+    grade = _pick(rng, GRADES, GRADE_SHARES, len(td))
+    td['FINAL_GRADE'] = np.where(ended, grade, '')
+    td['MID_GRADE'] = np.where(ended | (rng.random(len(td)) < 0.5), grade, '')
+    td['REVISION_DATE'] = all_terms['END_DATE'].to_numpy()[student_terms['term_index'].to_numpy()[td['row']]]
+    return td.reset_index(drop=True)
+
+
+def generate(students=10_000, years=8, end_year=None, today=None, seed=0) -> dict:
+    """
+    returns {name: DataFrame} with the PowerCampus tables (ACADEMIC,
+    TRANSCRIPTDETAIL, TRANSCRIPTGPA, SECTIONS, SECTIONSCHEDULE, SECTIONPER,
+    PEOPLE, EmailAddress, ACADEMICCALENDAR, CODE_DAY, TRANSCRIPTDEGREE and
+    the code tables), the census frame ('census') and the weekly admissions
+    frame ('admissions')
+
+    Arguments:
+        students - number of students enrolled over the years
+        years - number of years of enrollment, ending with end_year
+        end_year - last year enrolled, defaults to the year of today
+        today - date terms are open or closed on, defaults to today
+        seed - random seed; the same arguments always give the same data
+    """
+    rng = np.random.default_rng(seed)
+    today = pd.Timestamp(today or dt.date.today()).normalize()
+    end_year = int(end_year or today.year)
+    start_year = end_year - int(years) + 1
+
+    # the calendar runs a year past the data, like PowerCampus
+    all_terms = terms(min(CALENDAR_START_YEAR, start_year), end_year + 1)
+    all_terms = all_terms.set_index(['ACADEMIC_YEAR', 'ACADEMIC_TERM'], drop=False)
+    main_terms = all_terms.loc[(all_terms['ACADEMIC_TERM'] != 'SUMMER') &
+                               (all_terms['ACADEMIC_YEAR'] >= str(start_year))].reset_index(drop=True)
+
+    # students are registered up to the term after the current one
+    current = int(np.searchsorted(main_terms['START_DATE'].to_numpy(), np.datetime64(today), side='right')) - 1
+    last_term = min(max(current + 1, 0), len(main_terms) - 1)
+    last_term = min(last_term, int(np.flatnonzero(main_terms['ACADEMIC_YEAR'] == str(end_year))[-1]) + 1)
+
+    student_df = _students(rng, int(students), main_terms, last_term)
+    student_terms = _student_terms(rng, student_df, main_terms, all_terms, last_term)
+    all_terms = all_terms.reset_index(drop=True)
+
+    enrolled = np.bincount(student_terms['term_index'], minlength=len(all_terms))
+    courses = _courses(rng, int(np.clip(students // 25, 80, 1500)))
+    sections = _sections(rng, courses, all_terms, enrolled)
+    td = _transcript(rng, student_terms, sections, all_terms, today)
+
+    tables = {}
+    tables['ACADEMICCALENDAR'] = _calendar(all_terms)
+    tables['CODE_DAY'] = _code_day()
+    tables['CODE_COLLEGE'], tables['CODE_CURRICULUM'], tables['CODE_ETHNICITY'] = _code_tables(start_year)
+    tables['DegreeMappingNsc'] = _degree_mapping(start_year)
+
+    faculty_count = max(20, len(courses) // 3)
+    people = _people(rng, student_df, faculty_count)
+    tables['PEOPLE'] = people.drop(columns='Email')
+    tables['EmailAddress'] = pd.DataFrame({
+        'EmailAddressId': people['PrimaryEmailId'],
+        'PeopleOrgCodeId': people['PEOPLE_CODE_ID'],
+        'EmailType': 'MLBX',
+        'Email': people['Email'],
+        'IsActive': 1,
+    })
+
+    adds = td.loc[td['ADD_DROP_WAIT'] == 'A'].groupby('section').size()
+    sections['ADDS'] = adds.reindex(np.arange(len(sections)), fill_value=0).to_numpy()
+    tables['SECTIONS'] = sections.drop(columns=['term_index', 'course', 'type']).reset_index(drop=True)
+    tables['SECTIONSCHEDULE'] = _schedule(rng, sections)
+    tables['SECTIONPER'] = _section_per(rng, sections, faculty_count, len(student_df))
+
+    td['PEOPLE_CODE_ID'] = student_df['PEOPLE_CODE_ID'].to_numpy()[td['student']]
+    credits = td.loc[td['ADD_DROP_WAIT'] == 'A'].groupby('row')['CREDIT'].sum()
+    student_terms['CREDITS'] = credits.reindex(np.arange(len(student_terms)), fill_value=0.0).to_numpy()
+    tables['TRANSCRIPTDETAIL'] = td.drop(columns=['row', 'section', 'student'])
+
+    academic = _academic(rng, student_df, student_terms, all_terms)
+    tables['ACADEMIC'] = academic
+    tables['TRANSCRIPTGPA'] = _transcript_gpa(rng, student_df, student_terms, all_terms, today)
+    tables['TRANSCRIPTDEGREE'] = _transcript_degree(student_df, student_terms, all_terms, today)
+
+    tables['census'] = _census(student_df, academic, all_terms, today)
+    tables['admissions'] = _admissions(rng, student_df, main_terms)
+    return tables
+
+
+def _calendar(all_terms):
+    calendar = all_terms.loc[:, ['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'START_DATE', 'END_DATE']]
+    calendar = pd.concat([calendar.assign(ACADEMIC_SESSION=s) for s in [''] + SESSIONS], ignore_index=True)
+    calendar['FINAL_END_DATE'] = calendar['END_DATE'] + pd.Timedelta(days=7)
+    calendar['REVISION_DATE'] = calendar['START_DATE']
+    return calendar.sort_values(['START_DATE', 'ACADEMIC_SESSION']).reset_index(drop=True)
+
+
+def _code_day():
+    rows = []
+    for code in DAY_CODES:
+        days = '' if code in ['ONLN', 'TBD', 'CANC'] else code
+        rows.append([code] + ['Y' if d in days else 'N' for d in DAY_COLUMNS.values()])
+    return pd.DataFrame(rows, columns=['CODE_VALUE_KEY'] + list(DAY_COLUMNS))
+
+
+def _code_tables(start_year):
+    created = pd.Timestamp(start_year - 5, 7, 1)
+    college = pd.DataFrame({'CODE_VALUE_KEY': list(COLLEGES), 'LONG_DESC': list(COLLEGES.values())})
+    curriculum = pd.DataFrame({
+        'CODE_VALUE_KEY': [c[0] for c in CURRICULA],
+        'LONG_DESC': [c[5] for c in CURRICULA],
+        'FORMAL_TITLE': [f"{c[2]} {c[5]}" for c in CURRICULA],
+    })
+    ethnicity = pd.DataFrame({'CODE_VALUE_KEY': ETHNICITIES, 'LONG_DESC': ETHNICITIES})
+    for df in [college, curriculum, ethnicity]:
+        df['CODE_VALUE'] = df['CODE_VALUE_KEY']
+        df['SHORT_DESC'] = df['LONG_DESC'].str.slice(0, 10)
+        df['MEDIUM_DESC'] = df['LONG_DESC'].str.slice(0, 20)
+        df['STATUS'] = 'A'
+        df['CREATE_DATE'] = created
+    return college, curriculum, ethnicity
+
+
+def _degree_mapping(start_year):
+    df = pd.DataFrame(CURRICULA,
+        columns=['Curriculum', 'Program', 'Degree', 'COLLEGE', 'DEPARTMENT', 'FORMAL_TITLE', 'share'])
+    df = df.loc[:, ['Curriculum', 'Program', 'Degree']]
+    df['AcademicYear'] = str(start_year)
+    df['AcademicTerm'] = 'FALL'
+    df['AcademicSession'] = ''
+    df['CipCode'] = [f"{3 + i % 50:02d}.{101 + i:04d}" for i in range(len(df))]
+    df['CipYear'] = 2020
+    df['ProgramCredentialLevel'] = np.where(df['Program'] == 'G', '05', '03')
+    df['PublishedProgramLength'] = np.where(df['Degree'].isin(['AAS', 'AOS', 'AA']), 2, 4)
+    df['ProgramLengthMeasurement'] = 'Y'
+    df['SpecialProgramIndicator'] = 'N'
+    df['WeeksInTitleIVAcademicYear'] = 30
+    df['DefaultProgramBeginDate'] = pd.Timestamp(start_year, 8, 28)
+    df['IsGainfulEmployment'] = 0
+    return df
+
+
+def _people(rng, student_df, faculty_count):
+    count = len(student_df) + faculty_count
+    people = pd.DataFrame({'PEOPLE_CODE_ID': _people_ids(1, count)})
+    first = np.array(['Alex', 'Sam', 'Jordan', 'Taylor', 'Casey', 'Riley', 'Morgan', 'Avery', 'Quinn', 'Jamie'], dtype=object)
+    last = np.array(['Adams', 'Baker', 'Clark', 'Davis', 'Evans', 'Fisher', 'Green', 'Hill', 'King', 'Lewis',
+                     'Moore', 'Nelson', 'Owens', 'Parker', 'Reed', 'Stone', 'Turner', 'Walker', 'Young'], dtype=object)
+    people['FIRST_NAME'] = first[rng.integers(0, len(first), count)]
+    people['LAST_NAME'] = last[rng.integers(0, len(last), count)]
+    people['PrimaryEmailId'] = np.arange(1, count + 1)
+    people['Email'] = people['PEOPLE_CODE_ID'].str.lower() + '@example.edu'
+    people['DECEASED_FLAG'] = 'N'
+    birth = np.concatenate([
+        student_df['BIRTH_DATE'].to_numpy(dtype='datetime64[ns]'),
+        np.datetime64('1960-01-01') + rng.integers(0, 30 * 365, faculty_count).astype('timedelta64[D]'),
+    ])
+    people['BIRTH_DATE'] = pd.to_datetime(birth)
+    people['REVISION_DATE'] = people['BIRTH_DATE']
+    return people
+
+
+def _schedule(rng, sections):
+    """
+    returns one meeting pattern per section, with its room
+    """
+    types = pd.DataFrame(SECTION_TYPES, columns=['EVENT_SUB_TYPE', 'share', 'CREDITS', 'days', 'minutes'])
+    pattern = (rng.random(len(sections)) * types['days'].str.len().to_numpy()[sections['type']]).astype(int)
+    day = np.array([types['days'][t][p] for t, p in zip(sections['type'], pattern)], dtype=object)
+    minutes = np.array([types['minutes'][t][p] for t, p in zip(sections['type'], pattern)])
+
+    schedule = sections.loc[:, ['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION']].copy()
+    tbd = rng.random(len(schedule)) < 0.02
+    schedule['DAY'] = np.where(tbd, 'TBD', day)
+    start = pd.Timestamp(1900, 1, 1, 8) + pd.to_timedelta(rng.integers(0, 17, len(schedule)) * 30, unit='min')
+    no_time = (schedule['DAY'].isin(['ONLN', 'TBD'])).to_numpy()
+    schedule['START_TIME'] = pd.Series(start).where(~no_time).to_numpy()
+    schedule['END_TIME'] = (pd.Series(start) + pd.to_timedelta(minutes, unit='min')).where(~no_time).to_numpy()
+
+    building = np.array(BUILDINGS, dtype=object)[rng.integers(0, len(BUILDINGS), len(schedule))]
+    room = pd.Series(rng.integers(101, 101 + ROOMS_PER_BUILDING, len(schedule))).astype(str).to_numpy(dtype=object)
+    online = (schedule['DAY'] == 'ONLN').to_numpy()
+    schedule['BUILDING_CODE'] = np.where(online, 'ONLINE', np.where(tbd, '', building))
+    schedule['ROOM_ID'] = np.where(online, 'WEB', np.where(tbd, '', room))
+    schedule['REVISION_DATE'] = sections['START_DATE'].to_numpy()
+    return schedule.reset_index(drop=True)
+
+
+def _section_per(rng, sections, faculty_count, first_faculty):
+    per = sections.loc[:, ['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION']].copy()
+    faculty = 1 + first_faculty + rng.integers(0, faculty_count, len(per))
+    per['PERSON_CODE_ID'] = pd.Series(faculty).map('P{:09d}'.format).to_numpy(dtype=object)
+    per['REVISION_DATE'] = sections['START_DATE'].to_numpy()
+    return per.reset_index(drop=True)
+
+
+def _academic(rng, student_df, student_terms, all_terms):
+    """
+    returns one primary ACADEMIC record per student and term, some secondary
+    records, and the application fields for the entry term
+    """
+    s = student_terms['student'].to_numpy()
+    t = student_terms['term_index'].to_numpy()
+    academic = pd.DataFrame({
+        'PEOPLE_CODE_ID': student_df['PEOPLE_CODE_ID'].to_numpy()[s],
+        'ACADEMIC_YEAR': all_terms['ACADEMIC_YEAR'].to_numpy()[t],
+        'ACADEMIC_TERM': all_terms['ACADEMIC_TERM'].to_numpy()[t],
+        'ACADEMIC_SESSION': '',
+    })
+    for col in ['PROGRAM', 'DEGREE', 'CURRICULUM', 'COLLEGE', 'DEPARTMENT']:
+        academic[col] = student_df[col].to_numpy()[s]
+
+    k = student_terms['k'].to_numpy()
+    graduate = academic['PROGRAM'].to_numpy() == 'G'
+    academic['CLASS_LEVEL'] = np.where(graduate, 'GR',
+        np.array(['FR', 'FR', 'SO', 'SO', 'JR', 'JR', 'SR', 'SR'], dtype=object)[np.minimum(k, 7)])
+    academic['POPULATION'] = np.where(k == 0, 'NEW', 'CONT')
+    academic['COLLEGE_ATTEND'] = np.where(k == 0, 'NEW', 'RET')
+    academic['CREDITS'] = student_terms['CREDITS'].to_numpy()
+    academic['FULL_PART'] = np.where(academic['CREDITS'] >= 12, 'F', 'P')
+    academic['ACADEMIC_STANDING'] = np.where(rng.random(len(academic)) < 0.05, 'PROB', 'GOOD')
+    last = student_terms['is_last'].to_numpy()
+    completes = student_df['completes'].to_numpy()[s]
+    academic['ENROLL_SEPARATION'] = np.where(last, np.where(completes, 'GRAD', 'WDRL'), '')
+    academic['SEPARATION_DATE'] = pd.Series(all_terms['END_DATE'].to_numpy()[t]).where(last).to_numpy()
+    academic['STATUS'] = 'A'
+    academic['PRIMARY_FLAG'] = 'Y'
+
+    first = k == 0
+    academic['ADMIT_YEAR'] = np.where(first, academic['ACADEMIC_YEAR'], '')
+    academic['ADMIT_TERM'] = np.where(first, academic['ACADEMIC_TERM'], '')
+    academic['APP_STATUS'] = np.where(first, '500', '')
+    academic['APP_DECISION'] = np.where(first, np.where(rng.random(len(academic)) < 0.1, 'TRDP', 'DPAC'), '')
+    applied = all_terms['START_DATE'].to_numpy()[t] - pd.to_timedelta(rng.integers(14, 240, len(academic)), unit='D').to_numpy()
+    academic['APP_STATUS_DATE'] = pd.Series(applied).where(first).to_numpy()
+    academic['REVISION_DATE'] = all_terms['START_DATE'].to_numpy()[t]
+
+    # a few students have a second, non-primary curriculum in a term
+    second = academic.loc[rng.random(len(academic)) < 0.03].copy()
+    other = rng.integers(0, len(CURRICULA), len(second))
+    second['CURRICULUM'] = np.array([c[0] for c in CURRICULA], dtype=object)[other]
+    second['PRIMARY_FLAG'] = 'N'
+    second[['ADMIT_YEAR', 'ADMIT_TERM', 'APP_STATUS', 'APP_DECISION']] = ''
+    second['APP_STATUS_DATE'] = pd.NaT
+    return pd.concat([academic, second], ignore_index=True)
+
+
+def _transcript_gpa(rng, student_df, student_terms, all_terms, today):
+    """
+    returns TRANSCRIPTGPA term ('T') and overall ('O') rows for every student
+    and term with credits; terms still open have a GPA of 0, as PowerCampus
+    keeps them until grades are posted
+    """
+    st = student_terms.loc[student_terms['CREDITS'] > 0]
+    s = st['student'].to_numpy()
+    t = st['term_index'].to_numpy()
+    ended = all_terms['END_DATE'].to_numpy()[t] < np.datetime64(today)
+    term_gpa = np.where(rng.random(len(st)) < 0.04, rng.uniform(0.0, 1.0, len(st)),
+                        np.clip(rng.normal(3.0, 0.6, len(st)), 0.0, 4.0))
+    term_gpa = np.where(ended, term_gpa, 0.0).round(2)
+    credits = st['CREDITS'].to_numpy()
+    points = pd.Series(term_gpa * credits).groupby(s).cumsum().to_numpy()
+    attempted = pd.Series(credits).groupby(s).cumsum().to_numpy()
+
+    gpa = pd.DataFrame({
+        'PEOPLE_CODE_ID': student_df['PEOPLE_CODE_ID'].to_numpy()[s],
+        'ACADEMIC_YEAR': all_terms['ACADEMIC_YEAR'].to_numpy()[t],
+        'ACADEMIC_TERM': all_terms['ACADEMIC_TERM'].to_numpy()[t],
+        'ACADEMIC_SESSION': '',
+        'REVISION_DATE': all_terms['END_DATE'].to_numpy()[t],
+    })
+    term_rows = gpa.assign(RECORD_TYPE='T', GPA=term_gpa, ATTEMPTED_CREDITS=credits)
+    overall_rows = gpa.assign(RECORD_TYPE='O', GPA=(points / attempted).round(2), ATTEMPTED_CREDITS=attempted)
+    return pd.concat([term_rows, overall_rows], ignore_index=True)
+
+
+def _transcript_degree(student_df, student_terms, all_terms, today):
+    last = student_terms.loc[student_terms['is_last']]
+    last = last.loc[student_df['completes'].to_numpy()[last['student']]]
+    graduated = all_terms['END_DATE'].to_numpy()[last['term_index']] < np.datetime64(today)
+    last = last.loc[graduated]
+    s = last['student'].to_numpy()
+    degree = student_df.iloc[s].loc[:, ['PEOPLE_CODE_ID', 'PROGRAM', 'DEGREE', 'CURRICULUM', 'COLLEGE', 'FORMAL_TITLE']]
+    degree['GRADUATION_DATE'] = all_terms['END_DATE'].to_numpy()[last['term_index']]
+    degree['REVISION_DATE'] = degree['GRADUATION_DATE']
+    return degree.reset_index(drop=True)
+
+
+def _census(student_df, academic, all_terms, today):
+    """
+    returns the census frame: one row per student enrolled in each term that
+    has started, with the census_db.arr columns the pages use
+    """
+    started = all_terms.loc[all_terms['START_DATE'] <= today, ['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'yearterm', 'yearterm_sort']]
+    census = academic.loc[academic['PRIMARY_FLAG'] == 'Y'].merge(started, on=['ACADEMIC_YEAR', 'ACADEMIC_TERM'])
+    people = student_df.set_index('PEOPLE_CODE_ID')
+    census = pd.DataFrame({
+        'yearterm_sort': census['yearterm_sort'].to_numpy(),
+        'current_yearterm': census['yearterm'].to_numpy(),
+        'people_code_id': census['PEOPLE_CODE_ID'].to_numpy(),
+        'gender': people['gender'].reindex(census['PEOPLE_CODE_ID']).to_numpy(),
+        'updated_ethnicity_code': people['ethnicity'].reindex(census['PEOPLE_CODE_ID']).to_numpy(),
+        'COLLEGE_ATTEND': census['COLLEGE_ATTEND'].to_numpy(),
+        'CLASS_LEVEL': census['CLASS_LEVEL'].to_numpy(),
+        'DEGREE': census['DEGREE'].to_numpy(),
+        'curriculum': census['CURRICULUM'].to_numpy(),
+    })
+    return census.sort_values(['yearterm_sort', 'people_code_id']).reset_index(drop=True)
+
+
+def _admissions(rng, student_df, main_terms):
+    """
+    returns the weekly admissions frame: cumulative counts by admissions week
+    (columns 0 to 53) for each term, stage and curriculum
+    """
+    entering = student_df.groupby(['entry', 'CURRICULUM']).size().reset_index(name='count')
+    weeks = np.arange(ADMISSIONS_WEEKS)
+    rows = []
+    for r in entering.itertuples(index=False):
+        year_term = main_terms['ACADEMIC_YEAR'].iloc[r.entry] + '.' + main_terms['ACADEMIC_TERM'].iloc[r.entry].title()
+        for stage, factor in ADMISSIONS_STAGES.items():
+            midpoint = rng.uniform(20, 36)
+            curve = 1 / (1 + np.exp(-(weeks - midpoint) / 4))
+            rows.append([year_term, stage, r.CURRICULUM] + list(np.round(curve * r.count * factor).astype(int)))
+    return pd.DataFrame(rows, columns=['year_term', 'stage', 'curriculum'] + list(weeks))
+
+
+def write_database(tables, path):
+    """
+    writes the PowerCampus tables to the SQLite database file path, replacing
+    it, with indexes on the year/term columns
+
+    Text columns compare case-insensitively, like the SQL Server collation, so
+    e.g. ACADEMIC_TERM='Fall' matches 'FALL'.
+    """
+    path.unlink(missing_ok=True)
+    conn = sqlite3.connect(path)
+    try:
+        for name, df in tables.items():
+            if name in ['census', 'admissions']:
+                continue
+            text = {c: 'TEXT COLLATE NOCASE' for c in df.columns
+                        if pd.api.types.is_string_dtype(df[c]) or df[c].dtype == object}
+            df.to_sql(name, conn, index=False, chunksize=100_000, dtype=text)
+            if {'ACADEMIC_YEAR', 'ACADEMIC_TERM'} <= set(df.columns):
+                conn.execute(f"CREATE INDEX [ix_{name}_year_term] ON [{name}] (ACADEMIC_YEAR, ACADEMIC_TERM)")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def write_census(df, path):
+    """
+    writes the census frame as a Feather file like census_db.arr
+    """
+    df.reset_index(drop=True).to_feather(path)
+
+
+def write_admissions(df, path):
+    """
+    writes the weekly admissions frame to an HDF file like stage_data;
+    needs PyTables
+    """
+    with warnings.catch_warnings():
+        # the week columns are numbered, which PyTables stores pickled
+        warnings.simplefilter("ignore", pd.errors.PerformanceWarning)
+        df.to_hdf(path, key="weekly", mode="w")
@@ -0,0 +1,84 @@
+"""Keyed, cached anonymization of student IDs"""
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import pandas as pd
+import streamlit as st
+
+import src.query_cache
+
+# environment variable holding the hex anonymization key; if it is not set a
+# random key is generated once and kept in KEY_FILE
+KEY_ENV = "PSC_DASHBOARD_ANON_KEY"
+KEY_FILE = src.query_cache.CACHE_ROOT / "anonymize.key"
+
+ID_DIGITS = 12
+
+
+def _load_key() -> bytes:
+    key = os.environ.get(KEY_ENV)
+    if key:
+        return bytes.fromhex(key)
+    try:
+        return bytes.fromhex(KEY_FILE.read_text().strip())
+    except FileNotFoundError:
+        pass
+    KEY_FILE.parent.mkdir(parents=True, exist_ok=True)
+    key = secrets.token_bytes(32)
+    try:
+        # exclusive create, so two processes starting together agree on one key
+        fd = os.open(KEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        return bytes.fromhex(KEY_FILE.read_text().strip())
+    with os.fdopen(fd, 'w') as f:
+        f.write(key.hex())
+    return key
+
+
+def anonymous_id(idstr, key) -> str:
+    """
+    returns the ID_DIGITS-digit anonymous id for idstr under key
+    """
+    digest = hmac.new(key, idstr.encode('utf-8'), hashlib.sha256).hexdigest()
+    return f"{int(digest, 16) % (10**ID_DIGITS):0{ID_DIGITS}d}"
+
+
+class _IdMap:
+    """Anonymous ids already computed in this process"""
+
+    def __init__(self):
+        self.key = _load_key()
+        self.ids = {}
+        self.lock = threading.Lock()
+
+    def lookup(self, idstrs) -> list:
+        with self.lock:
+            missing = [i for i in idstrs if i not in self.ids]
+        computed = {i: anonymous_id(i, self.key) for i in missing}
+        with self.lock:
+            self.ids.update(computed)
+            return [self.ids[i] for i in idstrs]
+
+
+@st.cache_resource
+def _id_map() -> _IdMap:
+    return _IdMap()
+
+
+def anonymize(ids) -> pd.Series:
+    """
+    returns the anonymous ids for a Series of IDs as a categorical Series
+
+    Each distinct ID is hashed once, and the mapping is kept for the life of
+    the process, so reruns only hash IDs not seen before.
+    """
+    codes, uniques = pd.factorize(ids)
+    anon = _id_map().lookup([str(u) for u in uniques])
+    if len(set(anon)) == len(anon):
+        values = pd.Categorical.from_codes(codes, categories=anon)
+    else:
+        # two IDs share an anonymous id; categories must be unique
+        values = pd.Categorical(pd.Series(anon, dtype=object).reindex(codes).to_numpy())
+    return pd.Series(values, index=ids.index, name=ids.name)
@@ -0,0 +1,118 @@
+"""Shared loader for the census database Feather file, and the enrollment
+cube built from it"""
+from pathlib import Path
+import pandas as pd
+import pyarrow.feather as feather
+import streamlit as st
+
+import src.profiling
+import src.query_cache
+
+CENSUS_DB_FILE = Path(r"F:\Data\Census\CensusDatabase") / "census_db.arr"
+
+# every census frame comes back in this order
+CENSUS_SORT = ['yearterm_sort', 'people_code_id']
+
+CUBE_DIR = src.query_cache.CACHE_ROOT / "census"
+
+# headcounts are kept for every combination of these census columns
+CUBE_TERM = ['yearterm_sort', 'current_yearterm']
+CUBE_DIMENSIONS = ['gender', 'updated_ethnicity_code', 'COLLEGE_ATTEND',
+    'CLASS_LEVEL', 'DEGREE', 'curriculum']
+
+
+@st.cache_resource(max_entries=1)
+def _census_table(data_file: str, mtime: float):
+    """
+    returns the memory-mapped census table sorted by CENSUS_SORT, shared by
+    every session in the process
+
+    mtime is only part of the cache key, so a rewritten file is reloaded.
+    """
+    with src.profiling.timed('file', data_file, cache='miss') as record:
+        table = feather.read_table(data_file, memory_map=True)
+        table = table.sort_by([(c, 'ascending') for c in CENSUS_SORT])
+        record.update({'rows': table.num_rows, 'bytes': table.nbytes})
+    return table
+
+
+def census_df(columns) -> pd.DataFrame:
+    """
+    returns the given columns of the census database, sorted by CENSUS_SORT
+
+    Arguments:
+        columns - list of census_db.arr columns the page uses
+    """
+    table = _census_table(str(CENSUS_DB_FILE), CENSUS_DB_FILE.stat().st_mtime)
+    # each caller gets its own pandas frame; the Arrow table stays shared
+    return table.select(list(columns)).to_pandas()
+
+
+def data_version() -> tuple:
+    """
+    returns a stamp that changes whenever the census file is rewritten
+    """
+    return (str(CENSUS_DB_FILE), CENSUS_DB_FILE.stat().st_mtime)
+
+
+def build_enrollment_cube(table) -> pd.DataFrame:
+    """
+    returns headcounts of the census table by term and every CUBE_DIMENSIONS
+    combination, in a 'count' column
+
+    Missing dimension values are kept as their own group so pages can apply
+    their own labels for them.
+    """
+    df = table.select(CUBE_TERM + CUBE_DIMENSIONS + ['people_code_id']).to_pandas()
+    return (
+        df.groupby(CUBE_TERM + CUBE_DIMENSIONS, dropna=False)['people_code_id']
+        .count()
+        .reset_index()
+        .rename(columns={'people_code_id': 'count'})
+        .sort_values(CUBE_TERM + CUBE_DIMENSIONS)
+        .reset_index(drop=True)
+    )
+
+
+@st.cache_resource(max_entries=1)
+def _enrollment_cube(data_file: str, mtime: float) -> pd.DataFrame:
+    """
+    returns the enrollment cube for the census file, read from CUBE_DIR if it
+    was already built for this version of the file
+    """
+    cube_file = CUBE_DIR / f"enrollment_cube_{int(mtime)}.parquet"
+    with src.profiling.timed('file', str(cube_file), cache='hit') as record:
+        try:
+            cube = pd.read_parquet(cube_file)
+        except Exception:
+            record['cache'] = 'miss'
+            cube = build_enrollment_cube(_census_table(data_file, mtime))
+            if src.query_cache.write_parquet(cube_file, cube):
+                for old_file in CUBE_DIR.glob("enrollment_cube_*.parquet"):
+                    if old_file != cube_file:
+                        old_file.unlink(missing_ok=True)
+        record.update(src.profiling.frame_stats(cube))
+    return cube
+
+
+def enrollment_counts(dimensions=()) -> pd.DataFrame:
+    """
+    returns census headcounts by term and the given dimensions, in a 'count'
+    column, sorted by yearterm_sort
+
+    Arguments:
+        dimensions - list of CUBE_DIMENSIONS columns to keep
+    """
+    dimensions = list(dimensions)
+    cube = _enrollment_cube(str(CENSUS_DB_FILE), CENSUS_DB_FILE.stat().st_mtime)
+    return (
+        cube.groupby(CUBE_TERM + dimensions, dropna=False)['count']
+        .sum()
+        .reset_index()
+    )
+
+
+if __name__ == "__main__":
+    # build the enrollment cube ahead of the first page view
+    cube = enrollment_counts(CUBE_DIMENSIONS)
+    print(f"enrollment cube: {len(cube)} rows")
@@ -0,0 +1,252 @@
+"""Course enrollment facts shared by the transcript-based pages
+
+The enrollment fact table has one row per student course registration
+(TRANSCRIPTDETAIL, student x section x term) with the student's term ACADEMIC
+record. It is built once per data version, kept as Parquet under FACT_DIR with
+its keys normalized and stored as categoricals, and each page filters and
+aggregates it rather than joining the tables itself.
+
+course_facts() narrows it to credit-bearing courses and adds each section's
+department (SECTIONS) for the department credits and faculty pages. Both are
+keyed by a data-version stamp of the source tables, made of the per-term stamps
+(row count, last REVISION_DATE) src.partitions keeps its term partitions under.
+A change in any term, closed or open, changes the stamp, and the rebuild
+fetches the partitions of the changed terms again, so the tables are rebuilt
+within DATA_VERSION_TTL of a change in PowerCampus rather than served stale.
+"""
+import datetime as dt
+import hashlib
+import json
+import pandas as pd
+import streamlit as st
+
+import src.partitions
+import src.profiling
+import src.query_cache
+import src.query_spec
+import src.terms
+
+# terms with course credits, including the 10-week sessions
+COURSE_TERMS = ['FALL', '10-WEEK_1', '10-WEEK_2', 'SPRING', 'SUMMER', '10-WEEK_3', '10-WEEK_4']
+
+COURSE_TABLES = ['SECTIONS', 'TRANSCRIPTDETAIL', 'ACADEMIC']
+
+ENROLLMENT_TABLES = ['TRANSCRIPTDETAIL', 'ACADEMIC']
+
+FACT_DIR = src.query_cache.CACHE_ROOT / "facts"
+
+# one fact table row per registration
+FACT_KEY = ['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION',
+    'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION']
+
+# keys and codes stored as categoricals; ACADEMIC_YEAR, yearterm and
+# yearterm_sort stay strings so pages can compare them with >= and <=
+FACT_CATEGORIES = ['PEOPLE_CODE_ID', 'ACADEMIC_TERM', 'ACADEMIC_SESSION',
+    'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION', 'ORG_CODE_ID', 'CREDIT_TYPE',
+    'MID_GRADE', 'FINAL_GRADE', 'PROGRAM', 'CURRICULUM', 'COLLEGE', 'PRIMARY_FLAG']
+
+# sessions whose registrations count as course credits
+COURSE_SESSIONS = ['MAIN', 'CULN', 'EXT', 'FNRR', 'HEOP', 'SLAB', 'BLOCK A', 'BLOCK AB', 'BLOCK B']
+
+# how long a data-version stamp is trusted before the tables are checked again;
+# the stamps are the ones src.partitions checks its partitions against
+DATA_VERSION_TTL = src.partitions.STAMP_TTL
+
+# a rebuild means the data changed, so open terms are always fetched again
+OPEN_TERMS_TTL = dt.timedelta(0)
+
+
+def data_version(start_year:str, tables=tuple(COURSE_TABLES)) -> tuple:
+    """
+    returns a stamp that changes whenever rows from start_year on are added,
+    removed or revised in any term of any of the tables: (table, ((year, term),
+    (row count, last REVISION_DATE)) for each term) for each table
+    """
+    return tuple(
+        (table, tuple(sorted(src.partitions.term_stamps(table, str(int(start_year))).items())))
+        for table in tables
+    )
+
+
+def normalize_keys(df) -> pd.DataFrame:
+    """
+    returns df with its section and room key columns normalized as the fact
+    table stores them: upper case, and EVENT_ID without trailing spaces
+
+    Only the columns df has are changed.
+    """
+    for col in ['ACADEMIC_TERM', 'ACADEMIC_SESSION', 'EVENT_SUB_TYPE', 'SECTION', 'BUILDING_CODE', 'ROOM_ID']:
+        if col in df.columns:
+            df[col] = df[col].str.upper()
+    if 'EVENT_ID' in df.columns:
+        df['EVENT_ID'] = df['EVENT_ID'].str.rstrip().str.upper()
+    return df
+
+
+def build_enrollment_facts(start_year:str) -> pd.DataFrame:
+    """
+    returns the enrollment fact table for ACADEMIC_YEAR start_year on
+
+    One row per active (ADD_DROP_WAIT='A') TRANSCRIPTDETAIL registration in
+    COURSE_TERMS. PROGRAM, CURRICULUM, COLLEGE and PRIMARY_FLAG come from the
+    student's ACADEMIC record for the term (ACADEMIC_SESSION='', CREDITS>0,
+    not ADVST), preferring the primary record; has_academic is False, and they
+    are missing, when the student has no such record.
+    """
+    transcriptdetail = src.partitions.select("TRANSCRIPTDETAIL",
+        fields=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION',
+            'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION', 'ORG_CODE_ID',
+            'CREDIT', 'CREDIT_TYPE', 'MID_GRADE', 'FINAL_GRADE',
+            ],
+        where="ADD_DROP_WAIT='A' ",
+        year_start=start_year,
+        terms=COURSE_TERMS,
+        open_ttl=OPEN_TERMS_TTL,
+    )
+    transcriptdetail = ( normalize_keys(transcriptdetail)
+        .drop_duplicates(FACT_KEY)
+    )
+
+    academic = src.partitions.select("ACADEMIC",
+        fields=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM',
+            'PROGRAM', 'CURRICULUM', 'COLLEGE', 'PRIMARY_FLAG',
+            ],
+        where="ACADEMIC_SESSION='' and CREDITS>0 and CURRICULUM<>'ADVST' ",
+        year_start=start_year,
+        terms=COURSE_TERMS,
+        open_ttl=OPEN_TERMS_TTL,
+    )
+    academic = normalize_keys(academic)
+    academic['has_academic'] = True
+    academic['is_primary'] = (academic['PRIMARY_FLAG'] == 'Y')
+    academic = ( academic.sort_values(['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM',
+                    'is_primary', 'COLLEGE', 'CURRICULUM'])
+        .drop_duplicates(['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM'], keep="last")
+        .drop(['is_primary'], axis='columns')
+    )
+
+    df = transcriptdetail.merge(academic,
+        how='left',
+        on=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM'],
+    )
+    df['has_academic'] = df['has_academic'].fillna(False).astype(bool)
+    df = src.terms.add_col_yearterm(df)
+    df = src.terms.add_col_yearterm_sort(df)
+    df[FACT_CATEGORIES] = df[FACT_CATEGORIES].astype('category')
+    return df.sort_values(['yearterm_sort'] + FACT_KEY).reset_index(drop=True)
+
+
+@st.cache_resource(max_entries=2)
+def _enrollment_facts(start_year:str, version:tuple) -> pd.DataFrame:
+    """
+    returns the enrollment fact table, read from FACT_DIR if it was already
+    built for this data version; version is only part of the cache key
+    """
+    digest = hashlib.sha256(json.dumps(version).encode('utf-8')).hexdigest()[:16]
+    fact_file = FACT_DIR / f"enrollment_{int(start_year)}_{digest}.parquet"
+    with src.profiling.timed('file', str(fact_file), cache='hit') as record:
+        try:
+            facts = pd.read_parquet(fact_file)
+        except Exception:
+            record['cache'] = 'miss'
+            facts = build_enrollment_facts(start_year)
+            if src.query_cache.write_parquet(fact_file, facts):
+                for old_file in FACT_DIR.glob(f"enrollment_{int(start_year)}_*.parquet"):
+                    if old_file != fact_file:
+                        old_file.unlink(missing_ok=True)
+        record.update(src.profiling.frame_stats(facts))
+    return facts
+
+
+def enrollment_facts(start_year:str, columns=None, keep=None) -> pd.DataFrame:
+    """
+    returns the enrollment fact table for ACADEMIC_YEAR start_year on
+
+    Arguments:
+        start_year - first ACADEMIC_YEAR
+        columns - list of fact table columns the page uses, all if None
+        keep - list of src.query_spec conditions on the rows the page uses,
+            all if None
+    """
+    facts = _enrollment_facts(start_year, data_version(start_year, tuple(ENROLLMENT_TABLES)))
+    # the table is shared by every selection, so it is filtered here rather
+    # than in SQL
+    rows = src.query_spec.mask(facts, keep) if keep else slice(None)
+    cols = slice(None) if columns is None else list(columns)
+    # each caller gets its own frame, a single copy of the kept rows and
+    # columns; the cached one stays shared
+    return facts.loc[rows, cols].copy()
+
+
+def course_facts(start_year:str) -> pd.DataFrame:
+    """
+    returns the course enrollment facts for ACADEMIC_YEAR start_year on
+    """
+    return _course_facts(start_year, data_version(start_year))
+
+
+@st.cache_data(max_entries=2)
+def _course_facts(start_year:str, version:tuple) -> pd.DataFrame:
+    """
+    version is only part of the cache key
+    """
+
+    sections = src.partitions.select("SECTIONS", 
+        fields=['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION',
+            'EVENT_MED_NAME', 'EVENT_LONG_NAME', 'EVENT_STATUS', 'PROGRAM', 'COLLEGE', 'DEPARTMENT', 'CURRICULUM',
+            'CREDITS', ],
+        where=f"ACADEMIC_SESSION in {tuple(COURSE_SESSIONS)} " +
+            "and EVENT_SUB_TYPE NOT in ('ACE', 'ADV', 'CELL', 'STAB') " +
+            "and ADDS>0 and EVENT_STATUS='A' and CREDITS > 0 ", 
+        year_start=start_year,
+        terms=COURSE_TERMS,
+        open_ttl=OPEN_TERMS_TTL,
+        )
+    sections = normalize_keys(sections)
+    sections = sections.loc[(~sections['EVENT_ID'].str.startswith('REG')) & 
+                            (~sections["EVENT_ID"].str.contains("STDY", case=False)) &
+                            (~sections['EVENT_SUB_TYPE'].isin(['ACE', 'ADV', 'CELL', 'STAB'])), :]
+
+    keep_flds = [
+        "ACADEMIC_YEAR",
+        "ACADEMIC_TERM",
+        "ACADEMIC_SESSION",
+        "EVENT_ID",
+        "COLLEGE",
+    ]
+    sections = ( sections.loc[:, keep_flds]
+        .sort_values(keep_flds)
+        .drop_duplicates(keep_flds, keep="last", )
+        .rename(columns={"COLLEGE": "crs_dept"})
+    )
+    sections = src.terms.add_col_ay(sections)
+
+    df = enrollment_facts(start_year,
+        columns=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION',
+            'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION', 'CREDIT', 'CREDIT_TYPE',
+            'yearterm', 'yearterm_sort', 'COLLEGE', 'CURRICULUM', 'PRIMARY_FLAG',
+            ],
+        )
+    # the SQL comparisons these replace are false for NULLs, so missing values are excluded
+    df = df.loc[df['ACADEMIC_SESSION'].isin(COURSE_SESSIONS) &
+                df['EVENT_SUB_TYPE'].notna() & (df['EVENT_SUB_TYPE'] != 'ADV') &
+                df['CREDIT_TYPE'].notna() & (df['CREDIT_TYPE'] != 'TRAN') &
+                (df['CREDIT'] > 0) &
+                ~(df["EVENT_ID"].str.contains("REG", case=False)) &
+                ~(df["EVENT_ID"].str.contains("STDY", case=False)), :]
+
+    # student department and program are only taken from the primary record;
+    # pages relabel their missing values, so they are plain strings
+    is_primary = (df['PRIMARY_FLAG'] == 'Y')
+    df['stu_dept'] = df['COLLEGE'].astype(object).where(is_primary)
+    df['stu_program'] = df['CURRICULUM'].astype(object).where(is_primary)
+    df = df.drop(['CREDIT_TYPE', 'COLLEGE', 'CURRICULUM', 'PRIMARY_FLAG'], axis='columns')
+
+    df = pd.merge(
+        df,
+        sections,
+        on=["EVENT_ID", "ACADEMIC_YEAR", "ACADEMIC_TERM", 'ACADEMIC_SESSION', ],
+        how="left",
+    )
+
+    return df
@@ -0,0 +1,220 @@
+"""Pooled SQL Server connections shared by the dashboard pages"""
+import datetime as dt
+import threading
+import time
+from contextlib import contextmanager
+import pandas as pd
+import streamlit as st
+
+# local connection information
+import local_db
+
+import src.profiling
+import src.single_flight
+
+# most connections open at once across all sessions
+POOL_MAX_SIZE = 8
+
+# idle connections are closed after this long
+POOL_MAX_IDLE = dt.timedelta(minutes=10)
+
+# idle connections are checked with HEALTH_CHECK_SQL before reuse after this long
+HEALTH_CHECK_AFTER = dt.timedelta(seconds=30)
+
+HEALTH_CHECK_SQL = "SELECT 1"
+
+# how long a page waits for a connection when the pool is exhausted
+ACQUIRE_TIMEOUT = dt.timedelta(seconds=60)
+
+
+def _close(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def is_healthy(conn) -> bool:
+    """
+    returns True if conn can still run HEALTH_CHECK_SQL
+    """
+    try:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(HEALTH_CHECK_SQL)
+            cursor.fetchall()
+        finally:
+            cursor.close()
+    except Exception:
+        return False
+    return True
+
+
+class ConnectionPool:
+    """Thread-safe pool of DB-API connections
+
+    Arguments:
+        connect - function returning a new connection
+        max_size - most connections open at once, in use or idle
+        max_idle - datetime.timedelta after which an idle connection is closed
+    """
+
+    def __init__(self, connect, max_size=POOL_MAX_SIZE, max_idle=POOL_MAX_IDLE):
+        self.connect = connect
+        self.max_size = max_size
+        self.max_idle = max_idle.total_seconds()
+        self._idle = []  # (connection, time returned to the pool), most recent last
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+    def _evict_idle(self, now):
+        expired = [c for c, t in self._idle if (now - t) > self.max_idle]
+        self._idle = [(c, t) for c, t in self._idle if (now - t) <= self.max_idle]
+        return expired
+
+    def acquire(self, timeout=ACQUIRE_TIMEOUT):
+        """
+        returns a healthy connection, reusing an idle one when possible
+        """
+        deadline = time.monotonic() + timeout.total_seconds()
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                expired = self._evict_idle(now)
+                if self._idle:
+                    conn, returned = self._idle.pop()
+                    self._in_use += 1
+                    check = (now - returned) > HEALTH_CHECK_AFTER.total_seconds()
+                elif self._in_use + len(self._idle) < self.max_size:
+                    conn = None
+                    self._in_use += 1
+                    check = False
+                else:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise TimeoutError(f"no database connection free after {timeout}")
+                    self._cond.wait(remaining)
+                    continue
+
+            for c in expired:
+                _close(c)
+
+            if conn is not None and check and not is_healthy(conn):
+                self._discard(conn)
+                continue
+            if conn is None:
+                try:
+                    conn = self.connect()
+                except BaseException:
+                    with self._cond:
+                        self._in_use -= 1
+                        self._cond.notify()
+                    raise
+            return conn
+
+    def release(self, conn):
+        """
+        returns conn to the pool
+        """
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def _discard(self, conn):
+        _close(conn)
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        context manager lending a pooled connection; a connection that fails
+        its health check after an error, or whose use was interrupted, is
+        closed instead of reused
+        """
+        conn = self.acquire()
+        healthy = True
+        try:
+            yield conn
+        except Exception:
+            healthy = is_healthy(conn)
+            raise
+        except BaseException:
+            # interrupted mid-query (e.g. a Streamlit rerun or stop), so the
+            # connection may still be busy
+            healthy = False
+            raise
+        finally:
+            # every way out gives the connection back, so _in_use never leaks
+            if healthy:
+                self.release(conn)
+            else:
+                self._discard(conn)
+
+    def close(self):
+        """
+        closes all idle connections
+        """
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for c, _ in idle:
+            _close(c)
+
+
+@st.cache_resource
+def pool() -> ConnectionPool:
+    """
+    returns the process-wide connection pool for local_db
+    """
+    return ConnectionPool(local_db.connection)
+
+
+def connection():
+    """
+    context manager lending a pooled local_db connection, e.g.
+
+        with src.db.connection() as conn:
+            df = pd.read_sql_query(sql_str, conn)
+    """
+    return pool().connection()
+
+
+# identical queries running at once share one result; each caller gets a copy
+_queries = src.single_flight.SingleFlight("db.read_sql_query", copy=lambda df: df.copy())
+
+
+def _read_sql_query(sql) -> pd.DataFrame:
+    with src.profiling.timed('sql', sql, cache='miss') as record:
+        with connection() as conn:
+            df = pd.read_sql_query(sql, conn)
+        record.update(src.profiling.frame_stats(df))
+    return df
+
+
+def read_sql_query(sql) -> pd.DataFrame:
+    """
+    returns pd.read_sql_query(sql) run on a pooled connection
+
+    A query that is already running for another session is not sent again;
+    this call waits for that result instead.
+    """
+    return _queries.do(sql, lambda: _read_sql_query(sql))
+
+
+def select(table, fields=None, where=None, distinct=False) -> pd.DataFrame:
+    """
+    same query as pc.select(), run on a pooled connection
+
+    Arguments:
+        table - PowerCampus table name
+        fields - list of fields to select, all fields if None
+        where - SQL where clause
+        distinct - select distinct rows
+    """
+    field_list = ", ".join(f"[{f}]" for f in fields) if fields else "*"
+    sql = f"SELECT {'DISTINCT ' if distinct else ''}{field_list} FROM dbo.[{table}]"
+    if where:
+        sql += f" WHERE {where}"
+    return read_sql_query(sql)
@@ -0,0 +1,354 @@
+"""Downloads of page tables, built only when they are downloaded
+
+download_buttons() writes buttons to download a table as CSV, gzip-compressed
+CSV or Parquet, and xlsx_download_button() a button for an Excel workbook of
+several tables. Each file is built when the user clicks its button, not on
+every rerun of the page. Workbooks are streamed row by row into a write-only
+openpyxl workbook, so building one takes about the memory of the finished file
+rather than of a full workbook model.
+
+While a page renders under page_tables(), the tables it offers are collected,
+and bundle_buttons() offers them all in one ZIP file of CSV or Parquet files.
+
+The bytes are cached under a key the page passes, made of the page, the table,
+its widget selections and the data version of its source tables, so the
+DataFrames themselves are never hashed. The cache holds at most
+EXPORT_CACHE_BYTES, dropping the least recently used files first.
+"""
+import collections
+import contextvars
+import datetime as dt
+import functools
+import gzip
+import io
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+import openpyxl
+import pyarrow as pa
+import streamlit as st
+
+import src.profiling
+import src.single_flight
+
+# file formats offered by download_buttons(): format -> (button label, file
+# name suffix, mime type)
+FORMATS = {
+    'csv': (None, '.csv', 'text/csv'),
+    'csv.gz': ("CSV (gzip)", '.csv.gz', 'application/gzip'),
+    'parquet': ("Parquet", '.parquet', 'application/vnd.apache.parquet'),
+}
+
+XLSX_MIME = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# export bytes kept in memory, across pages and sessions
+EXPORT_CACHE_BYTES = 256 * 1024**2
+
+# tables not covered by a page's data version (e.g. instructor emails) are at
+# most this stale in a cached file
+EXPORT_TTL = dt.timedelta(hours=1)
+
+# rows converted to Python values at a time for a workbook
+CHUNK_ROWS = 10_000
+
+# formats offered by bundle_buttons()
+BUNDLE_FORMATS = ('csv', 'parquet')
+
+# (df, name, key, index) of each table passed to download_buttons() while a
+# page renders under page_tables()
+_tables = contextvars.ContextVar("export_tables", default=None)
+
+
+class _ExportCache:
+    """Least recently used cache of export bytes, bounded in bytes
+
+    Arguments:
+        max_bytes - total size of the files kept
+        ttl - timedelta after which a file is built again
+    """
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._files = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        returns the bytes cached for key, or None
+        """
+        with self._lock:
+            entry = self._files.get(key)
+            if entry is None:
+                return None
+            expires, data = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                return None
+            self._files.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        """
+        caches data for key; files bigger than max_bytes are not cached
+        """
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._files:
+                self._remove(key)
+            self._files[key] = (time.monotonic() + self.ttl.total_seconds(), data)
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._files)))
+
+    def _remove(self, key):
+        _, data = self._files.pop(key)
+        self._bytes -= len(data)
+
+    def clear(self):
+        with self._lock:
+            self._files.clear()
+            self._bytes = 0
+
+
+_cache = _ExportCache(EXPORT_CACHE_BYTES, EXPORT_TTL)
+
+# sessions clicking the same download together build it once
+_builds = src.single_flight.SingleFlight('export')
+
+
+def clear():
+    """
+    empties the export cache
+    """
+    _cache.clear()
+
+
+def _rows(df):
+    """
+    yields the rows of df as tuples of Python values, None for missing values
+    """
+    for start in range(0, len(df), CHUNK_ROWS):
+        chunk = df.iloc[start:start + CHUNK_ROWS].astype(object)
+        chunk = chunk.where(chunk.notna(), None)
+        yield from chunk.itertuples(index=False, name=None)
+
+
+def write_xlsx(sheets, buffer):
+    """
+    writes a workbook with a sheet for each [df, sheet_name] in sheets to
+    buffer, without the DataFrame indexes as df.to_excel(index=False) does
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    for df, sheet_name in sheets:
+        ws = wb.create_sheet(title=sheet_name)
+        ws.append(df.columns.tolist())
+        for row in _rows(df):
+            ws.append(row)
+    wb.save(buffer)
+
+
+def _parquet_frame(df):
+    """
+    returns df with the string column names Parquet needs; MultiIndex column
+    labels are joined with spaces
+    """
+    df = df.copy(deep=False)
+    df.columns = [
+        " ".join(str(l) for l in c if str(l)) if isinstance(c, tuple) else str(c)
+        for c in df.columns
+    ]
+    return df
+
+
+def to_bytes(df, fmt, index=False) -> bytes:
+    """
+    returns df as a file of the given FORMATS format, with its index if index
+    """
+    if fmt == 'csv':
+        return df.to_csv(index=index).encode('utf-8')
+    if fmt == 'csv.gz':
+        # mtime=0 so the same table always gives the same bytes
+        return gzip.compress(df.to_csv(index=index).encode('utf-8'), compresslevel=6, mtime=0)
+    if fmt == 'parquet':
+        df = _parquet_frame(df)
+        buffer = io.BytesIO()
+        try:
+            df.to_parquet(buffer, index=index)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # object columns mixing types, e.g. numbers and labels in a pivot
+            buffer = io.BytesIO()
+            obj_cols = df.columns[df.dtypes == object]
+            df.astype({c: 'string' for c in obj_cols}).to_parquet(buffer, index=index)
+        return buffer.getvalue()
+    raise ValueError(f"unknown export format {fmt!r}")
+
+
+def _cached(key, file_name, rows, build) -> bytes:
+    """
+    returns the bytes cached for key, or build() after caching it; with key
+    None, build() is not cached
+    """
+    data = None if key is None else _cache.get(key)
+    if data is not None:
+        return data
+
+    def build_and_cache():
+        with src.profiling.timed('export', file_name, cache='miss', rows=rows) as record:
+            data = build()
+            record['bytes'] = len(data)
+        if key is not None:
+            _cache.put(key, data)
+        return data
+
+    if key is None:
+        return build_and_cache()
+    return _builds.do(key, build_and_cache)
+
+
+def _table(key, df, fmt, index, file_name) -> bytes:
+    return _cached(key and key + (fmt,), file_name, len(df), lambda: to_bytes(df, fmt, index))
+
+
+def write_zip(tables, fmt, buffer):
+    """
+    writes a ZIP file with a file of the given FORMATS format for each
+    (df, name, index) in tables to buffer, one table at a time
+
+    CSV files are streamed into the archive; Parquet files are built whole,
+    as Parquet writes its footer last.
+    """
+    _, suffix, _ = FORMATS[fmt]
+    names = set()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for df, name, index in tables:
+            # tables with the same name get a number
+            unique, n = name, 1
+            while unique in names:
+                n += 1
+                unique = f"{name}_{n}"
+            names.add(unique)
+            if fmt == 'csv':
+                with zf.open(unique + suffix, 'w') as f, io.TextIOWrapper(f, encoding='utf-8', newline='') as text:
+                    df.to_csv(text, index=index)
+            else:
+                zf.writestr(unique + suffix, to_bytes(df, fmt, index))
+
+
+def _zip(key, tables, fmt, file_name) -> bytes:
+    def build():
+        buffer = io.BytesIO()
+        write_zip(tables, fmt, buffer)
+        return buffer.getvalue()
+    return _cached(key and key + (fmt,), file_name, sum(len(df) for df, _, _ in tables), build)
+
+
+def _xlsx(key, sheets, file_name) -> bytes:
+    def build():
+        buffer = io.BytesIO()
+        write_xlsx(sheets, buffer)
+        return buffer.getvalue()
+    return _cached(key and key + ('xlsx',), file_name, sum(len(df) for df, _ in sheets), build)
+
+
+def download_buttons(df, key, file_name, label="Download data as CSV", index=False, formats=tuple(FORMATS)):
+    """
+    writes a row of download buttons for df, one per format, each built when
+    it is clicked
+
+    Arguments:
+        df - DataFrame to download
+        key - tuple of hashable values identifying the contents of df: the
+            page, the table, the page's widget selections and the data
+            version of its source tables; None for tables read live, which
+            are built again on every click
+        file_name - name of the downloaded CSV file; the other formats
+            replace its .csv suffix
+        label - label of the CSV button
+        index - True to write the index of df as well
+        formats - FORMATS formats offered
+    """
+    stem = file_name.removesuffix('.csv')
+    tables = _tables.get()
+    if tables is not None:
+        tables.append((df, stem, key, index))
+    with st.container(horizontal=True):
+        for fmt in formats:
+            fmt_label, suffix, mime = FORMATS[fmt]
+            st.download_button(
+                label=fmt_label or label,
+                data=functools.partial(_table, key, df, fmt, index, stem + suffix),
+                file_name=stem + suffix,
+                mime=mime,
+            )
+
+
+def xlsx_download_button(label, sheets, key, file_name):
+    """
+    writes a download button for an Excel workbook with a sheet for each
+    [df, sheet_name] in sheets, built when the button is clicked
+
+    Arguments:
+        label - button label
+        sheets - list of [df, sheet_name]
+        key - tuple identifying the contents of sheets: the page, its widget
+            selections and the data version of its source tables
+        file_name - name of the downloaded file
+    """
+    st.download_button(
+        label=label,
+        data=functools.partial(_xlsx, key, sheets, file_name),
+        file_name=file_name,
+        mime=XLSX_MIME,
+    )
+
+
+@contextmanager
+def page_tables():
+    """
+    context manager collecting the tables download_buttons() offers while a
+    page renders; yields the list of (df, name, key, index) for
+    bundle_buttons()
+    """
+    tables = []
+    token = _tables.set(tables)
+    try:
+        yield tables
+    finally:
+        _tables.reset(token)
+
+
+def bundle_buttons(page_name, tables, formats=BUNDLE_FORMATS):
+    """
+    writes download buttons for one ZIP file of all the tables of a page, one
+    per format, each built when it is clicked; nothing for pages with fewer
+    than two tables
+
+    Arguments:
+        page_name - page module name, used for the file name
+        tables - list of (df, name, key, index) from page_tables()
+        formats - FORMATS formats offered
+    """
+    if len(tables) < 2:
+        return
+    keys = [key for _, _, key, _ in tables]
+    # tables read live make the whole bundle live
+    key = None if None in keys else ('bundle', page_name) + tuple(keys)
+    contents = [(df, name, index) for df, name, _, index in tables]
+    today_str = dt.datetime.today().strftime("%Y%m%d_%H%M")
+
+    st.markdown("---")
+    st.write(f"#### All {len(tables)} tables on this page")
+    with st.container(horizontal=True):
+        for fmt in formats:
+            fmt_label = "CSV" if fmt == 'csv' else FORMATS[fmt][0]
+            file_name = f"{page_name}_{fmt.replace('.', '_')}_{today_str}.zip"
+            st.download_button(
+                label=f"Download all tables as .zip of {fmt_label} files",
+                data=functools.partial(_zip, key, contents, fmt, file_name),
+                file_name=file_name,
+                mime='application/zip',
+            )
@@ -0,0 +1,63 @@
+"""Concurrent fetch of independent PowerCampus tables
+
+fetch() runs the table pulls a page needs at the same time on a bounded
+thread pool instead of one after another, so the page waits for about the
+slowest pull rather than the sum of them. Pulls made with src.db each borrow
+their own pooled connection, and src.db.POOL_MAX_SIZE still bounds the
+connections open across all sessions.
+
+Each pull runs with the page's profiling context and Streamlit script context,
+so its timings show up under the page and its caches behave as they do in the
+script thread.
+"""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+import src.db
+import src.profiling
+
+# most pulls of one fetch() running at once; half the connection pool, so
+# two sessions fetching together do not wait on each other
+FETCH_WORKERS = max(1, src.db.POOL_MAX_SIZE // 2)
+
+
+def _attach(ctx):
+    add_script_run_ctx(ctx=ctx)
+
+
+def fetch(pulls, max_workers=FETCH_WORKERS) -> dict:
+    """
+    returns {name: result} of each name: function in pulls, called
+    concurrently, e.g.
+
+        tables = src.fetch.fetch({
+            'people': functools.partial(src.db.select, 'PEOPLE', fields=['PEOPLE_CODE_ID']),
+            'code_day': functools.partial(src.db.select, 'CODE_DAY'),
+        })
+
+    An exception raised by a pull is raised here once the other pulls finish.
+
+    Arguments:
+        pulls - dict of name: function with no arguments, for independent pulls
+        max_workers - most pulls running at once
+    """
+    if len(pulls) <= 1:
+        return {name: pull() for name, pull in pulls.items()}
+
+    ctx = get_script_run_ctx(suppress_warning=True)
+    with src.profiling.timed('fetch', ", ".join(pulls)) as record:
+        with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(pulls)),
+            thread_name_prefix="fetch",
+            initializer=_attach if ctx is not None else None,
+            initargs=(ctx,) if ctx is not None else (),
+        ) as executor:
+            # each pull gets its own copy of the page's context variables
+            futures = {
+                name: executor.submit(contextvars.copy_context().run, pull)
+                for name, pull in pulls.items()
+            }
+        results = {name: future.result() for name, future in futures.items()}
+        record['rows'] = sum(len(r) for r in results.values() if hasattr(r, '__len__'))
+    return results
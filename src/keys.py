@@ -0,0 +1,61 @@
+"""Typed key columns for PowerCampus frames
+
+Key columns are stored as categoricals, and composite keys (a section, a
+student's registration, a room and day) are int64 codes built from the
+columns' codes rather than strings concatenated row by row, so merges,
+drop_duplicates and counts on them compare integers. As with concatenated
+strings, a composite key is missing when any of its parts is, so count() and
+groupby() leave such rows out.
+"""
+import numpy as np
+import pandas as pd
+
+# PowerCampus columns converted to categoricals on load; ACADEMIC_YEAR stays a
+# string because pages compare it with >= and <=, which an unordered
+# categorical refuses
+KEY_COLUMNS = ['ACADEMIC_TERM', 'ACADEMIC_SESSION', 'EVENT_ID', 'EVENT_SUB_TYPE',
+    'SECTION', 'PEOPLE_CODE_ID', 'BUILDING_CODE', 'ROOM_ID']
+
+
+def categorize(df, columns=KEY_COLUMNS) -> pd.DataFrame:
+    """
+    returns df with the given key columns it has converted to categoricals
+    """
+    columns = [c for c in columns if c in df.columns]
+    df[columns] = df[columns].astype('category')
+    return df
+
+
+def _codes(values):
+    """
+    returns integer codes for a column, 0 for missing values, and the number of
+    distinct codes
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy().astype('int64') + 1, len(values.cat.categories) + 1
+    codes, uniques = pd.factorize(values)
+    return codes.astype('int64') + 1, len(uniques) + 1
+
+
+def composite_key(df, columns) -> pd.Series:
+    """
+    returns an Int64 key that is equal for two rows exactly when their values
+    in columns are equal, and <NA> where any of the columns is missing
+
+    Arguments:
+        df - DataFrame
+        columns - list of key columns, e.g. ['EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION']
+    """
+    key = np.zeros(len(df), dtype='int64')
+    missing = np.zeros(len(df), dtype=bool)
+    size = 1
+    for col in columns:
+        codes, n = _codes(df[col])
+        missing |= (codes == 0)
+        if size * n >= 2**62:
+            # renumber the key so far before it can overflow
+            key, uniques = pd.factorize(key)
+            size = len(uniques)
+        key = key * n + codes
+        size = size * n
+    return pd.Series(pd.arrays.IntegerArray(key, missing), index=df.index)
@@ -0,0 +1,108 @@
+"""In-class occupancy counts over time bins"""
+import numpy as np
+import pandas as pd
+
+# class meeting times are stored as times on this day
+SAMPLE_DAY = pd.Timestamp('1900-01-01')
+
+DAY_START = '06:00'
+DAY_END = '22:00'
+
+BIN_MINUTES = [5, 10, 15]
+
+
+def time_bins(bin_minutes=15, day_start=DAY_START, day_end=DAY_END) -> pd.DatetimeIndex:
+    """
+    returns the sample times from day_start to day_end (inclusive) every bin_minutes
+    """
+    return pd.date_range(
+        start=SAMPLE_DAY + pd.Timedelta(f"{day_start}:00"),
+        end=SAMPLE_DAY + pd.Timedelta(f"{day_end}:00"),
+        freq=f"{bin_minutes}min",
+    )
+
+
+def occupancy(meetings, entity, by, start='START_TIME', end='END_TIME',
+        bin_minutes=15, day_start=DAY_START, day_end=DAY_END) -> pd.DataFrame:
+    """
+    returns the number of distinct entities in class at each sample time, by group
+
+    A meeting counts at sample time t when start <= t <= end. The result has the
+    by columns, 'time' ('%H:%M') and 'count', sorted by group and time, with a
+    row for every sample time covered by at least one meeting (count is 0 when
+    those meetings have no entity, e.g. sections with no students).
+
+    Each meeting becomes a range of bin indexes; an entity's overlapping ranges
+    within a group are merged so it is counted once, and the counts come from a
+    difference array and cumsum, so the cost does not grow with bin count per
+    meeting.
+
+    Arguments:
+        meetings - DataFrame with one row per meeting
+        entity - column counted once per sample time, e.g. 'PEOPLE_CODE_ID'
+        by - list of group columns, e.g. ['DAY']
+        bin_minutes - minutes between sample times
+    """
+    by = list(by)
+    bins = time_bins(bin_minutes, day_start, day_end)
+    columns = by + ['time', 'count']
+
+    t0 = bins[0].value
+    step = pd.Timedelta(minutes=bin_minutes).value
+    n_bins = len(bins)
+
+    starts = pd.to_datetime(meetings[start], errors='coerce')
+    ends = pd.to_datetime(meetings[end], errors='coerce')
+    valid = (starts.notna() & ends.notna() & meetings[by].notna().all(axis=1)).to_numpy()
+    if not valid.any():
+        return pd.DataFrame(columns=columns)
+
+    start_ns = starts.to_numpy()[valid].astype('datetime64[ns]').astype('int64') - t0
+    end_ns = ends.to_numpy()[valid].astype('datetime64[ns]').astype('int64') - t0
+    # first and last sample times inside each meeting
+    lo = np.clip(-(-start_ns // step), 0, None)
+    hi = np.clip(end_ns // step, None, n_bins - 1)
+    in_day = lo <= hi
+    if not in_day.any():
+        return pd.DataFrame(columns=columns)
+
+    groups = meetings.loc[valid, by].loc[in_day]
+    # group codes follow the sorted by columns, so the output does too
+    group_codes = groups.groupby(by, sort=True).ngroup().to_numpy()
+    group_keys = ( groups.assign(group_code=group_codes)
+                    .drop_duplicates('group_code')
+                    .sort_values('group_code')
+                    .loc[:, by]
+                    .reset_index(drop=True)
+    )
+    n_groups = len(group_keys)
+    lo, hi = lo[in_day], hi[in_day]
+    entities = meetings.loc[valid, entity].to_numpy()[in_day]
+
+    def counts(g, lo, hi):
+        diff = np.zeros((n_groups, n_bins + 1), dtype='int64')
+        np.add.at(diff, (g, lo), 1)
+        np.add.at(diff, (g, hi + 1), -1)
+        return diff.cumsum(axis=1)[:, :n_bins]
+
+    # merge each entity's overlapping ranges within a group
+    has_entity = pd.notna(entities)
+    entity_codes = pd.factorize(entities[has_entity])[0]
+    g, e = group_codes[has_entity], entity_codes
+    l, h = lo[has_entity], hi[has_entity]
+    order = np.lexsort((l, e, g))
+    g, e, l, h = g[order], e[order], l[order], h[order]
+    same = np.r_[False, (g[1:] == g[:-1]) & (e[1:] == e[:-1])]
+    run_hi = pd.Series(h).groupby(np.cumsum(~same)).cummax().to_numpy()
+    starts_run = ~same | (l > np.r_[-1, run_hi[:-1]])
+    run_id = np.cumsum(starts_run) - 1
+    merged_hi = pd.Series(h).groupby(run_id).max().to_numpy()
+    entity_count = counts(g[starts_run], l[starts_run], merged_hi)
+
+    covered = counts(group_codes, lo, hi) > 0
+
+    gi, bi = np.nonzero(covered)
+    result = group_keys.iloc[gi].reset_index(drop=True)
+    result['time'] = bins[bi].strftime('%H:%M')
+    result['count'] = entity_count[gi, bi]
+    return result.loc[:, columns]
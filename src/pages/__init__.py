@@ -1,3 +1,18 @@
+import importlib
+
+import src.export
+import src.profiling
+
+
+def load_page(name):
+    """Imports the page module `src.pages.<name>` on first use
+    Page modules are only imported when they are selected in the sidebar, so a
+    cold start pays for one page instead of all of them. Python caches the
+    module in `sys.modules`, so later selections are free.
+    Arguments:
+        name {str} -- Module name of the page, e.g. 'registrar_class_times'
+    """
+    return importlib.import_module(f"{__name__}.{name}")
 
 
 def write_page(page):  # pylint: disable=redefined-outer-name
@@ -7,4 +22,8 @@ def write_page(page):  # pylint: disable=redefined-outer-name
         page {module} -- A module with a 'def write():' function
     """
     # _reload_module(page)
-    page.write()
+    name = page.__name__.rsplit(".", 1)[-1]
+    with src.profiling.page(name), src.export.page_tables() as tables:
+        page.write()
+    # one download of every table the page offered
+    src.export.bundle_buttons(name, tables)
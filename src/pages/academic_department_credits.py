@@ -3,136 +3,13 @@ import streamlit as st
 import altair as alt
 import datetime as dt
 import src.pages.components
-
-# PowerCampus utilities
-import powercampus as pc
-
-@st.cache_data
-def convert_df(df):
-    return df.to_csv(index=False).encode('utf-8')
-
-
-# @st.cache_data
-def course_df(start_year:str) -> pd.DataFrame:
-
-    sections = pc.select("SECTIONS", 
-        fields=['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION',
-            'EVENT_MED_NAME', 'EVENT_LONG_NAME', 'EVENT_STATUS', 'PROGRAM', 'COLLEGE', 'DEPARTMENT', 'CURRICULUM',
-            'CREDITS', ],
-        where=f"ACADEMIC_YEAR>='{int(start_year)}' " +
-            "and ACADEMIC_TERM in ('FALL', '10-Week_1', '10-Week_2', 'SPRING', 'SUMMER', '10-Week_3', '10-Week_4' ) " +
-            "and ACADEMIC_SESSION in ('MAIN', 'CULN', 'EXT', 'FNRR', 'HEOP', 'SLAB', 'BLOCK A', 'BLOCK AB', 'BLOCK B' ) " +
-            "and EVENT_SUB_TYPE NOT in ('ACE', 'ADV', 'CELL', 'STAB') " +
-            "and ADDS>0 and EVENT_STATUS='A' and CREDITS > 0 ", 
-        )
-    sections['ACADEMIC_TERM'] = sections['ACADEMIC_TERM'].str.upper()
-    sections['ACADEMIC_SESSION'] = sections['ACADEMIC_SESSION'].str.upper()
-    sections['EVENT_ID'] = sections['EVENT_ID'].str.upper()
-    sections['EVENT_SUB_TYPE'] = sections['EVENT_SUB_TYPE'].str.upper()
-    sections = sections.loc[(~sections['EVENT_ID'].str.startswith('REG')) & 
-                            (~sections["EVENT_ID"].str.contains("STDY", case=False)) &
-                            (~sections['EVENT_SUB_TYPE'].isin(['ACE', 'ADV', 'CELL', 'STAB'])), :]
-    sections = sections.drop_duplicates(['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION'])
-    sections = sections.sort_values(['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION'])
-
-    keep_flds = [
-        "ACADEMIC_YEAR",
-        "ACADEMIC_TERM",
-        "ACADEMIC_SESSION",
-        "EVENT_ID",
-        "COLLEGE",
-    ]
-    sections = ( sections.loc[:, keep_flds]
-        .sort_values(keep_flds)
-        .drop_duplicates(keep_flds, keep="last", )
-        .rename(columns={"COLLEGE": "crs_dept"})
-    )
-    ay_func = ( lambda r: r['ACADEMIC_YEAR'] 
-                if r['ACADEMIC_TERM'] in ['FALL', '10-WEEK_1', '10-WEEK_2']
-                else str(int(r["ACADEMIC_YEAR"]) - 1)
-        )
-    sections['ay'] = sections.apply(ay_func, axis=1)
-    sections['ay_label'] = sections['ay'] + '-' + (sections['ay'].astype(int) + 1 ).astype('string')
-
-    transcriptdetail = pc.select("TRANSCRIPTDETAIL",
-        fields=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION',
-            'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION', 'CREDIT',
-            ],
-        where=f"ACADEMIC_YEAR>='{int(start_year)}' " +
-            "and ACADEMIC_TERM in ('FALL', '10-Week_1', '10-Week_2', 'SPRING', 'SUMMER', '10-Week_3', '10-Week_4' ) " +
-            "and ACADEMIC_SESSION in ('MAIN', 'CULN', 'EXT', 'FNRR', 'HEOP', 'SLAB', 'BLOCK A', 'BLOCK AB', 'BLOCK B' ) " +
-            "and EVENT_SUB_TYPE NOT IN ('ADV') " +
-            "and ADD_DROP_WAIT = 'A' and CREDIT > 0 and CREDIT_TYPE <> 'TRAN' ", 
-    )
-    transcriptdetail['ACADEMIC_SESSION'] = transcriptdetail['ACADEMIC_SESSION'].str.upper()
-    transcriptdetail['ACADEMIC_TERM'] = transcriptdetail['ACADEMIC_TERM'].str.upper()
-    transcriptdetail['EVENT_ID'] = transcriptdetail['EVENT_ID'].str.rstrip().str.upper()
-
-    df = pd.merge(
-        transcriptdetail,
-        sections,
-        on=["EVENT_ID", "ACADEMIC_YEAR", "ACADEMIC_TERM", 'ACADEMIC_SESSION', ],
-        how="left",
-    )
-
-    df["yearterm"] = df["ACADEMIC_YEAR"] + "." + df["ACADEMIC_TERM"].str.title()
-    df = df.loc[~(df["EVENT_ID"].str.contains("REG", case=False)) & ~(df["EVENT_ID"].str.contains("STDY", case=False))]
-    df = pc.add_col_yearterm_sort(df)
-
-    academic = pc.select("ACADEMIC", 
-        fields=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 
-            'PROGRAM', 'DEGREE', 'CURRICULUM', 
-            'COLLEGE', 'DEPARTMENT', 'CREDITS',
-            ],
-        where=f"ACADEMIC_YEAR>='{int(start_year)}' " +
-            "and ACADEMIC_TERM IN ('FALL', '10-Week_1', '10-Week_2', 'SPRING', 'SUMMER', '10-Week_3', '10-Week_4' ) " +
-            "and ACADEMIC_SESSION='' and PRIMARY_FLAG='Y' " +
-            "and CURRICULUM NOT IN ('ADVST') and CREDITS > 0 ", 
-        )
-    academic['ACADEMIC_TERM'] = academic['ACADEMIC_TERM'].str.upper()
-    academic['ACADEMIC_SESSION'] = academic['ACADEMIC_SESSION'].str.upper()
-
-    keep_flds = [
-        "ACADEMIC_YEAR",
-        "ACADEMIC_TERM",
-        "ACADEMIC_SESSION",
-        "PEOPLE_CODE_ID",
-        "COLLEGE",
-        "CURRICULUM",
-    ]
-    academic = ( academic.loc[:, keep_flds]
-        .sort_values(keep_flds)
-        .drop_duplicates(keep_flds, keep="last", )
-        .rename(
-            columns={
-                "COLLEGE": "stu_dept",
-                "CURRICULUM": "stu_program",
-                }
-                )
-        .drop(
-            ['ACADEMIC_SESSION'],
-            axis='columns',
-        )
-    )
-
-    df = pd.merge(
-        df,
-        academic,
-        on=["PEOPLE_CODE_ID", "ACADEMIC_YEAR", "ACADEMIC_TERM"],
-        how="left",
-    )
-
-    return df
+import src.export
+import src.terms
+import src.course_facts
 
 
 start_year = '2012'
 
-current_yt_df = pc.current_yearterm()
-current_term = current_yt_df['term'].iloc[0]
-current_year = current_yt_df['year'].iloc[0]
-current_yt = current_yt_df['yearterm'].iloc[0]
-current_yt_sort = current_yt_df['yearterm_sort'].iloc[0]
-
 
 def write():
     """Used to write the page in the app.py file"""
@@ -144,34 +21,24 @@ def write():
 """
         )
 
+        current = src.terms.current_term()
+
         today = dt.datetime.today()
         today_str = today.strftime("%Y%m%d_%H%M")
 
-        calendar = pc.select("ACADEMICCALENDAR",
-            fields=['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 
-                'START_DATE', 'END_DATE', 'FINAL_END_DATE' ], 
-            where=f"ACADEMIC_YEAR>='{start_year}' AND ACADEMIC_TERM IN ('FALL', 'SPRING', 'SUMMER')", 
-            distinct=True
-            )
-        calendar = pc.add_col_yearterm(calendar)
-        calendar = pc.add_col_yearterm_sort(calendar)
-        term_df = ( calendar.drop_duplicates(['yearterm_sort', 'yearterm'])
-                        .sort_values(['yearterm_sort'], ascending=True)
-                        .loc[:,['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'yearterm_sort', 'yearterm']]
-        )
-        term_df = term_df.set_index('yearterm')
-
-        year_list = term_df['ACADEMIC_YEAR'].unique().tolist()
-        year_list = [y for y in year_list if ((y>=start_year) and (y<=current_year))]
+        year_list = src.terms.years(start_year, current.year)
         year_start, year_end = st.select_slider(
             "Select range of years:",
             options=year_list,
-            value=('2016', current_year)
+            value=('2016', current.year)
         )
 
         if year_start and year_end:
 
-            df = course_df(start_year)
+            # identifies the tables below in the export cache
+            export_key = ('academic_department_credits', year_start, year_end, src.course_facts.data_version(start_year))
+
+            df = src.course_facts.course_facts(start_year)
             df0 = ( df.loc[(df['ACADEMIC_YEAR']>=year_start) & (df['ACADEMIC_YEAR']<=year_end)]
                     .rename(columns={"crs_dept": "department"})
             )
@@ -207,11 +74,10 @@ def write():
                 .sort_values(['yearterm'], key=yt_sorter)
             )
             st.dataframe(df1)
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(df1),
+            src.export.download_buttons(
+                df1,
+                key=export_key + ('term_total_credits',),
                 file_name=f"{year_start}-{year_end}_term_total_credits.csv",
-                mime='text/csv',
             )
 
             c1 = alt.Chart(df1.reset_index()).mark_bar().encode(
@@ -237,11 +103,10 @@ def write():
             ).loc[:,['yearterm', 'department', 'dept_credit', 'total_credit' ]]
             df2['dept_pct'] = df2['dept_credit'] / df2['total_credit'] * 100.0
             st.dataframe(df2)
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(df2),
+            src.export.download_buttons(
+                df2,
+                key=export_key + ('term_department_credits',),
                 file_name=f"{year_start}-{year_end}_term_department_credits.csv",
-                mime='text/csv',
             )
             c2 = alt.Chart(df2).transform_calculate(
                     PercentOfTotal="datum.dept_credit / datum.total_credit",
@@ -280,11 +145,10 @@ def write():
             ).loc[:,['ay_label', 'department', 'dept_credit', 'total_credit' ]]
             df3['dept_pct'] = df3['dept_credit'] / df3['total_credit'] * 100.0
             st.dataframe(df3)
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(df3),
+            src.export.download_buttons(
+                df3,
+                key=export_key + ('ay_department_credits',),
                 file_name=f"{year_start}-{year_end}_ay_department_credits.csv",
-                mime='text/csv',
             )
             c3 = alt.Chart(df3).transform_calculate(
                     PercentOfTotal="datum.dept_credit / datum.total_credit",
@@ -323,11 +187,10 @@ def write():
                             .astype('int')
             )
             st.dataframe(df6_pivot)
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(df6_pivot.reset_index()),
+            src.export.download_buttons(
+                df6_pivot.reset_index(),
+                key=export_key + ('ay_department_student_credits',),
                 file_name=f"{year_start}-{year_end}_ay_department_student_credits.csv",
-                mime='text/csv',
             )
             st.write("##### Department Teaching - Percentge")
             st.write("Teaching Department in rows; Student Departments in columns.")
@@ -336,11 +199,10 @@ def write():
                             # .astype('int')
             )
             st.dataframe(df6_pivot_pct)
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(df6_pivot_pct.reset_index()),
+            src.export.download_buttons(
+                df6_pivot_pct.reset_index(),
+                key=export_key + ('ay_department_student_credits_pct',),
                 file_name=f"{year_start}-{year_end}_ay_department_student_credits_pct.csv",
-                mime='text/csv',
             )
             c4 = alt.Chart(df6).transform_calculate(
                     PercentOfTotal="datum.stu_credit / datum.dept_credit",
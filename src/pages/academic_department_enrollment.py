@@ -3,17 +3,23 @@ import streamlit as st
 import altair as alt
 import datetime as dt
 import src.pages.components
+import src.export
+import src.terms
+import src.course_facts
 
 # PowerCampus utilities
 import powercampus as pc
 
-@st.cache_data
-def convert_df(df):
-    return df.to_csv(index=False).encode('utf-8')
 
+DEPARTMENT_TABLES = ('ACADEMIC',)
 
-@st.cache_data
-def academic_df(start_year:str) -> pd.DataFrame:
+
+@st.cache_data(max_entries=2)
+def academic_df(start_year:str, version:tuple) -> pd.DataFrame:
+    """
+    returns students' primary records from start_year on; version is only
+    part of the cache key
+    """
 
     academic = pc.select("ACADEMIC", 
         fields=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 
@@ -40,12 +46,7 @@ def academic_df(start_year:str) -> pd.DataFrame:
         .drop_duplicates(keep_flds, keep="last", )
         .rename(columns={"COLLEGE": "stu_dept"})
     )
-    ay_func = ( lambda r: r['ACADEMIC_YEAR'] 
-                if r['ACADEMIC_TERM'] in ['FALL', '10-WEEK_1', '10-WEEK_2']
-                else str(int(r["ACADEMIC_YEAR"]) - 1)
-        )
-    academic['ay'] = academic.apply(ay_func, axis=1)
-    academic['ay_label'] = academic['ay'] + '-' + (academic['ay'].astype(int) + 1 ).astype('string')
+    academic = src.terms.add_col_ay(academic)
 
     academic = pc.add_col_yearterm(academic)
     academic = pc.add_col_yearterm_sort(academic)
@@ -56,12 +57,6 @@ def academic_df(start_year:str) -> pd.DataFrame:
 
 start_year = '2012'
 
-current_yt_df = pc.current_yearterm()
-current_term = current_yt_df['term'].iloc[0]
-current_year = current_yt_df['year'].iloc[0]
-current_yt = current_yt_df['yearterm'].iloc[0]
-current_yt_sort = current_yt_df['yearterm_sort'].iloc[0]
-
 
 def write():
     """Used to write the page in the app.py file"""
@@ -73,34 +68,26 @@ def write():
 """
         )
 
+        current = src.terms.current_term()
+
         today = dt.datetime.today()
         today_str = today.strftime("%Y%m%d_%H%M")
 
-        calendar = pc.select("ACADEMICCALENDAR",
-            fields=['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 
-                'START_DATE', 'END_DATE', 'FINAL_END_DATE' ], 
-            where=f"ACADEMIC_YEAR>='{start_year}' AND ACADEMIC_TERM IN ('FALL', 'SPRING', 'SUMMER')", 
-            distinct=True
-            )
-        calendar = pc.add_col_yearterm(calendar)
-        calendar = pc.add_col_yearterm_sort(calendar)
-        term_df = ( calendar.drop_duplicates(['yearterm_sort', 'yearterm'])
-                        .sort_values(['yearterm_sort'], ascending=True)
-                        .loc[:,['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'yearterm_sort', 'yearterm']]
-        )
-        term_df = term_df.set_index('yearterm')
-
-        year_list = term_df['ACADEMIC_YEAR'].unique().tolist()
-        year_list = [y for y in year_list if ((y>=start_year) and (y<=current_year))]
+        year_list = src.terms.years(start_year, current.year)
         year_start, year_end = st.select_slider(
             "Select range of years:",
             options=year_list,
-            value=('2014', current_year)
+            value=('2014', current.year)
         )
 
         if year_start and year_end:
 
-            df = academic_df(start_year)
+            version = src.course_facts.data_version(start_year, DEPARTMENT_TABLES)
+
+            # identifies the tables below in the export cache
+            export_key = ('academic_department_enrollment', year_start, year_end, version)
+
+            df = academic_df(start_year, version)
             df0 = ( df.loc[(df['ACADEMIC_YEAR']>=year_start) & (df['ACADEMIC_YEAR']<=year_end)]
                     .rename(columns={"stu_dept": "department"})
             )
@@ -132,11 +119,10 @@ def write():
                 .sort_values(['yearterm'], key=yt_sorter)
             )
             st.dataframe(df1)
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(df1),
+            src.export.download_buttons(
+                df1,
+                key=export_key + ('PSC_term__enrollment',),
                 file_name=f"{year_start}-{year_end}_PSC_term__enrollment.csv",
-                mime='text/csv',
             )
 
             c1 = alt.Chart(df1.reset_index()).mark_bar().encode(
@@ -162,11 +148,10 @@ def write():
             ).loc[:,['yearterm', 'department', 'students', 'total_students' ]]
             df2['dept_pct'] = df2['students'] / df2['total_students'] * 100.0
             st.dataframe(df2)
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(df2),
+            src.export.download_buttons(
+                df2,
+                key=export_key + ('department_term_students',),
                 file_name=f"{year_start}-{year_end}_department_term_students.csv",
-                mime='text/csv',
             )
             c2 = alt.Chart(df2).transform_calculate(
                     PercentOfTotal="datum.students / datum.total_students",
@@ -205,11 +190,10 @@ def write():
             ).loc[:,['ay_label', 'department', 'dept_students', 'total_students' ]]
             df3['dept_pct'] = df3['dept_students'] / df3['total_students'] * 100.0
             st.dataframe(df3)
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(df3),
+            src.export.download_buttons(
+                df3,
+                key=export_key + ('ay_department_enrollment',),
                 file_name=f"{year_start}-{year_end}_ay_department_enrollment.csv",
-                mime='text/csv',
             )
             c3 = alt.Chart(df3).transform_calculate(
                     PercentOfTotal="datum.dept_students / datum.total_students",
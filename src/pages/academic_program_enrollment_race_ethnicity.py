@@ -1,17 +1,13 @@
 import pandas as pd
 import streamlit as st
 import altair as alt
-from pathlib import Path
 import src.pages.components
+import src.export
+import src.census
 
 
 # begin_year = '2014'
 
-@st.cache_data
-def convert_df(df):
-    # IMPORTANT: Cache the conversion to prevent computation on every rerun
-    return df.to_csv().encode('utf-8')
-
 
 def write():
     """Used to write the page in the app.py file"""
@@ -24,13 +20,7 @@ def write():
 """
         )
 
-        data_path = Path(r"F:\Data\Census\CensusDatabase")
-        data_file = data_path / "census_db.arr"
-
-        df = (
-            pd.read_feather(data_file)
-            .sort_values(['yearterm_sort', 'curriculum', 'updated_ethnicity_code', 'people_code_id'])
-        )
+        df = src.census.enrollment_counts(['curriculum', 'updated_ethnicity_code'])
         df.loc[df['curriculum']=='', 'curriculum']='UNDM'
         df['curriculum'] = df['curriculum'].fillna('UNDM')
         df.loc[df['updated_ethnicity_code']=='', 'updated_ethnicity_code']='U'
@@ -56,11 +46,11 @@ def write():
         if program and terms:
             selected_df = (
                 df.loc[(df['curriculum']==program) & (df['current_yearterm'].isin(terms)), 
-                ['current_yearterm', 'yearterm_sort', 'curriculum', 'updated_ethnicity_code', 'people_code_id']]
+                ['current_yearterm', 'yearterm_sort', 'curriculum', 'updated_ethnicity_code', 'count']]
                 .groupby(['yearterm_sort', 'current_yearterm', 'curriculum', 'updated_ethnicity_code'])
-                .count()
+                .sum()
                 .reset_index()
-                .rename(columns={'people_code_id': 'count', 'current_yearterm': 'yearterm', 'curriculum': 'program'})
+                .rename(columns={'current_yearterm': 'yearterm', 'curriculum': 'program'})
                 .sort_values(['yearterm_sort', 'program', 'updated_ethnicity_code'])
                 .astype({'count': 'UInt16'})
             )
@@ -75,11 +65,11 @@ def write():
 
             st.dataframe(program_enrollment)
 
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(program_enrollment),
+            src.export.download_buttons(
+                program_enrollment,
+                key=('academic_program_enrollment_race_ethnicity', 'academic_program_enrollment_race_ethnicity', program, tuple(terms), src.census.data_version()),
                 file_name=f'{program}_academic_program_enrollment_race_ethnicity.csv',
-                mime='text/csv',
+                index=True,
             )
 
             col1, col2 = st.columns(2)
@@ -3,17 +3,20 @@ import streamlit as st
 import altair as alt
 import datetime as dt
 import src.pages.components
+import src.export
+import src.terms
+import src.partitions
 
 # PowerCampus utilities
 import powercampus as pc
 
-@st.cache_data
-def convert_df(df):
-    return df.to_csv(index=False).encode('utf-8')
 
-
-@st.cache_data
-def grads_df(begin_date:dt.datetime) -> pd.DataFrame:
+@st.cache_data(max_entries=2)
+def grads_df(begin_date:dt.datetime, version:tuple) -> pd.DataFrame:
+    """
+    returns the degrees earned from begin_date on; version is only part of
+    the cache key
+    """
 
     transcriptdegree = pc.select("TRANSCRIPTDEGREE",
         fields=['PEOPLE_CODE_ID', 'PROGRAM', 'DEGREE', 'CURRICULUM', 'COLLEGE',
@@ -37,12 +40,6 @@ def grads_df(begin_date:dt.datetime) -> pd.DataFrame:
 start_date = dt.datetime(2000, 1, 1 )
 start_year = str(start_date.year)
 
-current_yt_df = pc.current_yearterm()
-current_term = current_yt_df['term'].iloc[0]
-current_year = current_yt_df['year'].iloc[0]
-current_yt = current_yt_df['yearterm'].iloc[0]
-current_yt_sort = current_yt_df['yearterm_sort'].iloc[0]
-
 
 def write():
     """Used to write the page in the app.py file"""
@@ -54,34 +51,22 @@ def write():
 """
         )
 
+        current = src.terms.current_term()
+
         today = dt.datetime.today()
         today_str = today.strftime("%Y%m%d")
 
-        calendar = pc.select("ACADEMICCALENDAR",
-            fields=['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 
-                'START_DATE', 'END_DATE', 'FINAL_END_DATE' ], 
-            where=f"ACADEMIC_YEAR>='{start_year}' AND ACADEMIC_TERM IN ('FALL', 'SPRING', 'SUMMER')", 
-            distinct=True
-            )
-        calendar = pc.add_col_yearterm(calendar)
-        calendar = pc.add_col_yearterm_sort(calendar)
-        term_df = ( calendar.drop_duplicates(['yearterm_sort', 'yearterm'])
-                        .sort_values(['yearterm_sort'], ascending=True)
-                        .loc[:,['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'yearterm_sort', 'yearterm']]
-        )
-        term_df = term_df.set_index('yearterm')
-
-        year_list = term_df['ACADEMIC_YEAR'].unique().tolist()
-        year_list = [y for y in year_list if ((y>=start_year) and (y<=current_year))]
+        year_list = src.terms.years(start_year, current.year)
         year_start, year_end = st.select_slider(
             "Select range of years:",
             options=year_list,
-            value=('2010', current_year)
+            value=('2010', current.year)
         )
 
         if year_start and year_end:
 
-            df = grads_df(start_date)
+            version = src.partitions.table_stamp("TRANSCRIPTDEGREE")
+            df = grads_df(start_date, version)
             df0 = ( df.loc[(df['grad_year']>=year_start) & (df['grad_year']<=year_end)]
                     .rename(columns={"CURRICULUM": "academic_program"})
             )
@@ -94,6 +79,9 @@ def write():
                 )
             df1 = df0.loc[(df0['academic_program'].isin(programs))]
 
+            # identifies the tables below in the export cache
+            export_key = ('academic_program_graduates', year_start, year_end, tuple(programs), version)
+
             st.write(f"#### Number of Graduates by Year ({year_start}-{year_end})")
             df_yr = ( df1.groupby(['grad_year', 'academic_program' ])
                         .agg(
@@ -107,11 +95,10 @@ def write():
                         )
             )
             st.dataframe(df_yr)
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(df_yr),
+            src.export.download_buttons(
+                df_yr,
+                key=export_key + ('graduates_by_year',),
                 file_name=f"{year_start}-{year_end}_graduates_by_year.csv",
-                mime='text/csv',
             )
 
             c = alt.Chart(df_yr).mark_bar().encode(
@@ -137,11 +124,10 @@ def write():
                 .rename(columns={'PEOPLE_CODE_ID': 'graduates'})
             )
             st.dataframe(df2)
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(df2),
+            src.export.download_buttons(
+                df2,
+                key=export_key + ('total_grads',),
                 file_name=f"{year_start}-{year_end}_total_grads.csv",
-                mime='text/csv',
             )
 
             c1 = alt.Chart(df2.reset_index()).mark_bar().encode(
@@ -171,11 +157,10 @@ def write():
                         )
             )
             st.dataframe(df3)
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(df3),
+            src.export.download_buttons(
+                df3,
+                key=export_key + ('PSC_total_grads',),
                 file_name=f"{year_start}-{year_end}_PSC_total_grads.csv",
-                mime='text/csv',
             )
             c2 = alt.Chart(df3).transform_joinaggregate(
                 total='sum(graduates)',
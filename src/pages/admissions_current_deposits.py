@@ -3,17 +3,12 @@ import streamlit as st
 import altair as alt
 import datetime as dt
 import src.pages.components
-
-# local connection information
-import local_db
+import src.export
+import src.terms
+import src.db
 
 WEEKS_FOR_PREVIOUS_DEPOSITS = 52
 
-@st.cache_data
-def convert_df(df):
-    # IMPORTANT: Cache the conversion to prevent computation on every rerun
-    return df.to_csv().encode('utf-8')
-
 
 def write():
     """Used to write the page in the app.py file"""
@@ -26,8 +21,6 @@ def write():
 """
         )
 
-        connection = local_db.connection()
-
         today = dt.date.today()
         today_str = today.strftime("%Y%m%d")
 
@@ -39,16 +32,9 @@ def write():
             WHERE [ACADEMICCALENDAR].[END_DATE] > '{today - dt.timedelta(weeks=WEEKS_FOR_PREVIOUS_DEPOSITS)}'
               AND [ACADEMICCALENDAR].[ACADEMIC_TERM] IN ('FALL', 'SPRING', 'SUMMER')
             """
-        df_cal = pd.read_sql_query(sql_str, connection)
-        yearterm_sort = ( lambda r: 
-            r['ACADEMIC_YEAR'] + '01' if r['ACADEMIC_TERM']=='SPRING' else
-            (r['ACADEMIC_YEAR'] + '02' if r['ACADEMIC_TERM']=='SUMMER' else
-            (r['ACADEMIC_YEAR'] + '03' if r['ACADEMIC_TERM']=='FALL' else
-            r['ACADEMIC_YEAR'] + '00'))
-        )
-        df_cal['yearterm_sort'] = df_cal.apply(yearterm_sort, axis=1)
-
-        df_cal['yearterm'] = df_cal['ACADEMIC_YEAR'] + '.' +  df_cal['ACADEMIC_TERM'].str.title()
+        df_cal = src.db.read_sql_query(sql_str)
+        df_cal = src.terms.add_col_yearterm_sort(df_cal)
+        df_cal = src.terms.add_col_yearterm(df_cal)
         keep_cols = [
         'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'END_DATE', 'yearterm_sort', 'yearterm',
         ]
@@ -96,9 +82,9 @@ def write():
         ORDER BY 
             [ACADEMIC].[APP_STATUS_DATE]
         """
-        df_dep = pd.read_sql_query(sql_str, connection)
-        df_dep['yearterm_sort'] = df_dep.apply(yearterm_sort, axis=1)
-        df_dep['yearterm'] = df_dep['ACADEMIC_YEAR'] + '.' +  df_dep['ACADEMIC_TERM'].str.title()
+        df_dep = src.db.read_sql_query(sql_str)
+        df_dep = src.terms.add_col_yearterm_sort(df_dep)
+        df_dep = src.terms.add_col_yearterm(df_dep)
         df_dep = df_dep.sort_values(['yearterm_sort', 'DEGREE', 'CURRICULUM', 'PEOPLE_CODE_ID' ])
 
         df = (
@@ -123,11 +109,11 @@ def write():
 
         st.dataframe(program_deposits)
 
-        st.download_button(
-            label="Download data as CSV",
-            data=convert_df(program_deposits),
+        src.export.download_buttons(
+            program_deposits,
+            key=None,
             file_name=f'{today_str}_program_deposits.csv',
-            mime='text/csv',
+            index=True,
         )
 
         st.markdown("---")
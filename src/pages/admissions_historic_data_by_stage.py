@@ -2,36 +2,18 @@ import numpy as np
 import pandas as pd
 import streamlit as st
 import datetime as dt
-import io
 from pathlib import Path
 import src.pages.components
+import src.export
+import src.profiling
 from bokeh.plotting import figure
 from bokeh.palettes import Set1_9, Colorblind8
 
 
 start_term = "2017.Spring"
 
-@st.cache_data
-def convert_df(df):
-    return df.to_csv(index=False).encode('utf-8')
-
-
-@st.cache_data
-def convert_df_xlsx(df_list):
-    xl_buffer = io.BytesIO()
-    with pd.ExcelWriter(
-        xl_buffer,
-        date_format="YYYY-MM-DD",
-        datetime_format="YYYY-MM-DD HH:MM:SS"
-    ) as writer:
-        for d in df_list:
-            df = d[0]
-            sheet = d[1]
-            df.to_excel( writer,
-                sheet_name=sheet,
-                index=False
-                )
-    return xl_buffer.getvalue()
+# weekly admissions counts, written nightly by the admissions funnel job
+DATA_FILE = Path(r"F:\Applications\Admissions\funnel\data") / "stage_data"
 
 
 def date_diff_weeks(start, end):
@@ -74,11 +56,15 @@ def write():
     today = dt.date.today()
     today_str = today.strftime("%Y%m%d")
 
-    data_path = Path(r"F:\Applications\Admissions\funnel\data")
-    data_file = data_path / "stage_data"
-    df = pd.read_hdf(data_file, key="weekly")
+    with src.profiling.timed('file', str(DATA_FILE)) as record:
+        df = pd.read_hdf(DATA_FILE, key="weekly")
+        record.update(src.profiling.frame_stats(df))
     df = df[(df["year_term"] > start_term)]
 
+    # identifies the tables below in the export cache; the data file is
+    # rewritten nightly, so its modification time is the data version
+    export_key = ('admissions_historic_data_by_stage', str(DATA_FILE), DATA_FILE.stat().st_mtime_ns, start_term)
+
     summ = df.groupby(["year_term", "stage"]).sum(numeric_only=True)
     summ_t = summ.transpose()
 
@@ -165,24 +151,22 @@ def write():
     
     summ_with_index = summ.reset_index()
     st.dataframe(summ_with_index)
-    st.download_button(
-        label="Download data as CSV",
-        data=convert_df(summ_with_index),
+    src.export.download_buttons(
+        summ_with_index,
+        key=export_key + ('historic_admissions_data',),
         file_name=f"historic_admissions_data_{today_str}.csv",
-        mime='text/csv',
     )
 
-    # df_to_add = [
-    #     [summ[(:,'Accepted')], 'applied'],
-    #     [summ[], 'admited'],
-    #     [summ[], 'deposited'],
-    # ]
-
-#     st.download_button(
-#     label=f"Download data as Excel workbook (.xlsx)",
-#     data=convert_df_xlsx(df_to_add),
-#     file_name=f"historic_admissions_data_{today_str}.xlsx",
-#     mime='application/vnd.ms-excel',
-# )
+    # one sheet per stage
+    df_to_add = [
+        [summ.xs(s, level="stage").reset_index(), s.lower()] for s in stage_list
+    ]
+
+    src.export.xlsx_download_button(
+        label=f"Download data as Excel workbook (.xlsx)",
+        sheets=df_to_add,
+        key=export_key + ('historic_admissions_workbook',),
+        file_name=f"historic_admissions_data_{today_str}.xlsx",
+    )
 
 
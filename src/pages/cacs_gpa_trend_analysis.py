@@ -2,29 +2,18 @@ import pandas as pd
 import streamlit as st
 import altair as alt
 import datetime as dt
-import hashlib
 import src.pages.components
+import src.terms
+import src.query_cache
+import src.query_spec
+import src.trajectory
+import src.anonymize
 
 # PowerCampus utilities
 import powercampus as pc
 
-@st.cache_data
-def convert_df(df):
-    return df.to_csv(index=False).encode('utf-8')
-
-def idstr_anonymous(idstr):
-    hash_object = hashlib.sha1(idstr.encode('utf-8'))
-    id = int(hash_object.hexdigest(),16) % (10**12)
-    return '{0:012d}'.format(id)
-
 start_year = pc.START_ACADEMIC_YEAR
 
-current_yt_df = pc.current_yearterm()
-current_term = current_yt_df['term'].iloc[0]
-current_year = current_yt_df['year'].iloc[0]
-current_yt = current_yt_df['yearterm'].iloc[0]
-current_yt_sort = current_yt_df['yearterm_sort'].iloc[0]
-
 
 def write():
     """Used to write the page in the app.py file"""
@@ -36,31 +25,19 @@ def write():
 """
         )
 
+        current = src.terms.current_term()
+
         today = dt.datetime.today()
         today_str = today.strftime("%Y%m%d_%H%M")
         # st.write(f"{today.strftime('%Y-%m-%d %H:%M')}")
 
-        calendar = pc.select("ACADEMICCALENDAR",
-            fields=['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 
-                'START_DATE', 'END_DATE', 'FINAL_END_DATE' ], 
-            where=f"ACADEMIC_YEAR>='{start_year}' AND ACADEMIC_TERM IN ('FALL', 'SPRING', 'SUMMER')", 
-            distinct=True
-            )
-        calendar = pc.add_col_yearterm(calendar)
-        calendar = pc.add_col_yearterm_sort(calendar)
-        term_df = ( calendar.drop_duplicates(['yearterm_sort', 'yearterm'])
-                        .sort_values(['yearterm_sort'], ascending=True)
-                        .loc[:,['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'yearterm_sort', 'yearterm']]
-        )
-        term_df = term_df.set_index('yearterm')
-
-        year_list = term_df['ACADEMIC_YEAR'].unique().tolist()
+        year_list = src.terms.years(start_year)
         # year_start, year_end = st.select_slider(
         #     "Select range of years:",
         #     options=year_list,
-        #     value=('2012', current_year)
+        #     value=('2012', current.year)
         # )
-        year = st.selectbox(label="Select year:", options=year_list, index=year_list.index(current_year))
+        year = st.selectbox(label="Select year:", options=year_list, index=year_list.index(current.year))
 
         term = st.selectbox(label="Select term:", options=['Fall', 'Spring'])
         # gpa_type = st.selectbox(label="Select GPA type:", options=['Cumulative', 'Term'])
@@ -71,17 +48,16 @@ def write():
 
         if year and term and gpa_type:
 
-            academic = pc.select("ACADEMIC",
-                fields=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION',
-                    'PROGRAM', 'DEGREE', 'CURRICULUM', 'COLLEGE', 'DEPARTMENT', 'CLASS_LEVEL', 'POPULATION',
-                    'FULL_PART', 'ACADEMIC_STANDING', 'ENROLL_SEPARATION', 'SEPARATION_DATE', 'CREDITS',  
-                    'COLLEGE_ATTEND', 'STATUS', 'PRIMARY_FLAG',
-                    ],
-                where=f"ACADEMIC_YEAR='{int(year)}' and ACADEMIC_TERM='{term}' " +
-                    "and ACADEMIC_SESSION='' and CREDITS>0 and CURRICULUM<>'ADVST' and PRIMARY_FLAG='Y' ", 
+            # students kept, filtered in the query
+            keep = [src.query_spec.ne('PROGRAM', 'G')] if undergrad_only else []
+
+            academic = src.query_cache.select("ACADEMIC",
+                fields=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', ],
+                where=src.query_spec.where(
+                    f"ACADEMIC_YEAR='{int(year)}' and ACADEMIC_TERM='{term}' " +
+                    "and ACADEMIC_SESSION='' and CREDITS>0 and CURRICULUM<>'ADVST' and PRIMARY_FLAG='Y' ",
+                    keep),
             )
-            if undergrad_only:
-                academic = academic.loc[(academic['PROGRAM'] != 'G')]
             keep_cols = [
                 'PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM',
             ]
@@ -97,15 +73,16 @@ def write():
             st.write(f"ACADEMIC shape: {academic.shape}")
             # st.dataframe(academic)
 
-            transcript_gpa = pc.select("TRANSCRIPTGPA",
-                fields=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 'RECORD_TYPE', 'GPA', 'ATTEMPTED_CREDITS',],
-                where=f"ACADEMIC_YEAR>='{int(start_year)}' and ACADEMIC_YEAR<='{int(year)}' and ACADEMIC_TERM IN ('FALL', 'SPRING') " +
-                    "and ACADEMIC_SESSION='' and ATTEMPTED_CREDITS>0.0 ", 
+            # term or cumulative GPA records
+            record_type = 'O' if gpa_type == 'Cumulative' else 'T'
+
+            transcript_gpa = src.query_cache.select("TRANSCRIPTGPA",
+                fields=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'GPA', ],
+                where=src.query_spec.where(
+                    f"ACADEMIC_YEAR>='{int(start_year)}' and ACADEMIC_YEAR<='{int(year)}' and ACADEMIC_TERM IN ('FALL', 'SPRING') " +
+                    "and ACADEMIC_SESSION='' and ATTEMPTED_CREDITS>0.0 ",
+                    [src.query_spec.eq('RECORD_TYPE', record_type)]),
                 )
-            if gpa_type == 'Cumulative':
-                transcript_gpa = transcript_gpa.loc[(transcript_gpa['RECORD_TYPE'] == 'O')]
-            else:
-                transcript_gpa = transcript_gpa.loc[(transcript_gpa['RECORD_TYPE'] == 'T')]
             keep_cols = [
                 'PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'GPA', 
             ]
@@ -125,7 +102,7 @@ def write():
                 how='left',
                 on=['PEOPLE_CODE_ID' ]
                 )
-            atgpa["id"] = atgpa["PEOPLE_CODE_ID"].map(idstr_anonymous)
+            atgpa["id"] = src.anonymize.anonymize(atgpa["PEOPLE_CODE_ID"])
             atgpa = atgpa.drop(columns=['PEOPLE_CODE_ID'])
             # st.write(f"atgpa shape: {atgpa.shape}")
             # st.dataframe(atgpa)
@@ -161,7 +138,7 @@ def write():
 
             # calcualte slope of gpa change throughout students' academic careers, and filter to students with a positive slope (improving gpa)
             term_cols = [col for col in murky_middle.columns if col.startswith('term')]
-            murky_middle['gpa_slope'] = murky_middle[term_cols].apply(lambda row: pd.Series(row.dropna().values).reset_index(drop=True).diff().mean(), axis=1)
+            murky_middle['gpa_slope'] = src.trajectory.trajectories(murky_middle[term_cols])['mean_diff']
             murky_middle_inc_gpa = murky_middle.loc[murky_middle['gpa_slope'] > 0]
             st.write(f"murky_middle_inc_gpa shape after filtering to students with a positive gpa slope: {murky_middle_inc_gpa.shape}")
             st.dataframe(murky_middle_inc_gpa)  
@@ -263,11 +240,10 @@ def write():
             #     'max': '{:.2f}',
             # })
             # st.dataframe(formatted_agg_ytgpa)
-            # st.download_button(
-            #     label="Download data as CSV",
-            #     data=convert_df(agg_ytgpa),
+            # src.export.download_buttons(
+            #     agg_ytgpa,
+            #     key=('cacs_gpa_trend_analysis', 'gpa_statistics', year_start, year_end, term),
             #     file_name=f"{term}_{year_start}-{year_end}_gpa_statistics.csv",
-            #     mime='text/csv',
             # )
 
             # c = alt.Chart(agg_ytgpa.reset_index()).mark_bar().encode(
@@ -1,16 +1,13 @@
 import pandas as pd
 import streamlit as st
 import altair as alt
-from pathlib import Path
 import src.pages.components
+import src.export
+import src.census
 
 
 begin_year = '2019'
 
-@st.cache_data
-def convert_df(df):
-    return df.to_csv().encode('utf-8')
-
 
 def write():
     """Used to write the page in the app.py file"""
@@ -23,13 +20,7 @@ def write():
 """
         )
 
-        data_path = Path(r"F:\Data\Census\CensusDatabase")
-        data_file = data_path / "census_db.arr"
-
-        df = (
-            pd.read_feather(data_file)
-            .sort_values(['yearterm_sort', 'people_code_id'])
-        )
+        df = src.census.enrollment_counts(['COLLEGE_ATTEND'])
 
         term_list = df['current_yearterm'].unique()
         term_list = [t for t in term_list if ("Fall" in t) and (t >= begin_year)]  # remove restrictions after cleaning COLLEGE_ATTEND data
@@ -44,11 +35,11 @@ def write():
         if terms:
             selected_df = (
                 df.loc[(df['current_yearterm'].isin(terms)), 
-                ['current_yearterm', 'yearterm_sort', 'COLLEGE_ATTEND', 'people_code_id']]
+                ['current_yearterm', 'yearterm_sort', 'COLLEGE_ATTEND', 'count']]
                 .groupby(['yearterm_sort', 'current_yearterm', 'COLLEGE_ATTEND'])
-                .count()
+                .sum()
                 .reset_index()
-                .rename(columns={'people_code_id': 'count', 'current_yearterm': 'yearterm', 'COLLEGE_ATTEND': 'attend_status'})
+                .rename(columns={'current_yearterm': 'yearterm', 'COLLEGE_ATTEND': 'attend_status'})
                 .sort_values(['yearterm_sort', 'attend_status'])
                 .astype({'count': 'UInt16'})
             )
@@ -63,11 +54,11 @@ def write():
 
             st.dataframe(enrollment)
 
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(enrollment),
+            src.export.download_buttons(
+                enrollment,
+                key=('college_enrollment_attend_status', 'college_enrollment_attend_status', tuple(terms), src.census.data_version()),
                 file_name=f'college_enrollment_attend_status.csv',
-                mime='text/csv',
+                index=True,
             )
 
             col1, col2 = st.columns(2)
@@ -1,20 +1,19 @@
 # from click import style
 # import numpy as np
 import pandas as pd
+import os
 import streamlit as st
 import altair as alt
 from pathlib import Path
 import src.pages.components
+import src.export
+import src.profiling
 
 # PowerCampus utilities
 import powercampus as pc
 
 start_year = '2010-11'
 
-@st.cache_data
-def convert_df(df):
-    return df.to_csv().encode('utf-8')
-
 
 def write():
     """Used to write the page in the app.py file"""
@@ -30,7 +29,10 @@ def write():
         data_path = Path(r"F:\Data\Census\attrition")
         data_file = data_path / "net_attrition.csv"
 
-        df = pd.read_csv(data_file)
+        data_mtime = os.path.getmtime(data_file)
+        with src.profiling.timed('file', str(data_file)) as record:
+            df = pd.read_csv(data_file)
+            record.update(src.profiling.frame_stats(df))
         # st.dataframe(df)
 
         df['ay'] = df['ay'].astype('string')
@@ -60,11 +62,11 @@ def write():
             )
 
             st.dataframe(df_1)
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(df_1),
+            src.export.download_buttons(
+                df_1,
+                key=('college_enrollment_attrition', 'college_enrollment_attrition', ay_start, ay_end, data_mtime),
                 file_name=f'college_enrollment_attrition.csv',
-                mime='text/csv',
+                index=True,
             )
 
             col1, col2 = st.columns(2)
@@ -1,18 +1,16 @@
 import pandas as pd
+import os
 import streamlit as st
 import altair as alt
 from pathlib import Path
 import src.pages.components
+import src.export
+import src.profiling
 
 # PowerCampus utilities
 import powercampus as pc
 
 
-@st.cache_data
-def convert_df(df):
-    return df.to_csv().encode('utf-8')
-
-
 def write():
     """Used to write the page in the app.py file"""
     with st.spinner("Loading College Enrollment - Historic ..."):
@@ -27,7 +25,10 @@ def write():
         data_path = Path(r"F:\Data\Census\enrollment")
         data_file = data_path / "RUNENROLL.xlsx"
 
-        df = pd.read_excel(data_file)
+        data_mtime = os.path.getmtime(data_file)
+        with src.profiling.timed('file', str(data_file)) as record:
+            df = pd.read_excel(data_file)
+            record.update(src.profiling.frame_stats(df))
         df['ACADEMIC_YEAR'] = df['term_year'].str.split(expand=True)[1]
         df['ACADEMIC_TERM'] = df['term_year'].str.split(expand=True)[0]
         df = pc.add_col_yearterm(df)
@@ -76,11 +77,11 @@ def write():
 
             st.dataframe(enrollment)
 
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(enrollment),
+            src.export.download_buttons(
+                enrollment,
+                key=('college_enrollment_historic', 'college_enrollment_historic', term_filter, tuple(terms), data_mtime),
                 file_name=f'college_enrollment_historic.csv',
-                mime='text/csv',
+                index=True,
             )
 
             # col1, col2 = st.columns(2)
@@ -1,13 +1,9 @@
 import pandas as pd
 import streamlit as st
 import altair as alt
-from pathlib import Path
 import src.pages.components
-
-
-@st.cache_data
-def convert_df(df):
-    return df.to_csv().encode('utf-8')
+import src.export
+import src.census
 
 
 def write():
@@ -20,13 +16,7 @@ def write():
 """
         )
 
-        data_path = Path(r"F:\Data\Census\CensusDatabase")
-        data_file = data_path / "census_db.arr"
-
-        df = (
-            pd.read_feather(data_file)
-            .sort_values(['yearterm_sort', 'updated_ethnicity_code', 'people_code_id'])
-        )
+        df = src.census.enrollment_counts(['updated_ethnicity_code'])
         df.loc[df['updated_ethnicity_code']=='', 'updated_ethnicity_code']='U'
         df['updated_ethnicity_code'] = df['updated_ethnicity_code'].fillna('U')
 
@@ -42,11 +32,11 @@ def write():
         if terms:
             selected_df = (
                 df.loc[(df['current_yearterm'].isin(terms)), 
-                ['current_yearterm', 'yearterm_sort', 'updated_ethnicity_code', 'people_code_id']]
+                ['current_yearterm', 'yearterm_sort', 'updated_ethnicity_code', 'count']]
                 .groupby(['yearterm_sort', 'current_yearterm', 'updated_ethnicity_code'])
-                .count()
+                .sum()
                 .reset_index()
-                .rename(columns={'people_code_id': 'count', 'current_yearterm': 'yearterm', })
+                .rename(columns={'current_yearterm': 'yearterm', })
                 .sort_values(['yearterm_sort', 'updated_ethnicity_code'])
                 .astype({'count': 'UInt16'})
             )
@@ -61,11 +51,11 @@ def write():
 
             st.dataframe(enrollment)
 
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(enrollment),
+            src.export.download_buttons(
+                enrollment,
+                key=('college_enrollment_race_ethnicity', 'college_enrollment_race_ethnicity', tuple(terms), src.census.data_version()),
                 file_name=f'college_enrollment_race_ethnicity.csv',
-                mime='text/csv',
+                index=True,
             )
 
             col1, col2 = st.columns(2)
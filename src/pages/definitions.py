@@ -3,23 +3,43 @@ import streamlit as st
 import altair as alt
 import datetime as dt
 import src.pages.components
+import src.export
+import src.query_cache
 
 # PowerCampus utilities
 import powercampus as pc
 
-@st.cache_data
-def convert_df(df):
-    return df.to_csv(index=False).encode('utf-8')
+# code table queries, read through the on-disk query cache; the tables below
+# are identified in the export cache by src.query_cache.version() of the query
+COLLEGE_QUERY = dict(table="CODE_COLLEGE",
+    fields=['CODE_VALUE_KEY', 'CODE_VALUE', 'SHORT_DESC', 'MEDIUM_DESC', 'LONG_DESC', 'STATUS', 'CREATE_DATE',
+        ],
+    where=f"STATUS IN ('A', 'I') " 
+    )
+
+CURRICULUM_QUERY = dict(table="CODE_CURRICULUM",
+    fields=['CODE_VALUE_KEY', 'CODE_VALUE', 'SHORT_DESC', 'MEDIUM_DESC', 'LONG_DESC', 'FORMAL_TITLE', 'STATUS', 'CREATE_DATE',
+        ],
+    where=f"STATUS IN ('A', 'I') " 
+    )
+
+DEGREE_MAPPING_QUERY = dict(table="DegreeMappingNsc",
+    fields=['AcademicYear','AcademicTerm','AcademicSession','Program','Degree','Curriculum','CipCode','CipYear',
+            'ProgramCredentialLevel','PublishedProgramLength','ProgramLengthMeasurement','SpecialProgramIndicator',
+            'WeeksInTitleIVAcademicYear','DefaultProgramBeginDate','IsGainfulEmployment'
+        ],
+    )
+
+ETHNICITY_QUERY = dict(table="CODE_ETHNICITY",
+    fields=['CODE_VALUE_KEY', 'CODE_VALUE', 'SHORT_DESC', 'MEDIUM_DESC', 'LONG_DESC',
+        ],
+    where=f"STATUS='A' " 
+    )
 
 
-@st.cache_data
 def college_df() -> pd.DataFrame:
 
-    df = pc.select("CODE_COLLEGE", 
-        fields=['CODE_VALUE_KEY', 'CODE_VALUE', 'SHORT_DESC', 'MEDIUM_DESC', 'LONG_DESC', 'STATUS', 'CREATE_DATE',
-            ],
-        where=f"STATUS IN ('A', 'I') " 
-        )
+    df = src.query_cache.select(**COLLEGE_QUERY)
 
     df['creation_date'] = pd.to_datetime(df["CREATE_DATE"]).dt.date
 
@@ -44,14 +64,9 @@ def college_df() -> pd.DataFrame:
     return df
 
 
-@st.cache_data
 def curriculum_df() -> pd.DataFrame:
 
-    df = pc.select("CODE_CURRICULUM", 
-        fields=['CODE_VALUE_KEY', 'CODE_VALUE', 'SHORT_DESC', 'MEDIUM_DESC', 'LONG_DESC', 'FORMAL_TITLE', 'STATUS', 'CREATE_DATE',
-            ],
-        where=f"STATUS IN ('A', 'I') " 
-        )
+    df = src.query_cache.select(**CURRICULUM_QUERY)
 
     df['creation_date'] = pd.to_datetime(df["CREATE_DATE"]).dt.date
 
@@ -76,15 +91,9 @@ def curriculum_df() -> pd.DataFrame:
     return df
 
 
-@st.cache_data
 def degree_mapping_df() -> pd.DataFrame:
 
-    df = pc.select("DegreeMappingNsc", 
-        fields=['AcademicYear','AcademicTerm','AcademicSession','Program','Degree','Curriculum','CipCode','CipYear',
-                'ProgramCredentialLevel','PublishedProgramLength','ProgramLengthMeasurement','SpecialProgramIndicator',
-                'WeeksInTitleIVAcademicYear','DefaultProgramBeginDate','IsGainfulEmployment'
-            ],
-        )
+    df = src.query_cache.select(**DEGREE_MAPPING_QUERY)
 
     keep_flds1 = [
         'AcademicYear','AcademicTerm','AcademicSession','Program','Degree','Curriculum','CipCode','CipYear',
@@ -116,14 +125,9 @@ def degree_mapping_df() -> pd.DataFrame:
     return df
 
 
-@st.cache_data
 def ethnicity_df() -> pd.DataFrame:
 
-    df = pc.select("CODE_ETHNICITY", 
-        fields=['CODE_VALUE_KEY', 'CODE_VALUE', 'SHORT_DESC', 'MEDIUM_DESC', 'LONG_DESC',
-            ],
-        where=f"STATUS='A' " 
-        )
+    df = src.query_cache.select(**ETHNICITY_QUERY)
 
     keep_flds = [
         "CODE_VALUE_KEY",
@@ -160,11 +164,10 @@ def write():
         df = college_df() 
 
         st.dataframe(df)
-        st.download_button(
-            label="Download data as CSV",
-            data=convert_df(df),
+        src.export.download_buttons(
+            df,
+            key=('definitions', 'academic_department_codes', src.query_cache.version(**COLLEGE_QUERY)),
             file_name=f"academic_department_codes_{today_str}.csv",
-            mime='text/csv',
         )
 
         st.write(f"#### Academic Program Codes  ")
@@ -179,21 +182,20 @@ def write():
         )
 
         st.dataframe(df)
-        st.download_button(
-            label="Download data as CSV",
-            data=convert_df(df),
+        src.export.download_buttons(
+            df,
+            key=('definitions', 'academic_program_codes', src.query_cache.version(**CURRICULUM_QUERY),
+                src.query_cache.version(**DEGREE_MAPPING_QUERY)),
             file_name=f"academic_program_codes_{today_str}.csv",
-            mime='text/csv',
         )
 
         st.write(f"#### Race/Ethnicity Codes  ")
         df = ethnicity_df() 
 
         st.dataframe(df)
-        st.download_button(
-            label="Download data as CSV",
-            data=convert_df(df),
+        src.export.download_buttons(
+            df,
+            key=('definitions', 'race-ethnicity_codes', src.query_cache.version(**ETHNICITY_QUERY)),
             file_name=f"race-ethnicity_codes_{today_str}.csv",
-            mime='text/csv',
         )
 
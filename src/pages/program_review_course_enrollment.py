@@ -2,71 +2,43 @@ import pandas as pd
 import streamlit as st
 import altair as alt
 import datetime as dt
-import io
 import src.pages.components
+import src.export
+import src.terms
+import src.course_facts
+import src.keys
 
 # PowerCampus utilities
 import powercampus as pc
 
 
-@st.cache_data
-def convert_df(df):
-    return df.to_csv(index=False).encode('utf-8')
-
-
-@st.cache_data
-def convert_df_xlsx(df_list):
-    xl_buffer = io.BytesIO()
-    with pd.ExcelWriter(
-        xl_buffer,
-        date_format="YYYY-MM-DD",
-        datetime_format="YYYY-MM-DD HH:MM:SS"
-    ) as writer:
-        for d in df_list:
-            df = d[0]
-            sheet = d[1]
-            df.to_excel( writer,
-                sheet_name=sheet,
-                index=False
-                )
-    return xl_buffer.getvalue()
-
+# course_df also depends on SECTIONPER
+PROGRAM_REVIEW_TABLES = tuple(src.course_facts.ENROLLMENT_TABLES + ['SECTIONPER'])
 
-@st.cache_data
-def course_df(start_year):
 
-    academic = pc.select("ACADEMIC",
-        fields=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION',
-            'PROGRAM', 'DEGREE', 'CURRICULUM', 'COLLEGE', 'DEPARTMENT', 'CLASS_LEVEL', 'POPULATION',
-            'FULL_PART', 'ACADEMIC_STANDING', 'ENROLL_SEPARATION', 'SEPARATION_DATE', 'CREDITS',  
-            'COLLEGE_ATTEND', 'STATUS', 'PRIMARY_FLAG',
-            ],
-        where=f"ACADEMIC_YEAR>='{int(start_year)}' AND ACADEMIC_TERM IN ('FALL', 'SPRING', 'SUMMER') " +
-            "and ACADEMIC_SESSION='' and CREDITS>0 and CURRICULUM<>'ADVST' and PRIMARY_FLAG='Y' ", 
-    )
-    academic = pc.add_col_yearterm(academic)
-    academic = pc.add_col_yearterm_sort(academic)
- 
-
-    transcriptdetail = pc.select("TRANSCRIPTDETAIL",
-        fields=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION',
-            'ORG_CODE_ID', 'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION', 'EVENT_TYPE',
-            'CREDIT', 'ADD_DROP_WAIT',
+@st.cache_data(max_entries=2)
+def course_df(start_year, version):
+    """
+    returns the enrollment facts of students' primary records with each
+    section's instructor; version is only part of the cache key
+    """
+    transcriptdetail = src.course_facts.enrollment_facts(start_year,
+        columns=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION',
+            'yearterm', 'yearterm_sort', 'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION', 'ORG_CODE_ID',
+            'CURRICULUM', 'COLLEGE', 'PRIMARY_FLAG',
             ],
-        where=f"ACADEMIC_YEAR>='{start_year}' AND ACADEMIC_TERM IN ('FALL', 'SPRING', 'SUMMER') " +
-            "and ADD_DROP_WAIT='A' and ORG_CODE_ID='O000000001' ", 
-    )
-    transcriptdetail['section_id'] = (
-        transcriptdetail["EVENT_ID"].str.rstrip().str.upper() + "." + 
-        transcriptdetail["EVENT_SUB_TYPE"].str.upper() + "."  + 
-        transcriptdetail["SECTION"].str.upper()
         )
+    transcriptdetail = transcriptdetail.loc[transcriptdetail['ACADEMIC_TERM'].isin(src.terms.TERMS) &
+        (transcriptdetail['PRIMARY_FLAG'] == 'Y') &
+        (transcriptdetail['ORG_CODE_ID'] == 'O000000001'), ]
+    transcriptdetail['section_id'] = src.keys.composite_key(transcriptdetail, ['EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION'])
     
     sectionper = pc.select("SECTIONPER", 
         fields=['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION',
             'PERSON_CODE_ID'],
         where=f"ACADEMIC_YEAR>='{start_year}' AND ACADEMIC_TERM IN ('FALL', 'SPRING', 'SUMMER') ",
         )
+    sectionper = src.course_facts.normalize_keys(sectionper)
     people = pc.select('PEOPLE',
         fields=['PEOPLE_CODE_ID', 'FIRST_NAME', 'LAST_NAME', ],
         )
@@ -77,19 +49,14 @@ def course_df(start_year):
         right_on='PEOPLE_CODE_ID'
         )
     sectionper = sectionper.loc[:,['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION', 'instructor']]
-    transcriptdetail = transcriptdetail.merge(sectionper,
-        how='left',
-        on=['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION',]
-        )
 
     keep_cols = ['yearterm', 'yearterm_sort', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'section_id', 'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION', 'PEOPLE_CODE_ID', 'CURRICULUM', 'COLLEGE', 'instructor']
-    atd = ( academic.merge(transcriptdetail,
+    atd = ( transcriptdetail.merge(sectionper,
         how='left',
-        on=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', ]
+        on=['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION',]
         )
         .loc[:,keep_cols]
     )
-    atd['EVENT_ID'] = atd['EVENT_ID'].str.strip().str.upper()
     atd = atd.drop_duplicates(['PEOPLE_CODE_ID', 'yearterm', 'section_id', ])
 
     return atd
@@ -107,35 +74,18 @@ def write():
 
         start_year = pc.START_ACADEMIC_YEAR
 
-        current_yt_df = pc.current_yearterm()
-        current_term = current_yt_df['term'].iloc[0]
-        current_year = current_yt_df['year'].iloc[0]
-        current_yt = current_yt_df['yearterm'].iloc[0]
-        current_yt_sort = current_yt_df['yearterm_sort'].iloc[0]
+        current = src.terms.current_term()
 
-        df = course_df(start_year)
+        df = course_df(start_year, src.course_facts.data_version(start_year, PROGRAM_REVIEW_TABLES))
 
         today = dt.datetime.today()
         today_str = today.strftime("%Y%m%d_%H%M")
 
-        calendar = pc.select("ACADEMICCALENDAR",
-            fields=['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 
-                'START_DATE', 'END_DATE', 'FINAL_END_DATE' ], 
-            where=f"ACADEMIC_YEAR>='{start_year}' AND ACADEMIC_TERM IN ('FALL', 'SPRING') ", 
-            distinct=True
-            )
-        calendar = pc.add_col_yearterm(calendar)
-        calendar = pc.add_col_yearterm_sort(calendar)
-        term_df = ( calendar.drop_duplicates(['yearterm_sort', 'yearterm'])
-                        .sort_values(['yearterm_sort'], ascending=True)
-                        .loc[:,['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'yearterm_sort', 'yearterm']]
-        )
-
-        year_list = term_df['ACADEMIC_YEAR'].unique().tolist()
+        year_list = src.terms.years(start_year, terms=['FALL', 'SPRING'])
         year_start, year_end = st.select_slider(
             "Select range of years:",
             options=year_list,
-            value=(str(int(current_year)-6), current_year)
+            value=(str(int(current.year)-6), current.year)
         )
 
         if year_start and year_end:
@@ -157,6 +107,10 @@ def write():
             )
 
             include_section_types = st.multiselect("Include section types:", options=section_types, default=['COMB', 'HYBD', 'LEC', 'ONLN', 'PRAC'])
+
+            # identifies the tables below in the export cache
+            export_key = ('program_review_course_enrollment', event_id, year_start, year_end, tuple(include_section_types), src.course_facts.data_version(start_year, PROGRAM_REVIEW_TABLES))
+
             df1 = df1.loc[(df1['EVENT_SUB_TYPE'].isin(include_section_types))]
 
             st.write(f"#### Course Enrollment - {event_id} ({year_start}-{year_end})")
@@ -165,7 +119,7 @@ def write():
                 (df1['EVENT_ID']==event_id),
                 ['yearterm', 'yearterm_sort', 'EVENT_ID', 'EVENT_SUB_TYPE', 'section_id', 'instructor', 'CURRICULUM', 'PEOPLE_CODE_ID']
                 ]
-                .groupby(['EVENT_ID', 'yearterm', 'EVENT_SUB_TYPE']).agg(
+                .groupby(['EVENT_ID', 'yearterm', 'EVENT_SUB_TYPE'], observed=True).agg(
                     {
                         'PEOPLE_CODE_ID': 'count',
                         'yearterm_sort': 'first',
@@ -184,11 +138,10 @@ def write():
             )
             
             st.dataframe(enrl_yt)
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(enrl_yt),
+            src.export.download_buttons(
+                enrl_yt,
+                key=export_key + ('course_enrollment_by_yearterm',),
                 file_name=f"{event_id}_{year_start}-{year_end}_course_enrollment_by_yearterm.csv",
-                mime='text/csv',
             )
 
             st.write(f"#### Course Enrollment by Instructor - {event_id} ({year_start}-{year_end})")
@@ -197,7 +150,7 @@ def write():
                 (df1['EVENT_ID']==event_id),
                 ['yearterm', 'yearterm_sort', 'EVENT_ID', 'EVENT_SUB_TYPE', 'section_id', 'instructor', 'CURRICULUM', 'PEOPLE_CODE_ID']
                 ]
-                .groupby(['EVENT_ID', 'yearterm', 'EVENT_SUB_TYPE', 'instructor']).agg(
+                .groupby(['EVENT_ID', 'yearterm', 'EVENT_SUB_TYPE', 'instructor'], observed=True).agg(
                     {
                         'PEOPLE_CODE_ID': 'count',
                         # 'instructor': 'first',
@@ -217,11 +170,10 @@ def write():
             )
             
             st.dataframe(enrl_inst_yt)
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(enrl_inst_yt),
+            src.export.download_buttons(
+                enrl_inst_yt,
+                key=export_key + ('course_enrollment_by_instructor_by_yearterm',),
                 file_name=f"{event_id}_{year_start}-{year_end}_course_enrollment_by_instructor_by_yearterm.csv",
-                mime='text/csv',
             )
 
             st.write(f"#### Course Enrollment by Major - {event_id} ({year_start}-{year_end})")
@@ -230,7 +182,7 @@ def write():
                 (df1['EVENT_ID']==event_id),
                 ['yearterm', 'yearterm_sort', 'EVENT_ID', 'EVENT_SUB_TYPE', 'section_id', 'instructor', 'CURRICULUM', 'PEOPLE_CODE_ID']
                 ]
-                .groupby(['EVENT_ID', 'yearterm', 'EVENT_SUB_TYPE', 'CURRICULUM']).agg(
+                .groupby(['EVENT_ID', 'yearterm', 'EVENT_SUB_TYPE', 'CURRICULUM'], observed=True).agg(
                     {
                         'PEOPLE_CODE_ID': 'count',
                         'yearterm_sort': 'first',
@@ -259,11 +211,10 @@ def write():
 
             
             st.dataframe(enrl_curr_yt)
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(enrl_curr_yt),
+            src.export.download_buttons(
+                enrl_curr_yt,
+                key=export_key + ('course_enrollment_by_major_by_yearterm',),
                 file_name=f"{event_id}_{year_start}-{year_end}_course_enrollment_by_major_by_yearterm.csv",
-                mime='text/csv',
             )
 
             st.markdown("---")
@@ -277,10 +228,10 @@ def write():
                     [enrl_curr_yt, 'by major'],
             ]
 
-            st.download_button(
+            src.export.xlsx_download_button(
                 label=f"Download Excel workbook for {event_id} as .xlsx",
-                data=convert_df_xlsx(df_to_add),
+                sheets=df_to_add,
+                key=export_key + ('course_enrollment_workbook',),
                 file_name=f"{event_id}_{year_start}-{year_end}_course_enrollment_{today_str}.xlsx",
-                mime='application/vnd.ms-excel',
             )
             
@@ -3,61 +3,71 @@ import streamlit as st
 import altair as alt
 import datetime as dt
 import src.pages.components
+import src.export
+import src.terms
+import src.partitions
+import src.occupancy
+import src.course_facts
+import src.keys
+import src.query_spec
 
 # PowerCampus utilities
 import powercampus as pc
 
-@st.cache_data
-def convert_df(df):
-    return df.to_csv(index=False).encode('utf-8')
+# sections counted: no REG, online or ACE, ADV, CELL, STAB sections
+KEEP_SECTIONS = [
+    src.query_spec.not_startswith('EVENT_ID', 'REG'),
+    src.query_spec.not_in('EVENT_SUB_TYPE', ['ACE', 'ADV', 'CELL', 'STAB']),
+    src.query_spec.not_contains('SECTION', 'ON'),
+]
 
+CLASS_TIMES_TABLES = tuple(['SECTIONS', 'SECTIONSCHEDULE'] + src.course_facts.ENROLLMENT_TABLES)
 
-@st.cache_data
-def class_df(start_year):
-    sections = pc.select("SECTIONS", 
+
+@st.cache_data(max_entries=2)
+def class_df(start_year, version):
+    """
+    returns students' class meetings by day in FALL and SPRING sections;
+    version is only part of the cache key
+    """
+    sections = src.partitions.select("SECTIONS", 
         fields=['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION',
             'EVENT_MED_NAME', 'EVENT_LONG_NAME', 'EVENT_TYPE', 
             'START_DATE', 'END_DATE',
             ],
-        where=f"ACADEMIC_YEAR>='{start_year}' AND ACADEMIC_TERM IN ('FALL', 'SPRING') " +
-            "and ADDS>0 and EVENT_STATUS='A' " +
-            "and EVENT_SUB_TYPE NOT IN ('ONLN') ", 
+        where=src.query_spec.where("ADDS>0 and EVENT_STATUS='A' " +
+            "and EVENT_SUB_TYPE NOT IN ('ONLN') ", KEEP_SECTIONS),
+        year_start=start_year,
+        terms=['FALL', 'SPRING'],
         )
-    sections = sections.loc[(~sections['EVENT_ID'].str.startswith('REG')) & (~sections['EVENT_SUB_TYPE'].isin(['ACE', 'ADV', 'CELL', 'STAB'])), :]
+    sections = src.keys.categorize(src.course_facts.normalize_keys(sections))
     sections = sections.drop_duplicates(['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION'])
     sections = sections.sort_values(['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION'])
-    sections['section_id'] = (
-        sections["EVENT_ID"].str.rstrip().str.upper() + "." + 
-        sections["EVENT_SUB_TYPE"].str.upper() + "."  + 
-        sections["SECTION"].str.upper()
-        )
+    sections['section_id'] = src.keys.composite_key(sections, ['EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION'])
     sections['yearterm'] = sections["ACADEMIC_YEAR"] + "." + sections["ACADEMIC_TERM"].str.title()
-    sections = sections.loc[(~sections['SECTION'].str.contains('ON'))]
 
-    sectionschedule = pc.select("SECTIONSCHEDULE", 
+    sectionschedule = src.partitions.select("SECTIONSCHEDULE", 
         fields=['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION',
             'DAY', 'START_TIME', 'END_TIME', 'BUILDING_CODE', 'ROOM_ID' ],
-        where=f"ACADEMIC_YEAR>='{start_year}' AND ACADEMIC_TERM IN ('FALL', 'SPRING') ",
+        where="",
+        year_start=start_year,
+        terms=['FALL', 'SPRING'],
         )
+    sectionschedule = src.keys.categorize(src.course_facts.normalize_keys(sectionschedule))
 
     sections = sections.merge(sectionschedule,
         how='left',
         on=['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION',]
         )
-    sections['building_room'] = (
-        sections["BUILDING_CODE"].str.upper() + "_" + 
-        sections["ROOM_ID"].str.upper()
-        )
+    sections['building_room'] = src.keys.composite_key(sections, ['BUILDING_CODE', 'ROOM_ID'])
     sections = sections.loc[(sections['DAY'].notna())]
 
-    transcriptdetail = pc.select("TRANSCRIPTDETAIL",
-        fields=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION',
-            'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION', 'EVENT_TYPE',
-            'CREDIT', 'MID_GRADE', 'FINAL_GRADE', 'ADD_DROP_WAIT',
+    transcriptdetail = src.course_facts.enrollment_facts(start_year,
+        columns=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION',
+            'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION',
             ],
-        where=f"ACADEMIC_YEAR>='{start_year}' AND ACADEMIC_TERM IN ('FALL', 'SPRING') " +
-            "and ADD_DROP_WAIT='A' ", 
-    )
+        )
+    transcriptdetail = transcriptdetail.loc[transcriptdetail['ACADEMIC_TERM'].isin(['FALL', 'SPRING'])]
 
     std = sections.merge(transcriptdetail,
         how='left',
@@ -96,37 +106,15 @@ def class_df(start_year):
             )
         .loc[:,keep_cols]
     )
-    std['building_room_day'] = (
-        std["building_room"] + "_" + 
-        std["DAY"].str.upper()
-        )
+    std['building_room_day'] = src.keys.composite_key(std, ['building_room', 'DAY'])
     std = std.loc[(std['DAY'].notna())]
     std = std.drop_duplicates(['yearterm', 'section_id', 'EVENT_SUB_TYPE', 'PEOPLE_CODE_ID', 'DAY', 'START_TIME', 'END_TIME' ])
-    std['join'] = 1
-
-    sample_time = pd.DataFrame(pd.date_range(start='1900-01-01 06:00:0.0', end='1900-01-01 22:00:0.0', freq='15min'),
-        columns=['t'])
-    sample_time['join'] = 1
-    sample_time['time'] = sample_time['t'].dt.strftime('%H:%M')
-
-    std = std.merge(sample_time,
-            how='left',
-            on='join',
-            )
-    std['in_class'] = ((std['t'] >= std['START_TIME']) & (std['t'] <= std['END_TIME']))
-    std = std.loc[(std['in_class'])]
 
     return std
 
 
 start_year = pc.START_ACADEMIC_YEAR
 
-current_yt_df = pc.current_yearterm()
-current_term = current_yt_df['term'].iloc[0]
-current_year = current_yt_df['year'].iloc[0]
-current_yt = current_yt_df['yearterm'].iloc[0]
-current_yt_sort = current_yt_df['yearterm_sort'].iloc[0]
-
 day_list = ['MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN']
 
 
@@ -140,55 +128,45 @@ def write():
 """
         )
 
+        current = src.terms.current_term()
+
         today = dt.datetime.today()
         today_str = today.strftime("%Y%m%d_%H%M")
 
-        calendar = pc.select("ACADEMICCALENDAR",
-            fields=['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 
-                'START_DATE', 'END_DATE', 'FINAL_END_DATE' ], 
-            where=f"ACADEMIC_YEAR>='{start_year}' AND ACADEMIC_TERM IN ('FALL', 'SPRING') ", 
-            distinct=True
-            )
-        calendar = pc.add_col_yearterm(calendar)
-        calendar = pc.add_col_yearterm_sort(calendar)
-        term_df = ( calendar.drop_duplicates(['yearterm_sort', 'yearterm'])
-                        .sort_values(['yearterm_sort'], ascending=False)
-                        .loc[:,['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'yearterm_sort', 'yearterm']]
-        )
-        term_list = term_df['yearterm'].tolist()
+        term_list = src.terms.yearterms(start_year, terms=['FALL', 'SPRING'], ascending=False)
 
         st.write(f"### One Term")
 
-        if current_yt in term_list:
-            ind = term_list.index(current_yt)
+        if current.yearterm in term_list:
+            ind = term_list.index(current.yearterm)
         else:
             ind = 0
         yearterm = st.selectbox(label="Selected term:", options=term_list, index=ind)
 
-        term_df = term_df.set_index('yearterm')
-        year = term_df.loc[[yearterm]]['ACADEMIC_YEAR'][0]
-        term = term_df.loc[[yearterm]]['ACADEMIC_TERM'][0]
+        year, term = src.terms.year_term(yearterm)
 
         section_types = ['COMB', 'HYBD', 'LEC', 'PRAC', 'LAB', 'SI']
         include_section_types = st.multiselect("Include section types:", options=section_types, default=['COMB', 'HYBD', 'LEC', 'PRAC', 'LAB', 'SI'])
 
-        df = class_df(start_year)
+        bin_minutes = st.selectbox("Time interval (minutes):", options=src.occupancy.BIN_MINUTES, index=len(src.occupancy.BIN_MINUTES) - 1)
+
+        version = src.course_facts.data_version(start_year, CLASS_TIMES_TABLES)
+        df = class_df(start_year, version)
 
         if yearterm and include_section_types:
 
+            # identifies the tables below in the export cache
+            export_key_1 = ('registrar_class_times', yearterm, tuple(include_section_types), bin_minutes, version)
+
             df_yt = df.loc[(df['yearterm']==yearterm) & (df['EVENT_SUB_TYPE'].isin(include_section_types))]
 
             day_order = [d for d in day_list if d in df_yt['DAY'].unique()]
 
             st.write(f"#### Number of Students In-Class ({yearterm})")
-            stu = ( df_yt.loc[:,['PEOPLE_CODE_ID', 'DAY', 'time' ]]
-                    .drop_duplicates(['PEOPLE_CODE_ID', 'DAY', 'time' ])
-                    .groupby(['DAY', 'time'])['PEOPLE_CODE_ID'].count()
-                    .fillna(0)
-                    .reset_index()
+            stu = ( src.occupancy.occupancy(df_yt, 'PEOPLE_CODE_ID', by=['DAY'], bin_minutes=bin_minutes)
                     .rename(
                         columns={
-                            'PEOPLE_CODE_ID': 'students'
+                            'count': 'students'
                         }
                     )
             )
@@ -210,22 +188,17 @@ def write():
             stu = stu.loc[:,['time'] + day_order]
             stu[day_order] = stu[day_order].astype(int)
             st.dataframe(stu)
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(stu),
+            src.export.download_buttons(
+                stu,
+                key=export_key_1 + ('students_by_classtime',),
                 file_name=f"{term}{year}_students_by_classtime.csv",
-                mime='text/csv',
             )
 
             st.write(f"#### Number of Sections ({yearterm})")
-            sect = ( df_yt.loc[:,['DAY', 'time', 'section_id' ]]
-                    .drop_duplicates(['DAY', 'time', 'section_id' ])
-                    .groupby(['DAY', 'time'])['section_id'].count()
-                    .fillna(0)
-                    .reset_index()
+            sect = ( src.occupancy.occupancy(df_yt, 'section_id', by=['DAY'], bin_minutes=bin_minutes)
                     .rename(
                         columns={
-                            'section_id': 'sections'
+                            'count': 'sections'
                         }
                     )
             )
@@ -247,22 +220,21 @@ def write():
             sect = sect.loc[:,['time'] + day_order]
             sect[day_order] = sect[day_order].astype(int)
             st.dataframe(sect)
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(sect),
+            src.export.download_buttons(
+                sect,
+                key=export_key_1 + ('sections_by_classtime',),
                 file_name=f"{term}{year}_sections_by_classtime.csv",
-                mime='text/csv',
             )
         
         st.markdown("---")
 
         st.write(f"### Multiple Terms")
 
-        year_list = reversed(term_df['ACADEMIC_YEAR'].unique().tolist())
+        year_list = src.terms.years(start_year, terms=['FALL', 'SPRING'])
         year_start, year_end = st.select_slider(
             "Select range of years:",
             options=year_list,
-            value=('2012', current_year),
+            value=('2012', current.year),
             key='Class Times Multiple Terms Slider'
         )
 
@@ -277,6 +249,9 @@ def write():
 
         if year_start and year_end and term and day and include_section_types_2:
 
+            # identifies the tables below in the export cache
+            export_key_2 = ('registrar_class_times', year_start, year_end, term, day, tuple(include_section_types_2), bin_minutes, version)
+
             df_day = df.loc[(df['DAY']==day) & 
                 (df['EVENT_SUB_TYPE'].isin(include_section_types_2) &
                 (df['ACADEMIC_YEAR']>=year_start) &
@@ -285,14 +260,10 @@ def write():
                 )]
             
             st.write(f"#### Number of Students In-Class ({term} {year_start}-{year_end}) Day={day}")
-            stu = ( df_day.loc[:,['PEOPLE_CODE_ID', 'yearterm', 'time' ]]
-                    .drop_duplicates(['PEOPLE_CODE_ID', 'yearterm', 'time' ])
-                    .groupby(['yearterm', 'time'])['PEOPLE_CODE_ID'].count()
-                    .fillna(0)
-                    .reset_index()
+            stu = ( src.occupancy.occupancy(df_day, 'PEOPLE_CODE_ID', by=['yearterm'], bin_minutes=bin_minutes)
                     .rename(
                         columns={
-                            'PEOPLE_CODE_ID': 'students'
+                            'count': 'students'
                         }
                     )
             )
@@ -315,22 +286,17 @@ def write():
             stu = stu.loc[:,['time'] + yearterm_list]
             stu[yearterm_list] = stu[yearterm_list].astype(int)
             st.dataframe(stu)
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(stu),
+            src.export.download_buttons(
+                stu,
+                key=export_key_2 + ('students_by_classtime',),
                 file_name=f"{term}{year_start}-{year_end}_{day}_students_by_classtime.csv",
-                mime='text/csv',
             )
 
             st.write(f"#### Number of Sections ({term} {year_start}-{year_end}) Day={day}")
-            sect = ( df_day.loc[:,['yearterm', 'time', 'section_id' ]]
-                    .drop_duplicates(['yearterm', 'time', 'section_id' ])
-                    .groupby(['yearterm', 'time'])['section_id'].count()
-                    .fillna(0)
-                    .reset_index()
+            sect = ( src.occupancy.occupancy(df_day, 'section_id', by=['yearterm'], bin_minutes=bin_minutes)
                     .rename(
                         columns={
-                            'section_id': 'sections'
+                            'count': 'sections'
                         }
                     )
             )
@@ -353,10 +319,9 @@ def write():
             sect = sect.loc[:,['time'] + yearterm_list]
             sect[yearterm_list] = sect[yearterm_list].astype(int)
             st.dataframe(sect)
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(sect),
+            src.export.download_buttons(
+                sect,
+                key=export_key_2 + ('sections_by_classtime',),
                 file_name=f"{term}{year_start}-{year_end}_{day}_sections_by_classtime.csv",
-                mime='text/csv',
             )
 
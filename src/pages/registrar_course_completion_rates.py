@@ -2,42 +2,19 @@ import altair as alt
 import pandas as pd
 import streamlit as st
 import datetime as dt
-import io
 import src.pages.components
+import src.export
+import src.terms
+import src.course_facts
+import src.keys
+import src.query_spec
 
 # PowerCampus utilities
 import powercampus as pc
 
-@st.cache_data
-def convert_df(df):
-    return df.to_csv(index=False).encode('utf-8')
-
-@st.cache_data
-def convert_df_xlsx(df_list):
-    xl_buffer = io.BytesIO()
-    with pd.ExcelWriter(
-        xl_buffer,
-        date_format="YYYY-MM-DD",
-        datetime_format="YYYY-MM-DD HH:MM:SS"
-    ) as writer:
-        for d in df_list:
-            df = d[0]
-            sheet = d[1]
-            df.to_excel( writer,
-                sheet_name=sheet,
-                index=False
-                )
-    return xl_buffer.getvalue()
-
 
 start_year = pc.START_ACADEMIC_YEAR
 
-current_yt_df = pc.current_yearterm()
-current_term = current_yt_df['term'].iloc[0]
-current_year = current_yt_df['year'].iloc[0]
-current_yt = current_yt_df['yearterm'].iloc[0]
-current_yt_sort = current_yt_df['yearterm_sort'].iloc[0]
-
 
 def write():
     """Used to write the page in the app.py file"""
@@ -49,29 +26,17 @@ def write():
 """
         )
 
+        current = src.terms.current_term()
+
         today = dt.datetime.today()
         today_str = today.strftime("%Y%m%d_%H%M")
         # st.write(f"{today.strftime('%Y-%m-%d %H:%M')}")
 
-        calendar = pc.select("ACADEMICCALENDAR",
-            fields=['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 
-                'START_DATE', 'END_DATE', 'FINAL_END_DATE' ], 
-            where=f"ACADEMIC_YEAR>='{start_year}' AND ACADEMIC_TERM IN ('FALL', 'SPRING', 'SUMMER')", 
-            distinct=True
-            )
-        calendar = pc.add_col_yearterm(calendar)
-        calendar = pc.add_col_yearterm_sort(calendar)
-        term_df = ( calendar.drop_duplicates(['yearterm_sort', 'yearterm'])
-                        .sort_values(['yearterm_sort'], ascending=True)
-                        .loc[:,['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'yearterm_sort', 'yearterm']]
-        )
-        term_df = term_df.set_index('yearterm')
-
-        year_list = term_df['ACADEMIC_YEAR'].unique().tolist()
+        year_list = src.terms.years(start_year)
         year_start, year_end = st.select_slider(
             "Select range of years:",
             options=year_list,
-            value=('2012', current_year)
+            value=('2012', current.year)
         )
 
         section_types = ['COMB', 'HYBD', 'LEC', 'ONLN', 'PRAC', 'LAB', 'SI']
@@ -80,43 +45,24 @@ def write():
 
         if year_start and year_end and include_section_types:
 
-            academic = pc.select("ACADEMIC",
-                fields=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION',
-                    'PROGRAM', 'DEGREE', 'CURRICULUM', 'COLLEGE', 'DEPARTMENT', 'CLASS_LEVEL', 'POPULATION',
-                    'FULL_PART', 'ACADEMIC_STANDING', 'ENROLL_SEPARATION', 'SEPARATION_DATE', 'CREDITS',  
-                    'COLLEGE_ATTEND', 'STATUS', 'PRIMARY_FLAG',
-                    ],
-                where=f"ACADEMIC_YEAR>='{int(year_start)}' and ACADEMIC_YEAR<='{int(year_end)}' and ACADEMIC_TERM IN ('FALL', 'SPRING') " +
-                    "and ACADEMIC_SESSION='' and CREDITS>0 and CURRICULUM<>'ADVST' ", 
-                distinct=True,
-            )
+            # identifies the tables below in the export cache
+            export_key = ('registrar_course_completion_rates', year_start, year_end, tuple(include_section_types), current.yearterm_sort, src.course_facts.data_version(start_year, tuple(src.course_facts.ENROLLMENT_TABLES)))
 
-            transcriptdetail = pc.select("TRANSCRIPTDETAIL",
-                fields=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION',
-                    'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION', 'EVENT_TYPE', 'EVENT_MED_NAME', 'EVENT_LONG_NAME',
-                    'CREDIT', 'FINAL_GRADE', 'ADD_DROP_WAIT',
+            atd = src.course_facts.enrollment_facts(start_year,
+                columns=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'yearterm', 'yearterm_sort',
+                    'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION', 'CREDIT', 'FINAL_GRADE', 'has_academic',
                     ],
-                where=f"ACADEMIC_YEAR>='{int(year_start)}' and ACADEMIC_YEAR<='{int(year_end)}' and ACADEMIC_TERM IN ('FALL', 'SPRING') " +
-                    "and ADD_DROP_WAIT='A' and CREDIT>0 ", 
-            )
-            transcriptdetail = transcriptdetail.loc[(transcriptdetail['EVENT_SUB_TYPE'].isin(include_section_types))]
-
-            atd = academic.merge(transcriptdetail,
-                how='left',
-                on=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', ]
-                )
-            atd = pc.add_col_yearterm(atd)
-            atd = pc.add_col_yearterm_sort(atd)
-            atd = atd.loc[atd['yearterm_sort'] < current_yt_sort, ]
-            atd["EVENT_ID"] = atd["EVENT_ID"].str.rstrip().str.upper()
-            atd['course_section_id'] = (
-                atd["ACADEMIC_YEAR"] + "."  + 
-                atd["ACADEMIC_TERM"].str.title()  + "."  + 
-                atd["EVENT_ID"].str.rstrip().str.upper() + "." + 
-                atd["EVENT_SUB_TYPE"].str.upper() + "."  + 
-                atd["SECTION"].str.upper()
+                keep=[src.query_spec.isin('EVENT_SUB_TYPE', include_section_types)],
                 )
-            atd['student_course_id'] = atd['PEOPLE_CODE_ID'] + "." + atd['course_section_id']
+            # students with a term ACADEMIC record, in credit-bearing sections
+            atd = atd.loc[(atd['ACADEMIC_YEAR'] >= year_start) & (atd['ACADEMIC_YEAR'] <= year_end) &
+                    atd['ACADEMIC_TERM'].isin(['FALL', 'SPRING']) &
+                    atd['has_academic'] &
+                    (atd['CREDIT'] > 0) &
+                    (atd['yearterm_sort'] < current.yearterm_sort), ]
+            atd['course_section_id'] = src.keys.composite_key(atd, 
+                ['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION'])
+            atd['student_course_id'] = src.keys.composite_key(atd, ['PEOPLE_CODE_ID', 'course_section_id'])
             atd = atd.rename(columns={'EVENT_ID': 'course', }) 
             keep_cols = [
                 'PEOPLE_CODE_ID', 'yearterm', 'yearterm_sort', 'course', 'course_section_id', 'student_course_id', 'FINAL_GRADE',
@@ -179,7 +125,7 @@ def write():
 
             st.write(f"#### Course Completion Rates by Year.Term ({year_start}-{year_end})")
 
-            g = ( atd[['yearterm', 'yearterm_sort', 'course', 'PEOPLE_CODE_ID', 'pass', 'dfw']].groupby(['yearterm', 'course', ]).agg(
+            g = ( atd[['yearterm', 'yearterm_sort', 'course', 'PEOPLE_CODE_ID', 'pass', 'dfw']].groupby(['yearterm', 'course', ], observed=True).agg(
                     {'yearterm_sort': 'first', 'PEOPLE_CODE_ID': 'count', 'pass': 'sum', 'dfw': 'sum' }
                 )
                 .rename(columns={'PEOPLE_CODE_ID': 'count', 'pass': 'pass_count', 'dfw': 'dfw_count' })
@@ -191,11 +137,10 @@ def write():
             g = g.reset_index()
             st.dataframe(gs)
             gs = gs.reset_index()
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(gs),
+            src.export.download_buttons(
+                gs,
+                key=export_key + ('course_completion_rates',),
                 file_name=f"{year_start}-{year_end}_course_completion_rates_{today_str}.csv",
-                mime='text/csv',
             )
 
 
@@ -210,11 +155,10 @@ def write():
             pass_rate = pass_rate.loc[:,terms]
             st.dataframe(pass_rate)
             pass_rate = pass_rate.reset_index()
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(pass_rate),
+            src.export.download_buttons(
+                pass_rate,
+                key=export_key + ('course_pass_rates',),
                 file_name=f"{year_start}-{year_end}_course_pass_rates_{today_str}.csv",
-                mime='text/csv',
             )
 
 
@@ -229,11 +173,10 @@ def write():
             dfw_rate = dfw_rate.loc[:,terms]
             st.dataframe(dfw_rate)
             dfw_rate = dfw_rate.reset_index()
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(dfw_rate),
+            src.export.download_buttons(
+                dfw_rate,
+                key=export_key + ('course_dfw_rates',),
                 file_name=f"{year_start}-{year_end}_course_dfw_rates_{today_str}.csv",
-                mime='text/csv',
             )
 
 
@@ -241,7 +184,7 @@ def write():
             st.markdown("---")
             st.write(f"#### Overall (for all courses) course completion rate table by term for period {year_start}-{year_end}")
 
-            overall = ( atd[['yearterm', 'yearterm_sort', 'student_course_id', 'pass', 'dfw']].groupby(['yearterm' ]).agg(
+            overall = ( atd[['yearterm', 'yearterm_sort', 'student_course_id', 'pass', 'dfw']].groupby(['yearterm' ], observed=True).agg(
                     {'yearterm_sort': 'first', 'student_course_id': 'count', 'pass': 'sum', 'dfw': 'sum' }
                 )
                 .rename(columns={'student_course_id': 'count', 'pass': 'pass_count', 'dfw': 'dfw_count' })
@@ -252,11 +195,10 @@ def write():
             overall = overall.loc[(overall['pass_count']!=0)&(overall['dfw_count']!=0), ]
             st.dataframe(overall)
             overall = overall.reset_index()
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(overall),
+            src.export.download_buttons(
+                overall,
+                key=export_key + ('overall_course_completion_rates',),
                 file_name=f"{year_start}-{year_end}_overall_course_completion_rates_{today_str}.csv",
-                mime='text/csv',
             )
             st.write(" ")
             c = alt.Chart(overall, title=alt.TitleParams(
@@ -348,11 +290,10 @@ def write():
             bottom10 = bottom10.sort_values(['yearterm_sort', 'pass_rate', 'count'], ascending=[True, True, False]).drop(columns=['yearterm_sort', ])
             st.dataframe(bottom10)
             bottom10 = bottom10.reset_index(drop=True)
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(bottom10),
+            src.export.download_buttons(
+                bottom10,
+                key=export_key + ('bottom10_course_pass_rates',),
                 file_name=f"{year_start}-{year_end}_bottom10_course_pass_rates_{today_str}.csv",
-                mime='text/csv',
             )
 
 
@@ -368,18 +309,17 @@ def write():
             top10 = top10.sort_values(['yearterm_sort', 'dfw_rate', 'count'], ascending=[True, False, False]).drop(columns=['yearterm_sort', ])
             st.dataframe(top10)
             top10 = top10.reset_index(drop=True)
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(top10),
+            src.export.download_buttons(
+                top10,
+                key=export_key + ('top10_course_dfw_rates',),
                 file_name=f"{year_start}-{year_end}_top10_course_dfw_rates_{today_str}.csv",
-                mime='text/csv',
             )
 
 
             # find course with lowest pass rate with at least 10 students over the entire period
             st.markdown("---")
             st.write(f"#### Lowest pass rate (for courses with at least 10 students) for the period {year_start}-{year_end}")
-            course_overall = ( atd[['course', 'student_course_id', 'pass', 'dfw']].groupby(['course' ]).agg(
+            course_overall = ( atd[['course', 'student_course_id', 'pass', 'dfw']].groupby(['course' ], observed=True).agg(
                     {'student_course_id': 'count', 'pass': 'sum', 'dfw': 'sum' }
                 )
                 .rename(columns={'student_course_id': 'count', 'pass': 'pass_count', 'dfw': 'dfw_count' })
@@ -413,11 +353,10 @@ def write():
                 # c = c + alt.Chart(pd.DataFrame({'x_min': [min_pass_rate]})).mark_rule(strokeDash=[5,5], color='blue').encode(x='x_min')
                 st.altair_chart(c)
             course_overall = course_overall.reset_index()
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(course_overall),
+            src.export.download_buttons(
+                course_overall,
+                key=export_key + ('course_overall_pass_rates',),
                 file_name=f"{year_start}-{year_end}_course_overall_pass_rates_{today_str}.csv",
-                mime='text/csv',
             )
 
             # Export to Excel
@@ -433,11 +372,11 @@ def write():
                     [bottom10, 'bottom10_pass' ],
                     [course_overall, 'course_overall'],
             ]
-            st.download_button(
+            src.export.xlsx_download_button(
                 label=f"Download Excel workbook for {year_start}-{year_end} as .xlsx",
-                data=convert_df_xlsx(df_to_add),
+                sheets=df_to_add,
+                key=export_key + ('course_completion_rates_workbook',),
                 file_name=f"{year_start}-{year_end}_course_completion_rates_{today_str}.xlsx",
-                mime='application/vnd.ms-excel',
             )
 
 
@@ -3,22 +3,17 @@ import streamlit as st
 import altair as alt
 import datetime as dt
 import src.pages.components
+import src.export
+import src.terms
+import src.query_cache
+import src.query_spec
 
 # PowerCampus utilities
 import powercampus as pc
 
-@st.cache_data
-def convert_df(df):
-    return df.to_csv(index=False).encode('utf-8')
 
 start_year = pc.START_ACADEMIC_YEAR
 
-current_yt_df = pc.current_yearterm()
-current_term = current_yt_df['term'].iloc[0]
-current_year = current_yt_df['year'].iloc[0]
-current_yt = current_yt_df['yearterm'].iloc[0]
-current_yt_sort = current_yt_df['yearterm_sort'].iloc[0]
-
 
 def write():
     """Used to write the page in the app.py file"""
@@ -30,29 +25,17 @@ def write():
 """
         )
 
+        current = src.terms.current_term()
+
         today = dt.datetime.today()
         today_str = today.strftime("%Y%m%d_%H%M")
         # st.write(f"{today.strftime('%Y-%m-%d %H:%M')}")
 
-        calendar = pc.select("ACADEMICCALENDAR",
-            fields=['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 
-                'START_DATE', 'END_DATE', 'FINAL_END_DATE' ], 
-            where=f"ACADEMIC_YEAR>='{start_year}' AND ACADEMIC_TERM IN ('FALL', 'SPRING', 'SUMMER')", 
-            distinct=True
-            )
-        calendar = pc.add_col_yearterm(calendar)
-        calendar = pc.add_col_yearterm_sort(calendar)
-        term_df = ( calendar.drop_duplicates(['yearterm_sort', 'yearterm'])
-                        .sort_values(['yearterm_sort'], ascending=True)
-                        .loc[:,['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'yearterm_sort', 'yearterm']]
-        )
-        term_df = term_df.set_index('yearterm')
-
-        year_list = term_df['ACADEMIC_YEAR'].unique().tolist()
+        year_list = src.terms.years(start_year)
         year_start, year_end = st.select_slider(
             "Select range of years:",
             options=year_list,
-            value=('2012', current_year)
+            value=('2012', current.year)
         )
 
         term = st.selectbox(label="Select term:", options=['Fall', 'Spring'])
@@ -62,17 +45,15 @@ def write():
 
         if year_start and year_end and term and gpa_type:
 
-            academic = pc.select("ACADEMIC",
-                fields=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION',
-                    'PROGRAM', 'DEGREE', 'CURRICULUM', 'COLLEGE', 'DEPARTMENT', 'CLASS_LEVEL', 'POPULATION',
-                    'FULL_PART', 'ACADEMIC_STANDING', 'ENROLL_SEPARATION', 'SEPARATION_DATE', 'CREDITS',  
-                    'COLLEGE_ATTEND', 'STATUS', 'PRIMARY_FLAG',
-                    ],
+            academic_query = dict(
+                fields=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'PROGRAM', ],
                 where=f"ACADEMIC_YEAR>='{int(year_start)}' and ACADEMIC_YEAR<='{int(year_end)}' and ACADEMIC_TERM='{term}' " +
                     "and ACADEMIC_SESSION='' and CREDITS>0 and CURRICULUM<>'ADVST' and PRIMARY_FLAG='Y' ", 
             )
+            academic = src.query_cache.select("ACADEMIC", **academic_query)
+            # filtered after the pull, so one cached pull serves both choices
             if undergrad_only:
-                academic = academic.loc[(academic['PROGRAM'] != 'G')]
+                academic = src.query_spec.apply(academic, [src.query_spec.ne('PROGRAM', 'G')])
             keep_cols = [
                 'PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM',
             ]
@@ -82,15 +63,16 @@ def write():
             # st.write(academic.shape)
             # st.dataframe(academic)
 
-            transcript_gpa = pc.select("TRANSCRIPTGPA",
-                fields=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 'RECORD_TYPE', 'GPA', 'ATTEMPTED_CREDITS',],
+            gpa_query = dict(
+                fields=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'RECORD_TYPE', 'GPA', ],
                 where=f"ACADEMIC_YEAR>='{int(year_start)}' and ACADEMIC_YEAR<='{int(year_end)}' and ACADEMIC_TERM='{term}' " +
                     "and ACADEMIC_SESSION='' and ATTEMPTED_CREDITS>0.0 ", 
                 )
-            if gpa_type == 'Cumulative':
-                transcript_gpa = transcript_gpa.loc[(transcript_gpa['RECORD_TYPE'] == 'O')]
-            else:
-                transcript_gpa = transcript_gpa.loc[(transcript_gpa['RECORD_TYPE'] == 'T')]
+            transcript_gpa = src.query_cache.select("TRANSCRIPTGPA", **gpa_query)
+            # term or cumulative GPA records, filtered after the pull so one
+            # cached pull serves both GPA types
+            record_type = 'O' if gpa_type == 'Cumulative' else 'T'
+            transcript_gpa = src.query_spec.apply(transcript_gpa, [src.query_spec.eq('RECORD_TYPE', record_type)])
             keep_cols = [
                 'PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'GPA', 
             ]
@@ -100,6 +82,10 @@ def write():
             # st.write(transcript_gpa.shape)
             # st.dataframe(transcript_gpa)
  
+            # identifies the tables below in the export cache
+            export_key = ('registrar_gpa_distribution', year_start, year_end, term, gpa_type, undergrad_only,
+                src.query_cache.version("ACADEMIC", **academic_query), src.query_cache.version("TRANSCRIPTGPA", **gpa_query))
+
             atgpa = academic.merge(transcript_gpa,
                 how='left',
                 on=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', ]
@@ -132,11 +118,10 @@ def write():
                 'max': '{:.2f}',
             })
             st.dataframe(formatted_agg_ytgpa)
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(agg_ytgpa),
+            src.export.download_buttons(
+                agg_ytgpa,
+                key=export_key + ('gpa_statistics',),
                 file_name=f"{term}_{year_start}-{year_end}_gpa_statistics.csv",
-                mime='text/csv',
             )
 
             c = alt.Chart(agg_ytgpa.reset_index()).mark_bar().encode(
@@ -176,12 +161,11 @@ def write():
             )
             gpabc['Total'] = gpabc[labels].sum(axis=1)
             st.dataframe(gpabc)
-            st.download_button(
-                key='GPA Bins - Counts',
-                label="Download data as CSV",
-                data=gpabc.to_csv(index=True).encode('utf-8'),
+            src.export.download_buttons(
+                gpabc,
+                key=export_key + ('gpa_yt_bins_count',),
                 file_name=f"{term}_{year_start}-{year_end}_gpa_yt_bins_count.csv",
-                mime='text/csv',
+                index=True,
             )
 
             st.write("##### GPA Bins - Percentages")
@@ -197,12 +181,11 @@ def write():
                          values='pct'
                          )
             st.dataframe(gpabp.style.format('{:.1f}'))
-            st.download_button(
-                key='GPA Bins - Percentages',
-                label="Download data as CSV",
-                data=gpabp.to_csv(index=True).encode('utf-8'),
+            src.export.download_buttons(
+                gpabp,
+                key=export_key + ('gpa_yt_bins_pct',),
                 file_name=f"{term}_{year_start}-{year_end}_gpa_yt_bins_pct.csv",
-                mime='text/csv',
+                index=True,
             )
 
             st.write("##### GPA Bins - Visualization")
@@ -249,12 +232,11 @@ def write():
             )
             gpabc2['Total'] = gpabc2[labels].sum(axis=1)
             st.dataframe(gpabc2)
-            st.download_button(
-                key='GPA Above 2.0 - Counts',
-                label="Download data as CSV",
-                data=gpabc2.to_csv(index=True).encode('utf-8'),
+            src.export.download_buttons(
+                gpabc2,
+                key=export_key + ('gpa_yt_gt2_bins_count',),
                 file_name=f"{term}_{year_start}-{year_end}_gpa_yt_gt2_bins_count.csv",
-                mime='text/csv',
+                index=True,
             )
 
             st.write("##### GPA Above 2.0 - Percentages")
@@ -270,12 +252,11 @@ def write():
                          values='pct'
                          )
             st.dataframe(gpabp2.style.format('{:.1f}'))
-            st.download_button(
-                key='GPA Above 2.0 - Percentages',
-                label="Download data as CSV",
-                data=gpabp2.to_csv(index=True).encode('utf-8'),
+            src.export.download_buttons(
+                gpabp2,
+                key=export_key + ('gpa_yt_gt2_bins_pct',),
                 file_name=f"{term}_{year_start}-{year_end}_gpa_yt_gt2_bins_pct.csv",
-                mime='text/csv',
+                index=True,
             )
 
             st.write("##### GPA Above 2.0 - Visualization")
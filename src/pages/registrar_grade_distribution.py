@@ -3,22 +3,18 @@ import streamlit as st
 import altair as alt
 import datetime as dt
 import src.pages.components
+import src.export
+import src.terms
+import src.course_facts
+import src.keys
+import src.query_spec
 
 # PowerCampus utilities
 import powercampus as pc
 
-@st.cache_data
-def convert_df(df):
-    return df.to_csv(index=False).encode('utf-8')
 
 start_year = pc.START_ACADEMIC_YEAR
 
-current_yt_df = pc.current_yearterm()
-current_term = current_yt_df['term'].iloc[0]
-current_year = current_yt_df['year'].iloc[0]
-current_yt = current_yt_df['yearterm'].iloc[0]
-current_yt_sort = current_yt_df['yearterm_sort'].iloc[0]
-
 
 def write():
     """Used to write the page in the app.py file"""
@@ -30,29 +26,17 @@ def write():
 """
         )
 
+        current = src.terms.current_term()
+
         today = dt.datetime.today()
         today_str = today.strftime("%Y%m%d_%H%M")
         # st.write(f"{today.strftime('%Y-%m-%d %H:%M')}")
 
-        calendar = pc.select("ACADEMICCALENDAR",
-            fields=['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 
-                'START_DATE', 'END_DATE', 'FINAL_END_DATE' ], 
-            where=f"ACADEMIC_YEAR>='{start_year}' AND ACADEMIC_TERM IN ('FALL', 'SPRING', 'SUMMER')", 
-            distinct=True
-            )
-        calendar = pc.add_col_yearterm(calendar)
-        calendar = pc.add_col_yearterm_sort(calendar)
-        term_df = ( calendar.drop_duplicates(['yearterm_sort', 'yearterm'])
-                        .sort_values(['yearterm_sort'], ascending=True)
-                        .loc[:,['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'yearterm_sort', 'yearterm']]
-        )
-        term_df = term_df.set_index('yearterm')
-
-        year_list = term_df['ACADEMIC_YEAR'].unique().tolist()
+        year_list = src.terms.years(start_year)
         year_start, year_end = st.select_slider(
             "Select range of years:",
             options=year_list,
-            value=('2012', current_year)
+            value=('2012', current.year)
         )
 
         term = st.selectbox(label="Select term:", options=['Fall', 'Spring'])
@@ -70,42 +54,25 @@ def write():
 
         if year_start and year_end and term and include_section_types:
 
-            academic = pc.select("ACADEMIC",
-                fields=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION',
-                    'PROGRAM', 'DEGREE', 'CURRICULUM', 'COLLEGE', 'DEPARTMENT', 'CLASS_LEVEL', 'POPULATION',
-                    'FULL_PART', 'ACADEMIC_STANDING', 'ENROLL_SEPARATION', 'SEPARATION_DATE', 'CREDITS',  
-                    'COLLEGE_ATTEND', 'STATUS', 'PRIMARY_FLAG',
-                    ],
-                where=f"ACADEMIC_YEAR>='{int(year_start)}' and ACADEMIC_YEAR<='{int(year_end)}' and ACADEMIC_TERM='{term}' " +
-                    "and ACADEMIC_SESSION='' and CREDITS>0 and CURRICULUM<>'ADVST' ", 
-            )
-
+            # section types and programs kept
+            keep = [src.query_spec.isin('EVENT_SUB_TYPE', include_section_types)]
             if undergrad_only:
-                academic = academic.loc[(academic['PROGRAM'] != 'G')]
+                keep.append(src.query_spec.ne('PROGRAM', 'G'))
 
-            transcriptdetail = pc.select("TRANSCRIPTDETAIL",
-                fields=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION',
-                    'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION', 'EVENT_TYPE', 'EVENT_MED_NAME', 'EVENT_LONG_NAME',
-                    'CREDIT', 'MID_GRADE', 'FINAL_GRADE', 'ADD_DROP_WAIT',
+            atd = src.course_facts.enrollment_facts(start_year,
+                columns=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'yearterm',
+                    'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION', 'MID_GRADE', 'FINAL_GRADE',
+                    'has_academic',
                     ],
-                where=f"ACADEMIC_YEAR>='{int(year_start)}' and ACADEMIC_YEAR<='{int(year_end)}' and ACADEMIC_TERM='{term}' " +
-                    "and ADD_DROP_WAIT='A' ", 
-            )
-            transcriptdetail = transcriptdetail.loc[(transcriptdetail['EVENT_SUB_TYPE'].isin(include_section_types))]
-
-            atd = academic.merge(transcriptdetail,
-                how='left',
-                on=['PEOPLE_CODE_ID', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', ]
-                )
-            atd = pc.add_col_yearterm(atd)
-            atd = pc.add_col_yearterm_sort(atd)
-            atd['course_section_id'] = (
-                atd["EVENT_ID"].str.rstrip().str.upper() + "." + 
-                atd["EVENT_SUB_TYPE"].str.upper() + "."  + 
-                atd["ACADEMIC_YEAR"] + "."  + 
-                atd["ACADEMIC_TERM"].str.title()  + "."  + 
-                atd["SECTION"].str.upper()
+                keep=keep,
                 )
+            # students with a term ACADEMIC record
+            atd = atd.loc[(atd['ACADEMIC_YEAR'] >= year_start) & (atd['ACADEMIC_YEAR'] <= year_end) &
+                    (atd['ACADEMIC_TERM'] == term.upper()) &
+                    atd['has_academic'], ]
+
+            atd['course_section_id'] = src.keys.composite_key(atd, 
+                ['EVENT_ID', 'EVENT_SUB_TYPE', 'ACADEMIC_YEAR', 'ACADEMIC_TERM', 'SECTION'])
             keep_cols = [
                 'PEOPLE_CODE_ID', 'yearterm', 'course_section_id', 'MID_GRADE', 'FINAL_GRADE',
             ]
@@ -183,11 +150,10 @@ def write():
             )
             grade_dist[grade_sort] = grade_dist[grade_sort].astype(int)
             st.dataframe(grade_dist)
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(grade_dist),
+            src.export.download_buttons(
+                grade_dist,
+                key=('registrar_grade_distribution', 'grade_distribution', year_start, year_end, term, undergrad_only, tuple(include_section_types), grade_type, src.course_facts.data_version(start_year, tuple(src.course_facts.ENROLLMENT_TABLES))),
                 file_name=f"{term}_{year_start}-{year_end}_grade_distribution.csv",
-                mime='text/csv',
             )
 
             c1 = alt.Chart(g).transform_joinaggregate(
@@ -3,21 +3,24 @@ import streamlit as st
 import altair as alt
 import datetime as dt
 import src.pages.components
+import src.export
+import src.terms
+import src.query_cache
+import src.query_spec
+import src.keys
 
 # PowerCampus utilities
 import powercampus as pc
 
-@st.cache_data
-def convert_df(df):
-    return df.to_csv(index=False).encode('utf-8')
 
 start_year = pc.START_ACADEMIC_YEAR
 
-current_yt_df = pc.current_yearterm()
-current_term = current_yt_df['term'].iloc[0]
-current_year = current_yt_df['year'].iloc[0]
-current_yt = current_yt_df['yearterm'].iloc[0]
-current_yt_sort = current_yt_df['yearterm_sort'].iloc[0]
+# sections counted whatever the selections: no REG or ACE, ADV, CELL, STAB
+# sections; filtered in the query
+KEEP_SECTIONS = [
+    src.query_spec.not_startswith('EVENT_ID', 'REG'),
+    src.query_spec.not_in('EVENT_SUB_TYPE', ['ACE', 'ADV', 'CELL', 'STAB']),
+]
 
 
 def write():
@@ -30,29 +33,17 @@ def write():
 """
         )
 
+        current = src.terms.current_term()
+
         today = dt.datetime.today()
         today_str = today.strftime("%Y%m%d_%H%M")
         # st.write(f"{today.strftime('%Y-%m-%d %H:%M')}")
 
-        calendar = pc.select("ACADEMICCALENDAR",
-            fields=['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 
-                'START_DATE', 'END_DATE', 'FINAL_END_DATE' ], 
-            where=f"ACADEMIC_YEAR>='{start_year}' AND ACADEMIC_TERM IN ('FALL', 'SPRING', 'SUMMER')", 
-            distinct=True
-            )
-        calendar = pc.add_col_yearterm(calendar)
-        calendar = pc.add_col_yearterm_sort(calendar)
-        term_df = ( calendar.drop_duplicates(['yearterm_sort', 'yearterm'])
-                        .sort_values(['yearterm_sort'], ascending=True)
-                        .loc[:,['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'yearterm_sort', 'yearterm']]
-        )
-        term_df = term_df.set_index('yearterm')
-
-        year_list = term_df['ACADEMIC_YEAR'].unique().tolist()
+        year_list = src.terms.years(start_year)
         year_start, year_end = st.select_slider(
             "Select range of years:",
             options=year_list,
-            value=('2012', current_year)
+            value=('2012', current.year)
         )
 
         term = st.selectbox(label="Select term:", options=['Fall', 'Spring'])
@@ -65,27 +56,33 @@ def write():
 
         if year_start and year_end and term and include_section_types:
 
-            sections = pc.select("SECTIONS", 
+            # sections kept by the page's widgets; filtered after the pull, so
+            # one cached pull serves every selection
+            selected = [src.query_spec.isin('EVENT_SUB_TYPE', include_section_types)]
+            if undergrad_only:
+                selected.append(src.query_spec.ne('PROGRAM', 'G'))
+            if exclude_online:
+                selected.append(src.query_spec.not_contains('SECTION', 'ON'))
+
+            sections_query = dict(
                 fields=['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION',
-                    'EVENT_LONG_NAME', 'PROGRAM', 'COLLEGE', 'EVENT_STATUS', 'CREDITS', 'MAX_PARTICIPANT', 'ADDS', 'WAIT_LIST', 
-                    'START_DATE', 'END_DATE'],
-                where=f"ACADEMIC_YEAR>='{int(year_start)}' and ACADEMIC_YEAR<='{int(year_end)}' and ACADEMIC_TERM='{term}' " +
-                    "and ADDS>0 and EVENT_STATUS='A' ", 
+                    'PROGRAM', 'ADDS', ],
+                where=src.query_spec.where(
+                    f"ACADEMIC_YEAR>='{int(year_start)}' and ACADEMIC_YEAR<='{int(year_end)}' and ACADEMIC_TERM='{term}' " +
+                    "and ADDS>0 and EVENT_STATUS='A' ",
+                    KEEP_SECTIONS),
                 )
-            sections = sections.loc[(~sections['EVENT_ID'].str.startswith('REG')) & (~sections['EVENT_SUB_TYPE'].isin(['ACE', 'ADV', 'CELL', 'STAB'])), :]
+            sections = src.query_cache.select("SECTIONS", **sections_query)
+
+            # identifies the tables below in the export cache
+            export_key = ('registrar_section_sizes', year_start, year_end, term, undergrad_only, exclude_online, tuple(include_section_types),
+                src.query_cache.version("SECTIONS", **sections_query))
+
+            sections = src.query_spec.apply(sections, selected)
             sections = sections.drop_duplicates(['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION'])
             sections = sections.sort_values(['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION'])
-            sections['section_id'] = (
-                sections["EVENT_ID"].str.rstrip().str.upper() + "." + 
-                sections["EVENT_SUB_TYPE"].str.upper() + "."  + 
-                sections["SECTION"].str.upper()
-                )
+            sections['section_id'] = src.keys.composite_key(sections, ['EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION'])
             sections['yearterm'] = sections["ACADEMIC_YEAR"] + "." + sections["ACADEMIC_TERM"].str.title()
-            if undergrad_only:
-                sections = sections.loc[(sections['PROGRAM'] != 'G')]
-            if exclude_online:
-                sections = sections.loc[(~sections['SECTION'].str.contains('ON'))]
-            sections = sections.loc[(sections['EVENT_SUB_TYPE'].isin(include_section_types))]
 
             st.write(f"#### Section Sizes ({term} {year_start}-{year_end})")
             agg_ss = ( sections[['yearterm', 'section_id', 'ADDS']].groupby(['yearterm']).agg(
@@ -103,11 +100,10 @@ def write():
                     )
             )
             st.dataframe(agg_ss)
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(agg_ss),
+            src.export.download_buttons(
+                agg_ss,
+                key=export_key + ('section_sizes',),
                 file_name=f"{term}_{year_start}-{year_end}_section_sizes.csv",
-                mime='text/csv',
             )
 
             c = alt.Chart(agg_ss.reset_index()).mark_bar().encode(
@@ -141,11 +137,10 @@ def write():
 
             # st.dataframe(ss)
             st.dataframe(ssb)
-            st.download_button(
-                label="Download data as CSV",
-                data=convert_df(ssb),
+            src.export.download_buttons(
+                ssb,
+                key=export_key + ('section_size_bins',),
                 file_name=f"{term}_{year_start}-{year_end}_section_size_bins.csv",
-                mime='text/csv',
             )
 
             # c = alt.Chart(ss).mark_bar().encode(
@@ -0,0 +1,232 @@
+"""Term-partitioned local store for historical PowerCampus tables
+
+Query results are kept as one Parquet file per (table, query, ACADEMIC_YEAR,
+ACADEMIC_TERM). Partitions for terms that ended more than FREEZE_GRACE ago are
+frozen: they are not fetched again on a timer as open (current/future) terms
+are, so a cache miss costs "terms still open" rather than "years of history".
+
+Each partition is stored with the stamp of its term when it was fetched, the
+row count and last REVISION_DATE of the term in the table (term_stamps()). A
+partition whose stamp no longer matches, e.g. after a late grade change in a
+closed term, is fetched again, frozen or not. invalidate() drops a term's
+partitions outright.
+"""
+import datetime as dt
+import hashlib
+import json
+import time
+import pandas as pd
+import streamlit as st
+
+# PowerCampus utilities
+import powercampus as pc
+
+import src.db
+import src.profiling
+import src.query_cache
+import src.terms
+
+PARTITION_DIR = src.query_cache.CACHE_ROOT / "partitions"
+
+# grades and enrollment changes can still be posted for a while after a term ends
+FREEZE_GRACE = dt.timedelta(days=60)
+
+# how long an open term's partition is used before it is fetched again
+OPEN_PARTITION_TTL = dt.timedelta(hours=1)
+
+# how long the ACADEMICCALENDAR term end dates are kept
+TERM_END_TTL = dt.timedelta(hours=12)
+
+# how long term stamps are trusted before the table is checked again
+STAMP_TTL = dt.timedelta(minutes=5)
+
+
+@st.cache_resource(ttl=TERM_END_TTL)
+def term_end_dates() -> dict:
+    """
+    returns {(ACADEMIC_YEAR, ACADEMIC_TERM): last END_DATE} for every term in
+    ACADEMICCALENDAR, with ACADEMIC_TERM upper case
+    """
+    calendar = pc.select("ACADEMICCALENDAR",
+        fields=['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'END_DATE', 'FINAL_END_DATE', ],
+        distinct=True
+        )
+    calendar['ACADEMIC_TERM'] = calendar['ACADEMIC_TERM'].str.upper()
+    calendar['end'] = calendar[['END_DATE', 'FINAL_END_DATE']].max(axis=1)
+    ends = calendar.groupby(['ACADEMIC_YEAR', 'ACADEMIC_TERM'])['end'].max()
+    return ends.to_dict()
+
+
+def is_frozen(year, term, today=None) -> bool:
+    """
+    returns True if the year/term ended more than FREEZE_GRACE ago
+
+    Terms that are not in ACADEMICCALENDAR are frozen once they are two or more
+    years before the current year.
+    """
+    today = pd.Timestamp(today or dt.date.today())
+    end = term_end_dates().get((str(year), term.upper()))
+    if end is None or pd.isna(end):
+        return int(year) <= int(src.terms.current_term().year) - 2
+    return (pd.Timestamp(end) + FREEZE_GRACE) < today
+
+
+@st.cache_data(ttl=STAMP_TTL)
+def term_stamps(table, year_start) -> dict:
+    """
+    returns {(ACADEMIC_YEAR, ACADEMIC_TERM): (row count, last REVISION_DATE)}
+    for every term of table from year_start on, with ACADEMIC_TERM upper case;
+    a term's stamp changes whenever its rows are added, removed or revised
+    """
+    stamps = src.db.read_sql_query(
+        f"SELECT ACADEMIC_YEAR, UPPER(ACADEMIC_TERM) AS ACADEMIC_TERM, "
+        f"COUNT(*) AS row_count, MAX(REVISION_DATE) AS revised "
+        f"FROM dbo.[{table}] WHERE ACADEMIC_YEAR>='{int(year_start)}' "
+        f"GROUP BY ACADEMIC_YEAR, UPPER(ACADEMIC_TERM)"
+    )
+    return {
+        (str(r.ACADEMIC_YEAR), r.ACADEMIC_TERM): (int(r.row_count), str(r.revised))
+        for r in stamps.itertuples(index=False)
+    }
+
+
+@st.cache_data(ttl=STAMP_TTL)
+def table_stamp(table) -> tuple:
+    """
+    returns (row count, last REVISION_DATE) of table, for tables without
+    terms; the stamp changes whenever rows are added, removed or revised
+    """
+    stamp = src.db.read_sql_query(
+        f"SELECT COUNT(*) AS row_count, MAX(REVISION_DATE) AS revised FROM dbo.[{table}]"
+    )
+    r = next(stamp.itertuples(index=False))
+    return (int(r.row_count), str(r.revised))
+
+
+def invalidate(table, year, term):
+    """
+    removes every partition of table for the year/term, whatever the query,
+    so it is fetched again on the next select()
+    """
+    for path in (PARTITION_DIR / table.upper()).glob(f"*/{year}_{term.upper()}.*"):
+        path.unlink(missing_ok=True)
+
+
+def _partition_dir(table, fields, where):
+    query = {'fields': list(fields), 'where': " ".join(where.split()) if where else ''}
+    key = hashlib.sha256(json.dumps(query, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    return PARTITION_DIR / table.upper() / key
+
+
+def _partition_path(directory, year, term):
+    return directory / f"{year}_{term.upper()}.parquet"
+
+
+def _stamp_path(path):
+    return path.with_suffix(".stamp.json")
+
+
+def _is_current(path, frozen, open_ttl, stamp) -> bool:
+    try:
+        mtime = path.stat().st_mtime
+        stored = json.loads(_stamp_path(path).read_text())
+    except (OSError, ValueError):
+        return False
+    if tuple(stored) != tuple(stamp):
+        return False
+    return frozen or (time.time() - mtime) <= open_ttl.total_seconds()
+
+
+def _write(path, part, stamp):
+    """
+    writes a partition, then the stamp it was fetched under; a partition
+    without its stamp is fetched again
+    """
+    if src.query_cache.write_parquet(path, part):
+        _stamp_path(path).write_text(json.dumps(list(stamp)))
+
+
+def _fetch(table, fields, where, year_terms) -> pd.DataFrame:
+    """
+    returns the rows for all year_terms in a single query
+    """
+    terms_by_year = {}
+    for year, term in year_terms:
+        terms_by_year.setdefault(year, []).append(term)
+    term_where = " or ".join(
+        f"(ACADEMIC_YEAR='{year}' and ACADEMIC_TERM IN ({', '.join(repr(t) for t in terms)}))"
+        for year, terms in terms_by_year.items()
+    )
+    where = f"({where}) and ({term_where})" if where else term_where
+
+    fetch_fields = list(fields)
+    for f in ['ACADEMIC_YEAR', 'ACADEMIC_TERM']:
+        if f not in fetch_fields:
+            fetch_fields.append(f)
+    return src.db.select(table, fields=fetch_fields, where=where)
+
+
+def select(table, fields, where, year_start, year_end=None, terms=src.terms.TERMS,
+        open_ttl=OPEN_PARTITION_TTL) -> pd.DataFrame:
+    """
+    pc.select() for years year_start to year_end (inclusive) and the given terms,
+    read from term partitions where possible
+
+    Arguments:
+        table - PowerCampus table name
+        fields - list of fields to select
+        where - SQL where clause, without the ACADEMIC_YEAR/ACADEMIC_TERM conditions
+        year_start - first ACADEMIC_YEAR
+        year_end - last ACADEMIC_YEAR, defaults to the year after the current year
+        terms - ACADEMIC_TERM values
+        open_ttl - datetime.timedelta an open term's partition is used for
+    """
+    if year_end is None:
+        year_end = int(src.terms.current_term().year) + 1
+    directory = _partition_dir(table, fields, where)
+    year_terms = [(str(y), t.upper())
+                    for y in range(int(year_start), int(year_end) + 1)
+                    for t in terms]
+
+    with src.profiling.timed('partitions', table) as record:
+        stamps = term_stamps(table, str(int(year_start)))
+        df, fetched = _select(table, fields, where, directory, year_terms, open_ttl, stamps)
+        record['cache'] = 'hit' if fetched == 0 else ('miss' if fetched == len(year_terms) else 'partial')
+        record.update(src.profiling.frame_stats(df))
+    return df
+
+
+def _select(table, fields, where, directory, year_terms, open_ttl, stamps):
+    """
+    returns the rows for year_terms and the number of partitions fetched
+    """
+    # terms without rows have no stamp
+    no_rows = (0, str(None))
+    stale = [(y, t) for y, t in year_terms
+                if not _is_current(_partition_path(directory, y, t), is_frozen(y, t), open_ttl,
+                    stamps.get((y, t), no_rows))]
+    fetched_parts = {}
+    if stale:
+        fetched = _fetch(table, fields, where, stale)
+        fetched_term = fetched['ACADEMIC_TERM'].str.upper()
+        for y, t in stale:
+            part = fetched.loc[(fetched['ACADEMIC_YEAR']==y) & (fetched_term==t), fields]
+            _write(_partition_path(directory, y, t), part, stamps.get((y, t), no_rows))
+            fetched_parts[(y, t)] = part
+
+    parts = []
+    for y, t in year_terms:
+        if (y, t) in fetched_parts:
+            parts.append(fetched_parts[(y, t)])
+            continue
+        try:
+            parts.append(pd.read_parquet(_partition_path(directory, y, t)))
+        except Exception:
+            # an unreadable partition is fetched again on its own
+            part = _fetch(table, fields, where, [(y, t)]).loc[:, fields]
+            _write(_partition_path(directory, y, t), part, stamps.get((y, t), no_rows))
+            parts.append(part)
+
+    if not parts:
+        return pd.DataFrame(columns=fields), len(stale)
+    return pd.concat(parts, ignore_index=True), len(stale)
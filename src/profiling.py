@@ -0,0 +1,166 @@
+"""Timing of page renders, queries and cache file reads
+
+Each timed call becomes a record with its wall time, rows returned, bytes
+and cache hit/miss. The records of the page just rendered can be shown in the
+sidebar with sidebar_panel(). With PSC_DASHBOARD_PROFILE_LOG=1 set, records
+are also appended as JSON lines to PROFILE_LOG for offline analysis; the log
+is rotated at PROFILE_LOG_MAX_BYTES, keeping one older file.
+"""
+import contextvars
+import datetime as dt
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+import pandas as pd
+import streamlit as st
+
+# PowerCampus utilities
+import powercampus as pc
+
+import src.single_flight
+
+# profiling records are appended to <repo>/logs/profile.jsonl
+PROFILE_LOG = Path(__file__).resolve().parent.parent / "logs" / "profile.jsonl"
+
+# environment variable that turns on writing PROFILE_LOG when set to 1
+LOG_ENV = "PSC_DASHBOARD_PROFILE_LOG"
+
+# whether PROFILE_LOG is written; pages are timed for the panel either way
+LOG_ENABLED = os.environ.get(LOG_ENV) == "1"
+
+# PROFILE_LOG is renamed to profile.jsonl.1, replacing the older one, when it
+# grows past this
+PROFILE_LOG_MAX_BYTES = 20 * 1024**2
+
+# session_state key holding the records of the last page rendered
+RECORDS_KEY = "profiling_records"
+
+# name of the page being rendered, and the records collected while rendering it
+_page = contextvars.ContextVar("profiling_page", default=None)
+_records = contextvars.ContextVar("profiling_records", default=None)
+
+_log_lock = threading.Lock()
+
+
+def frame_stats(df) -> dict:
+    """
+    returns the rows and in-memory bytes (without object contents) of a DataFrame
+    """
+    return {'rows': len(df), 'bytes': int(df.memory_usage(index=False).sum())}
+
+
+def _write_log(record):
+    try:
+        PROFILE_LOG.parent.mkdir(parents=True, exist_ok=True)
+        line = json.dumps(record, default=str)
+        with _log_lock:
+            try:
+                if PROFILE_LOG.stat().st_size > PROFILE_LOG_MAX_BYTES:
+                    os.replace(PROFILE_LOG, PROFILE_LOG.with_name(PROFILE_LOG.name + ".1"))
+            except FileNotFoundError:
+                pass
+            with open(PROFILE_LOG, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+    except OSError:
+        # profiling never breaks a page
+        pass
+
+
+@contextmanager
+def timed(kind, name, **fields):
+    """
+    context manager recording the wall time of its block, e.g.
+
+        with src.profiling.timed('sql', sql) as record:
+            df = pd.read_sql_query(sql, conn)
+            record.update(src.profiling.frame_stats(df))
+
+    Arguments:
+        kind - kind of call, e.g. 'page', 'sql', 'pc.select', 'file'
+        name - what was called, e.g. the table, query or file
+        fields - initial record fields, e.g. cache='hit'
+    """
+    record = {
+        'time': dt.datetime.now().isoformat(timespec='seconds'),
+        'page': _page.get(),
+        'kind': kind,
+        'name': name,
+        'seconds': None,
+        'rows': None,
+        'bytes': None,
+        'cache': None,
+        **fields,
+    }
+    started = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record['error'] = type(e).__name__
+        raise
+    finally:
+        record['seconds'] = round(time.perf_counter() - started, 4)
+        records = _records.get()
+        if records is not None:
+            records.append(record)
+        if LOG_ENABLED:
+            _write_log(record)
+
+
+@contextmanager
+def page(name):
+    """
+    context manager timing a page render; the records of the calls made while
+    rendering are kept in st.session_state for sidebar_panel()
+    """
+    records = []
+    page_token = _page.set(name)
+    records_token = _records.set(records)
+    try:
+        with timed('page', name):
+            yield
+    finally:
+        _records.reset(records_token)
+        _page.reset(page_token)
+        try:
+            st.session_state[RECORDS_KEY] = records
+        except Exception:
+            # not rendering in a session, e.g. warm-up
+            pass
+
+
+def _profiled_select(select):
+    @functools.wraps(select)
+    def wrapper(table, *args, **kwargs):
+        with timed('pc.select', table, cache='miss') as record:
+            df = select(table, *args, **kwargs)
+            record.update(frame_stats(df))
+        return df
+    wrapper.profiled = True
+    return wrapper
+
+
+def install():
+    """
+    times every pc.select() call; safe to call more than once
+    """
+    if not getattr(pc.select, 'profiled', False):
+        pc.select = _profiled_select(pc.select)
+
+
+def sidebar_panel():
+    """
+    writes an optional sidebar panel with the timed calls of the last page
+    rendered and the single-flight metrics
+    """
+    if not st.sidebar.checkbox("Show profiling", value=False):
+        return
+    records = st.session_state.get(RECORDS_KEY, [])
+    df = pd.DataFrame(records, columns=['kind', 'name', 'seconds', 'rows', 'bytes', 'cache'])
+    st.sidebar.write(f"{len(df)} timed calls")
+    st.sidebar.dataframe(df, hide_index=True)
+    st.sidebar.write("Coalesced queries")
+    st.sidebar.dataframe(src.single_flight.metrics(), hide_index=True)
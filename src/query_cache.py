@@ -0,0 +1,161 @@
+"""Persistent on-disk cache for PowerCampus query results
+
+Results of PowerCampus selects are stored as Parquet files keyed by
+(table, fields, where, distinct), so a repeated query costs a local file read
+instead of a database scan, and the cache survives app restarts.
+"""
+import datetime as dt
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+import pandas as pd
+
+import src.db
+import src.profiling
+
+# local cache files live under <repo>/cache
+CACHE_ROOT = Path(__file__).resolve().parent.parent / "cache"
+
+CACHE_DIR = CACHE_ROOT / "query"
+
+# how long a cached query result is used before it is fetched again
+QUERY_TTL = dt.timedelta(hours=12)
+
+# least recently used results are removed once the cache grows past this size
+MAX_CACHE_BYTES = 2 * 1024**3
+
+
+def query_key(table, fields=None, where=None, distinct=False) -> str:
+    """
+    returns the cache key for a select query
+    """
+    query = {
+        'table': table.upper(),
+        'fields': list(fields) if fields is not None else None,
+        'where': " ".join(where.split()) if where is not None else None,
+        'distinct': bool(distinct),
+    }
+    return hashlib.sha256(json.dumps(query, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _cache_path(key) -> Path:
+    return CACHE_DIR / f"{key}.parquet"
+
+
+def _read(path, ttl):
+    """
+    returns the cached result in path, or None if it is missing, expired or unreadable
+    """
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    if (time.time() - stat.st_mtime) > ttl.total_seconds():
+        return None
+    try:
+        df = pd.read_parquet(path)
+    except Exception:
+        return None
+    # access time orders eviction; modification time stays the time the query ran
+    try:
+        os.utime(path, (time.time(), stat.st_mtime))
+    except OSError:
+        pass
+    return df
+
+
+def write_parquet(path, df):
+    """
+    writes df to path atomically, so a concurrent reader never sees a partial file;
+    returns False if df could not be stored as Parquet
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    os.close(fd)
+    try:
+        df.to_parquet(tmp_name, index=False)
+        os.replace(tmp_name, path)
+    except Exception:
+        # results that cannot be stored as Parquet are simply not cached
+        try:
+            os.remove(tmp_name)
+        except OSError:
+            pass
+        return False
+    return True
+
+
+def evict(max_bytes=MAX_CACHE_BYTES):
+    """
+    removes the least recently used results until the cache is within max_bytes
+    """
+    entries = []
+    for path in CACHE_DIR.glob("*.parquet"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_atime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries, key=lambda e: e[0]):
+        if total <= max_bytes:
+            break
+        try:
+            path.unlink()
+            total -= size
+        except FileNotFoundError:
+            total -= size
+        except OSError:
+            pass
+
+
+def clear():
+    """
+    removes every cached query result
+    """
+    for path in CACHE_DIR.glob("*.parquet"):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+def version(table, fields=None, where=None, distinct=False):
+    """
+    returns a stamp of the cached result of a select query, the time the query
+    ran, or None if it is not cached; call it after select() to identify the
+    result select() returned
+    """
+    try:
+        return _cache_path(query_key(table, fields, where, distinct)).stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def select(table, fields=None, where=None, distinct=False, ttl=QUERY_TTL) -> pd.DataFrame:
+    """
+    pc.select() with results cached on disk, fetched over the pooled
+    connections in src.db
+
+    Arguments:
+        table - PowerCampus table name
+        fields - list of fields to select
+        where - SQL where clause
+        distinct - select distinct rows
+        ttl - datetime.timedelta a cached result is used for before it is fetched again
+    """
+    path = _cache_path(query_key(table, fields, where, distinct))
+
+    with src.profiling.timed('query_cache', table) as record:
+        df = _read(path, ttl)
+        record['cache'] = 'miss' if df is None else 'hit'
+        if df is None:
+            df = src.db.select(table, fields=fields, where=where, distinct=distinct)
+            if write_parquet(path, df):
+                evict()
+        record.update(src.profiling.frame_stats(df))
+    return df
@@ -0,0 +1,176 @@
+"""Row filters written once, applied in the SQL of a pull or to a DataFrame
+
+A page lists the rows it keeps as conditions, e.g.
+
+    keep = [
+        src.query_spec.not_startswith('EVENT_ID', 'REG'),
+        src.query_spec.not_in('EVENT_SUB_TYPE', ['ACE', 'ADV', 'CELL', 'STAB']),
+    ]
+
+where() adds them to the SQL where clause of src.db.select(),
+src.query_cache.select() or src.partitions.select(), so the rows a page drops
+are never sent over the network or built into a DataFrame. apply() keeps the
+same rows of a DataFrame already in memory, e.g. a shared fact table from
+src.course_facts that other pages filter differently.
+
+Both give the same rows: missing values fail the positive conditions (eq,
+isin, startswith, contains) and pass the negated ones (ne, not_in,
+not_startswith, not_contains), as they do in pandas. SQL Server compares
+strings without regard to case or trailing spaces, so conditions are meant for
+the upper-case code columns of PowerCampus.
+"""
+import pandas as pd
+
+
+class Condition:
+    """A condition on one column, as a SQL where clause and a pandas mask
+
+    Arguments:
+        column - column name
+        sql - SQL where clause
+        mask - function of a DataFrame returning a boolean Series
+    """
+
+    def __init__(self, column, sql, mask):
+        self.column = column
+        self.sql = sql
+        self.mask = mask
+
+    def __repr__(self):
+        return f"Condition({self.sql!r})"
+
+
+def _literal(value) -> str:
+    """
+    returns value as a SQL literal
+    """
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return repr(value)
+    raise TypeError(f"no SQL literal for {value!r}")
+
+
+def _like(column, text, anywhere=False, negate=False) -> str:
+    """
+    returns a LIKE (or NOT LIKE) clause matching values that start with text,
+    or that contain it if anywhere; the wildcard characters '%', '_' and '['
+    in text match only themselves
+    """
+    escaped = text
+    for char in ['\\', '%', '_', '[']:
+        escaped = escaped.replace(char, '\\' + char)
+    like = ('%' if anywhere else '') + escaped + '%'
+    op = "not like" if negate else "like"
+    return f"{column} {op} {_literal(like)} escape '\\'"
+
+
+def _or_null(column, sql) -> str:
+    return f"({sql} or {column} is null)"
+
+
+def eq(column, value) -> Condition:
+    """
+    returns the condition column == value
+    """
+    return Condition(column, f"{column}={_literal(value)}",
+        lambda df: df[column].eq(value).fillna(False).astype(bool))
+
+
+def ne(column, value) -> Condition:
+    """
+    returns the condition column != value; missing values pass
+    """
+    return Condition(column, _or_null(column, f"{column}<>{_literal(value)}"),
+        lambda df: ~df[column].eq(value).fillna(False).astype(bool))
+
+
+def isin(column, values) -> Condition:
+    """
+    returns the condition column.isin(values)
+    """
+    values = list(values)
+    sql = f"{column} in ({', '.join(_literal(v) for v in values)})" if values else "1=0"
+    return Condition(column, sql, lambda df: df[column].isin(values))
+
+
+def not_in(column, values) -> Condition:
+    """
+    returns the condition ~column.isin(values); missing values pass
+    """
+    values = list(values)
+    sql = _or_null(column, f"{column} not in ({', '.join(_literal(v) for v in values)})") if values else "1=1"
+    return Condition(column, sql, lambda df: ~df[column].isin(values))
+
+
+def startswith(column, prefix) -> Condition:
+    """
+    returns the condition column.str.startswith(prefix)
+    """
+    return Condition(column, _like(column, prefix),
+        lambda df: df[column].str.startswith(prefix, na=False).astype(bool))
+
+
+def not_startswith(column, prefix) -> Condition:
+    """
+    returns the condition ~column.str.startswith(prefix); missing values pass
+    """
+    return Condition(column, _or_null(column, _like(column, prefix, negate=True)),
+        lambda df: ~df[column].str.startswith(prefix, na=False).astype(bool))
+
+
+def contains(column, text) -> Condition:
+    """
+    returns the condition column.str.contains(text), text matched literally
+    """
+    return Condition(column, _like(column, text, anywhere=True),
+        lambda df: df[column].str.contains(text, regex=False, na=False).astype(bool))
+
+
+def not_contains(column, text) -> Condition:
+    """
+    returns the condition ~column.str.contains(text), text matched literally;
+    missing values pass
+    """
+    return Condition(column, _or_null(column, _like(column, text, anywhere=True, negate=True)),
+        lambda df: ~df[column].str.contains(text, regex=False, na=False).astype(bool))
+
+
+def where(sql, conditions) -> str:
+    """
+    returns the SQL where clause sql with conditions added
+
+    Arguments:
+        sql - SQL where clause, or None
+        conditions - list of Condition
+    """
+    clauses = [f"({sql})"] if sql and sql.strip() else []
+    clauses += [c.sql for c in conditions]
+    return " and ".join(clauses)
+
+
+def mask(df, conditions) -> pd.Series:
+    """
+    returns a boolean Series, True for the rows of df that meet every
+    condition
+
+    Arguments:
+        df - DataFrame with the condition columns
+        conditions - list of Condition
+    """
+    keep = pd.Series(True, index=df.index)
+    for c in conditions:
+        keep &= c.mask(df)
+    return keep
+
+
+def apply(df, conditions) -> pd.DataFrame:
+    """
+    returns the rows of df that meet every condition, the rows where() would
+    have kept in SQL
+
+    Arguments:
+        df - DataFrame with the condition columns
+        conditions - list of Condition
+    """
+    return df.loc[mask(df, conditions)]
@@ -0,0 +1,100 @@
+"""Room-conflict detection for course meetings"""
+import numpy as np
+import pandas as pd
+
+
+def _seconds(values) -> np.ndarray:
+    """
+    returns datetimes (or dates) as float seconds, NaN where missing
+    """
+    ts = pd.to_datetime(pd.Series(values), errors='coerce')
+    seconds = ts.to_numpy(dtype='datetime64[s]').astype('int64').astype(float)
+    seconds[ts.isna().to_numpy()] = np.nan
+    return seconds
+
+
+def overlapping_pairs(group, start, end):
+    """
+    returns index arrays (i, j), i < j in sorted order, of the rows in the same
+    group whose [start, end] ranges overlap (end points included)
+
+    Rows are sorted by group and start, and each row is compared only with the
+    rows of its group that start before it ends, so the work is
+    O(n log n + overlaps) rather than every pair in a group.
+
+    Arguments:
+        group - integer group codes
+        start, end - float range ends, no missing values
+    """
+    order = np.lexsort((start, group))
+    g = group[order]
+    s = start[order] - start.min()
+    e = end[order] - start.min()
+
+    # one sorted key across all groups: each group gets its own band of values
+    band = max(s.max(), e.max()) + 1
+    key = g * band + s
+    hi = np.searchsorted(key, g * band + e, side='right')
+
+    n = len(order)
+    counts = np.maximum(hi - np.arange(n) - 1, 0)
+    i = np.repeat(np.arange(n), counts)
+    # j runs i+1, i+2, ... for each i
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    j = i + 1 + offsets
+
+    # a row that starts before row i but ends before row i starts is not an overlap
+    keep = e[j] >= s[i]
+    return order[i[keep]], order[j[keep]]
+
+
+def room_conflicts(meetings, by=['building_room_day'], course_col='course_id',
+        start_time='START_TIME', end_time='END_TIME',
+        start_date='START_DATE', end_date='END_DATE') -> pd.DataFrame:
+    """
+    returns every pair of meetings of different courses in the same `by` group
+    whose dates and times both overlap (end points included)
+
+    Each conflict is listed both ways round. The by columns appear once and every
+    other meetings column appears twice, with '_1' and '_2' suffixes. Meetings
+    with a missing by value, time or date are never in conflict.
+
+    Arguments:
+        meetings - DataFrame with one row per course meeting
+        by - list of columns identifying a room and day, e.g. add
+            ACADEMIC_YEAR and ACADEMIC_TERM to check several terms at once
+        course_col - column identifying the course section
+    """
+    by = list(by)
+    meetings = meetings.reset_index(drop=True)
+    other_cols = [c for c in meetings.columns if c not in by]
+
+    t0, t1 = _seconds(meetings[start_time]), _seconds(meetings[end_time])
+    d0, d1 = _seconds(meetings[start_date]), _seconds(meetings[end_date])
+    valid = (meetings[by].notna().all(axis=1).to_numpy() &
+                ~np.isnan(t0) & ~np.isnan(t1) & ~np.isnan(d0) & ~np.isnan(d1))
+    rows = np.flatnonzero(valid)
+
+    empty = pd.DataFrame(columns=by + [f"{c}_1" for c in other_cols] + [f"{c}_2" for c in other_cols])
+    if len(rows) < 2:
+        return empty
+
+    group = meetings.loc[rows, by].groupby(by, sort=False).ngroup().to_numpy()
+    i, j = overlapping_pairs(group, t0[rows], t1[rows])
+    i, j = rows[i], rows[j]
+
+    courses = meetings[course_col].to_numpy()
+    keep = (d1[i] >= d0[j]) & (d1[j] >= d0[i]) & (courses[i] != courses[j])
+    i, j = i[keep], j[keep]
+    # list each conflict both ways round
+    i, j = np.concatenate([i, j]), np.concatenate([j, i])
+    if len(i) == 0:
+        return empty
+
+    left = meetings.iloc[i].reset_index(drop=True)
+    right = meetings.iloc[j].reset_index(drop=True)
+    return pd.concat([
+        left[by],
+        left[other_cols].add_suffix('_1'),
+        right[other_cols].add_suffix('_2'),
+    ], axis='columns')
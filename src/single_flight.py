@@ -0,0 +1,98 @@
+"""Single-flight coalescing of concurrent identical computations
+
+While a computation for a key is running, other callers with the same key wait
+for its result instead of starting their own, so sessions that miss a cache at
+the same moment send one query to SQL Server rather than one each.
+"""
+import threading
+import pandas as pd
+
+
+class _Call:
+    """One in-flight computation"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one computation
+
+    Arguments:
+        name - name reported by metrics()
+        copy - function applied to the result for each caller when the result
+            is shared, so callers can modify what they get, e.g.
+            lambda df: df.copy(); None to share the result itself
+    """
+
+    def __init__(self, name, copy=None):
+        self.name = name
+        self.copy = copy
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+        self.max_waiters = 0
+        _flights.append(self)
+
+    def do(self, key, func):
+        """
+        returns func(), or the result of the call already running for key
+
+        An exception raised by func is raised in every caller waiting on it.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                self.max_waiters = max(self.max_waiters, call.waiters)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return self.copy(call.result) if self.copy else call.result
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                shared = call.waiters > 0
+            call.done.set()
+        # waiters copy call.result, so the leader must not get it to modify
+        return self.copy(call.result) if (shared and self.copy) else call.result
+
+    def in_flight(self) -> int:
+        """
+        returns the number of keys being computed now
+        """
+        with self._lock:
+            return len(self._calls)
+
+
+_flights = []
+
+
+def metrics() -> pd.DataFrame:
+    """
+    returns one row per SingleFlight in the process: computations run
+    (executions), callers that waited on another's computation instead
+    (coalesced), the most callers that waited on one computation
+    (max_waiters), and keys being computed now (in_flight)
+    """
+    return pd.DataFrame(
+        [[f.name, f.executions, f.coalesced, f.max_waiters, f.in_flight()] for f in _flights],
+        columns=['name', 'executions', 'coalesced', 'max_waiters', 'in_flight'],
+    )
@@ -0,0 +1,196 @@
+"""Academic term information shared by the dashboard pages"""
+import datetime as dt
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# PowerCampus utilities
+import powercampus as pc
+
+# how long the current term is trusted before PowerCampus is asked again
+CURRENT_TERM_TTL = dt.timedelta(hours=1)
+
+# how long the ACADEMICCALENDAR term index is kept before it is rebuilt
+TERM_INDEX_TTL = dt.timedelta(hours=12)
+
+# earliest year any page offers in its year/term selectors
+TERM_INDEX_START_YEAR = '2000'
+
+TERMS = ['FALL', 'SPRING', 'SUMMER']
+
+# terms that fall in the first calendar year of an academic year
+FALL_TERMS = ['FALL', '10-WEEK_1', '10-WEEK_2']
+
+# yearterm_sort suffix for each term; any other term sorts first as '00'
+TERM_SORT = {'SPRING': '01', 'SUMMER': '02', 'FALL': '03'}
+
+
+@dataclass(frozen=True)
+class TermContext:
+    """Current year/term values used by the pages"""
+    term: str
+    year: str
+    yearterm: str
+    yearterm_sort: str
+    ay: str
+    ay_label: str
+
+
+def academic_year(year, term):
+    """
+    returns the academic year (as the year it starts in) for a given year and term
+    """
+    return year if term.upper() in FALL_TERMS else str(int(year) - 1)
+
+
+def _factorize(values):
+    """
+    returns the codes and unique values of a column, with missing values as a
+    unique value of their own
+    """
+    codes, uniques = pd.factorize(pd.Series(values), use_na_sentinel=False)
+    return codes, np.asarray(uniques, dtype=object)
+
+
+def _on_uniques(func, uniques):
+    return np.array([None if pd.isna(u) else func(u) for u in uniques], dtype=object)
+
+
+def add_col_yearterm(df, year_col='ACADEMIC_YEAR', term_col='ACADEMIC_TERM'):
+    """
+    adds a 'yearterm' column, e.g. '2024.Fall', to df
+
+    Each distinct year and term is formatted once, so this is cheap on
+    transcript-sized frames.
+    """
+    year_codes, years = _factorize(df[year_col])
+    term_codes, terms = _factorize(df[term_col])
+    df['yearterm'] = years[year_codes] + '.' + _on_uniques(str.title, terms)[term_codes]
+    return df
+
+
+def add_col_yearterm_sort(df, year_col='ACADEMIC_YEAR', term_col='ACADEMIC_TERM'):
+    """
+    adds a 'yearterm_sort' column, e.g. '202403' for 2024 FALL, to df
+    """
+    year_codes, years = _factorize(df[year_col])
+    term_codes, terms = _factorize(df[term_col])
+    suffixes = _on_uniques(lambda t: TERM_SORT.get(t.upper(), '00'), terms)
+    df['yearterm_sort'] = years[year_codes] + suffixes[term_codes]
+    return df
+
+
+def add_col_ay(df, year_col='ACADEMIC_YEAR', term_col='ACADEMIC_TERM'):
+    """
+    adds the academic year columns 'ay' (e.g. '2024') and 'ay_label'
+    (e.g. '2024-2025') to df, as academic_year() does for a single year and term
+    """
+    year_codes, years = _factorize(df[year_col])
+    term_codes, terms = _factorize(df[term_col])
+    is_fall = _on_uniques(lambda t: t.upper() in FALL_TERMS, terms)[term_codes].astype(bool)
+
+    fall_ay = years
+    spring_ay = _on_uniques(lambda y: str(int(y) - 1), years)
+    fall_label = _on_uniques(lambda y: f"{y}-{int(y) + 1}", years)
+    spring_label = _on_uniques(lambda y: f"{int(y) - 1}-{y}", years)
+
+    df['ay'] = np.where(is_fall, fall_ay[year_codes], spring_ay[year_codes])
+    df['ay_label'] = np.where(is_fall, fall_label[year_codes], spring_label[year_codes])
+    return df
+
+
+@st.cache_resource(ttl=CURRENT_TERM_TTL)
+def current_term() -> TermContext:
+    """
+    returns the current term context, shared by every session in the process
+    and refreshed after CURRENT_TERM_TTL so a term rollover is picked up
+    without restarting the app
+    """
+    current_yt_df = pc.current_yearterm()
+    term = current_yt_df['term'].iloc[0]
+    year = current_yt_df['year'].iloc[0]
+    ay = academic_year(year, term)
+
+    return TermContext(
+        term=term,
+        year=year,
+        yearterm=current_yt_df['yearterm'].iloc[0],
+        yearterm_sort=current_yt_df['yearterm_sort'].iloc[0],
+        ay=ay,
+        ay_label=f"{ay}-{int(ay) + 1}",
+    )
+
+
+@st.cache_resource(ttl=TERM_INDEX_TTL)
+def term_index() -> pd.DataFrame:
+    """
+    returns one row per FALL/SPRING/SUMMER term from ACADEMICCALENDAR, indexed by
+    yearterm and ordered by yearterm_sort, with the term's start/end dates and
+    academic year
+
+    The frame is shared by every session in the process, so treat it as read-only.
+    """
+    calendar = pc.select("ACADEMICCALENDAR",
+        fields=['ACADEMIC_YEAR', 'ACADEMIC_TERM', 'ACADEMIC_SESSION', 
+            'START_DATE', 'END_DATE', 'FINAL_END_DATE' ], 
+        where=f"ACADEMIC_YEAR>='{TERM_INDEX_START_YEAR}' AND ACADEMIC_TERM IN {tuple(TERMS)}", 
+        distinct=True
+        )
+    calendar = pc.add_col_yearterm(calendar)
+    calendar = pc.add_col_yearterm_sort(calendar)
+    term_df = ( calendar.groupby(['yearterm_sort', 'yearterm'])
+                    .agg(
+                        ACADEMIC_YEAR=('ACADEMIC_YEAR', 'first'),
+                        ACADEMIC_TERM=('ACADEMIC_TERM', 'first'),
+                        START_DATE=('START_DATE', 'min'),
+                        END_DATE=('END_DATE', 'max'),
+                        FINAL_END_DATE=('FINAL_END_DATE', 'max'),
+                    )
+                    .reset_index()
+                    .sort_values(['yearterm_sort'], ascending=True)
+                    .set_index('yearterm')
+    )
+    term_df = add_col_ay(term_df)
+
+    return term_df
+
+
+def select_terms(year_start=None, year_end=None, terms=TERMS) -> pd.DataFrame:
+    """
+    returns the term_index() rows for years year_start to year_end (inclusive)
+    and the given terms
+    """
+    term_df = term_index()
+    # rows are in yearterm_sort order, so ACADEMIC_YEAR is sorted and a year
+    # range is a contiguous slice
+    year_values = term_df['ACADEMIC_YEAR'].to_numpy()
+    lo = 0 if year_start is None else year_values.searchsorted(str(year_start), side='left')
+    hi = len(year_values) if year_end is None else year_values.searchsorted(str(year_end), side='right')
+    term_df = term_df.iloc[lo:hi]
+    if set(terms) != set(TERMS):
+        term_df = term_df.loc[term_df['ACADEMIC_TERM'].isin(terms)]
+    return term_df
+
+
+def years(year_start=None, year_end=None, terms=TERMS) -> list:
+    """
+    returns the academic years for a year select_slider/selectbox, oldest first
+    """
+    return select_terms(year_start, year_end, terms)['ACADEMIC_YEAR'].unique().tolist()
+
+
+def yearterms(year_start=None, year_end=None, terms=TERMS, ascending=True) -> list:
+    """
+    returns the yearterms for a term selectbox, in yearterm_sort order
+    """
+    yearterm_list = select_terms(year_start, year_end, terms).index.tolist()
+    return yearterm_list if ascending else yearterm_list[::-1]
+
+
+def year_term(yearterm):
+    """
+    returns the ACADEMIC_YEAR and ACADEMIC_TERM of a yearterm, e.g. '2024.Fall'
+    """
+    row = term_index().loc[yearterm]
+    return row['ACADEMIC_YEAR'], row['ACADEMIC_TERM']
@@ -0,0 +1,49 @@
+"""Per-student trajectories over a wide one-column-per-term table"""
+import numpy as np
+import pandas as pd
+
+
+def trajectories(wide) -> pd.DataFrame:
+    """
+    returns, for each row of wide, computed over its non-missing values:
+        num_terms - number of values
+        mean_diff - mean change between consecutive values, i.e.
+            (last - first) / (num_terms - 1)
+        slope - change per term from the first value to the last
+        trend - least-squares slope of value against term
+    NaN where a row has fewer than two values.
+
+    Arguments:
+        wide - DataFrame with one column per term, in term order (e.g. term1,
+            term2, ...), and missing values where a student has no value
+    """
+    values = wide.to_numpy(dtype=float)
+    mask = ~np.isnan(values)
+    n_rows, n_cols = values.shape
+    rows = np.arange(n_rows)
+    x = np.arange(n_cols, dtype=float)
+
+    n = mask.sum(axis=1)
+    first_pos = mask.argmax(axis=1)
+    last_pos = n_cols - 1 - mask[:, ::-1].argmax(axis=1)
+    first = values[rows, first_pos]
+    last = values[rows, last_pos]
+
+    v = np.where(mask, values, 0.0)
+    xm = np.where(mask, x, 0.0)
+    sx, sy = xm.sum(axis=1), v.sum(axis=1)
+    sxx, sxy = (xm * xm).sum(axis=1), (xm * v).sum(axis=1)
+    denom = n * sxx - sx * sx
+
+    two_or_more = n >= 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_diff = np.where(two_or_more, (last - first) / (n - 1), np.nan)
+        slope = np.where(two_or_more, (last - first) / (last_pos - first_pos), np.nan)
+        trend = np.where(two_or_more, (n * sxy - sx * sy) / denom, np.nan)
+
+    return pd.DataFrame({
+        'num_terms': n,
+        'mean_diff': mean_diff,
+        'slope': slope,
+        'trend': trend,
+        }, index=wide.index)
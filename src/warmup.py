@@ -0,0 +1,116 @@
+"""Warm-up of the heaviest page caches
+
+start() runs warm() in a background thread of the server process when the app
+starts, and again every day at WARMUP_TIME, after the nightly PowerCampus
+refresh, so the first page view of the day is served from warm caches.
+
+Running this module (python -m src.warmup), e.g. from the scheduled task after
+the refresh, fills the on-disk caches (term partitions, enrollment facts) that
+a server started afterwards reads instead of PowerCampus.
+"""
+import datetime as dt
+import logging
+import threading
+import time
+import streamlit as st
+
+# PowerCampus utilities
+import powercampus as pc
+
+import src.course_facts
+import src.partitions
+import src.pages
+
+# the nightly PowerCampus refresh is finished by this time
+WARMUP_TIME = dt.time(hour=5, minute=30)
+
+logger = logging.getLogger(__name__)
+
+
+def _class_times():
+    page = src.pages.load_page('registrar_class_times')
+    page.class_df(page.start_year, src.course_facts.data_version(page.start_year, page.CLASS_TIMES_TABLES))
+
+
+def _program_review():
+    page = src.pages.load_page('program_review_course_enrollment')
+    start_year = pc.START_ACADEMIC_YEAR
+    page.course_df(start_year, src.course_facts.data_version(start_year, page.PROGRAM_REVIEW_TABLES))
+
+
+def _department_enrollment():
+    page = src.pages.load_page('academic_department_enrollment')
+    page.academic_df(page.start_year, src.course_facts.data_version(page.start_year, page.DEPARTMENT_TABLES))
+
+
+def _program_graduates():
+    page = src.pages.load_page('academic_program_graduates')
+    page.grads_df(page.start_date, src.partitions.table_stamp("TRANSCRIPTDEGREE"))
+
+
+# (name, function) run in order by warm(); each function builds the cache its
+# page reads, with the same arguments the page passes; the caches are keyed by
+# data-version stamps, so the nightly refresh is picked up without clearing them
+WARMUP_TASKS = [
+    ('registrar_class_times.class_df', _class_times),
+    ('program_review_course_enrollment.course_df', _program_review),
+    ('academic_department_enrollment.academic_df', _department_enrollment),
+    ('academic_program_graduates.grads_df', _program_graduates),
+]
+
+
+def warm() -> dict:
+    """
+    returns {task name: seconds taken, or None if it failed} after running
+    every WARMUP_TASKS function
+
+    A failing task is logged and skipped, so the others still run.
+    """
+    timings = {}
+    for name, task in WARMUP_TASKS:
+        started = time.perf_counter()
+        try:
+            task()
+        except Exception:
+            logger.exception("warm-up %s failed", name)
+            timings[name] = None
+            continue
+        timings[name] = time.perf_counter() - started
+        logger.info("warm-up %s: %.1fs", name, timings[name])
+    return timings
+
+
+def seconds_until(at, now=None) -> float:
+    """
+    returns the seconds from now until the next time of day at
+    """
+    now = now or dt.datetime.now()
+    next_run = dt.datetime.combine(now.date(), at)
+    if next_run <= now:
+        next_run += dt.timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+
+def _run():
+    warm()
+    while True:
+        time.sleep(seconds_until(WARMUP_TIME))
+        warm()
+
+
+@st.cache_resource
+def start() -> threading.Thread:
+    """
+    returns the warm-up thread, started on the first call in the process
+    """
+    thread = threading.Thread(target=_run, name="cache-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    # fill the on-disk caches ahead of the first page view; failures are
+    # logged to stderr as they happen
+    logging.basicConfig(level=logging.WARNING)
+    for name, seconds in warm().items():
+        print(f"warm-up {name}: " + ("failed" if seconds is None else f"{seconds:.1f}s"))
@@ -0,0 +1,64 @@
+"""composite_key() identifies rows as the old concatenated string keys did"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.keys
+
+
+def _sections(n, seed):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'EVENT_ID': rng.choice(['ENG 101', 'MAT 201', 'BIO 110', 'CHE 120', None], n),
+        'EVENT_SUB_TYPE': rng.choice(['LEC', 'LAB', 'SI', None], n),
+        'SECTION': rng.choice(['01', '02', 'ON1', None], n),
+        'PEOPLE_CODE_ID': rng.choice([f"P{i:09d}" for i in range(200)], n),
+    })
+    return df
+
+
+def _string_key(df, columns):
+    """
+    the old key: the columns concatenated, missing where any part is
+    """
+    key = df[columns[0]]
+    for col in columns[1:]:
+        key = key + "|" + df[col]
+    return key
+
+
+@pytest.mark.parametrize('categorical', [False, True])
+@pytest.mark.parametrize('seed', range(3))
+def test_composite_key_matches_string_key(seed, categorical):
+    df = _sections(2000, seed)
+    if categorical:
+        df = src.keys.categorize(df)
+    columns = ['EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION']
+    key = src.keys.composite_key(df, columns)
+    old = _string_key(df.astype(object), columns)
+
+    # missing exactly where a part is missing, so count() agrees
+    assert key.isna().tolist() == old.isna().tolist()
+    assert key.count() == old.count()
+    # equal exactly when the parts are equal
+    pairs = pd.DataFrame({'key': key, 'old': old}).dropna().drop_duplicates()
+    assert pairs['key'].is_unique and pairs['old'].is_unique
+    assert key.nunique() == old.nunique()
+
+
+def test_composite_key_of_composite_key():
+    df = _sections(2000, 0)
+    df['section_id'] = src.keys.composite_key(df, ['EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION'])
+    key = src.keys.composite_key(df, ['PEOPLE_CODE_ID', 'section_id'])
+    old = _string_key(df, ['PEOPLE_CODE_ID', 'EVENT_ID', 'EVENT_SUB_TYPE', 'SECTION'])
+    assert key.isna().tolist() == old.isna().tolist()
+    assert key.nunique() == old.nunique()
+
+
+def test_composite_key_unique_without_overflow():
+    # enough distinct values per column to renumber the key part-way
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({f"c{i}": rng.integers(0, 50_000, 5000) for i in range(6)})
+    key = src.keys.composite_key(df, list(df.columns))
+    assert key.dtype == 'Int64'
+    assert key.nunique() == len(df.drop_duplicates())
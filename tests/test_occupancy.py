@@ -0,0 +1,62 @@
+"""occupancy() gives the counts of the old per-sample-time cross join"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.occupancy
+
+
+def _meetings(n, seed):
+    rng = np.random.default_rng(seed)
+    # five-minute starts from 04:00 to 23:00, so many fall on bin edges and
+    # some before DAY_START or after DAY_END
+    start = src.occupancy.SAMPLE_DAY + pd.to_timedelta(rng.integers(4 * 12, 23 * 12, n) * 5, unit='min')
+    end = start + pd.to_timedelta(rng.choice([0, 15, 50, 75, 90, 170], n), unit='min')
+    df = pd.DataFrame({
+        'PEOPLE_CODE_ID': rng.choice([f"P{i:03d}" for i in range(n // 4)] + [None], n),
+        'DAY': rng.choice(['M', 'T', 'W', None], n),
+        'yearterm': rng.choice(['2024.Fall', '2025.Spring'], n),
+        'START_TIME': start,
+        'END_TIME': end,
+    })
+    df.loc[rng.random(n) < 0.03, 'END_TIME'] = pd.NaT
+    return df
+
+
+def _cross_join_counts(meetings, entity, by, bin_minutes):
+    """
+    counts of the old cross join of meetings with every sample time
+    """
+    bins = src.occupancy.time_bins(bin_minutes)
+    sample_time = pd.DataFrame({'t': bins, 'time': bins.strftime('%H:%M')})
+    df = meetings.merge(sample_time, how='cross')
+    df = df.loc[(df['t'] >= df['START_TIME']) & (df['t'] <= df['END_TIME'])]
+    return ( df.drop_duplicates([entity] + by + ['time'])
+            .groupby(by + ['time'])[entity].count()
+            .reset_index(name='count')
+    )
+
+
+@pytest.mark.parametrize('bin_minutes', src.occupancy.BIN_MINUTES)
+@pytest.mark.parametrize('by', [['DAY'], ['yearterm', 'DAY']])
+@pytest.mark.parametrize('seed', range(3))
+def test_occupancy_matches_cross_join(seed, by, bin_minutes):
+    meetings = _meetings(400, seed)
+    result = src.occupancy.occupancy(meetings, 'PEOPLE_CODE_ID', by, bin_minutes=bin_minutes)
+    expected = _cross_join_counts(meetings, 'PEOPLE_CODE_ID', by, bin_minutes)
+    pd.testing.assert_frame_equal(result.reset_index(drop=True), expected, check_dtype=False)
+
+
+def test_bin_edges_and_day_limits():
+    day = src.occupancy.SAMPLE_DAY
+    meetings = pd.DataFrame({
+        'PEOPLE_CODE_ID': ['A', 'B', 'C', 'D'],
+        'DAY': ['M'] * 4,
+        # ends on an edge, starts on an edge, before DAY_START, after DAY_END
+        'START_TIME': [day + pd.Timedelta('09:05:00'), day + pd.Timedelta('09:15:00'),
+            day + pd.Timedelta('05:00:00'), day + pd.Timedelta('22:01:00')],
+        'END_TIME': [day + pd.Timedelta('09:15:00'), day + pd.Timedelta('09:29:00'),
+            day + pd.Timedelta('05:59:00'), day + pd.Timedelta('23:00:00')],
+    })
+    result = src.occupancy.occupancy(meetings, 'PEOPLE_CODE_ID', ['DAY'])
+    assert result[['time', 'count']].values.tolist() == [['09:15', 2]]
@@ -0,0 +1,77 @@
+"""where() and apply() of src.query_spec keep the same rows"""
+import sqlite3
+import pandas as pd
+import pytest
+
+import src.query_spec as qs
+
+ROWS = pd.DataFrame({
+    'id': range(14),
+    'EVENT_ID': ['REG 100', 'ENG 101', 'A%B', 'A_B', 'AXB', "O'BRIEN", 'A[B]', '%',
+        None, '_', 'REG%', '', 'A\\B', 'AB'],
+    'EVENT_SUB_TYPE': ['LEC', 'ACE', None, 'G', 'LAB', "O'", 'LEC', 'ADV',
+        'LEC', None, 'STAB', '', 'G', 'ON'],
+    'CREDITS': [3, 0, None, 4, 3, 1, 2, None, 3, 0, 1, 2, 3, 4],
+})
+
+CONDITIONS = [
+    qs.eq('EVENT_ID', "O'BRIEN"),
+    qs.eq('CREDITS', 3),
+    qs.ne('EVENT_SUB_TYPE', 'G'),
+    qs.ne('CREDITS', 0),
+    qs.isin('EVENT_SUB_TYPE', ['LEC', "O'"]),
+    qs.isin('EVENT_SUB_TYPE', []),
+    qs.not_in('EVENT_SUB_TYPE', ['ACE', 'ADV', 'CELL', 'STAB']),
+    qs.not_in('EVENT_SUB_TYPE', []),
+    qs.startswith('EVENT_ID', 'REG'),
+    qs.startswith('EVENT_ID', 'A%'),
+    qs.startswith('EVENT_ID', 'A_'),
+    qs.startswith('EVENT_ID', 'A['),
+    qs.startswith('EVENT_ID', 'A\\'),
+    qs.startswith('EVENT_ID', "O'"),
+    qs.not_startswith('EVENT_ID', 'REG'),
+    qs.not_startswith('EVENT_ID', '%'),
+    qs.contains('EVENT_ID', '%'),
+    qs.contains('EVENT_ID', '_'),
+    qs.contains('EVENT_ID', '['),
+    qs.contains('EVENT_ID', "'"),
+    qs.contains('EVENT_SUB_TYPE', 'ON'),
+    qs.not_contains('EVENT_ID', '%'),
+    qs.not_contains('EVENT_ID', '_'),
+    qs.not_contains('EVENT_SUB_TYPE', 'ON'),
+]
+
+
+@pytest.fixture(scope='module')
+def conn():
+    conn = sqlite3.connect(':memory:')
+    ROWS.to_sql('SECTIONS', conn, index=False)
+    yield conn
+    conn.close()
+
+
+def _sql_ids(conn, conditions):
+    sql = f"SELECT id FROM SECTIONS WHERE {qs.where('1=1', conditions)}"
+    return sorted(r[0] for r in conn.execute(sql))
+
+
+@pytest.mark.parametrize('dtype', [object, 'string'])
+@pytest.mark.parametrize('condition', CONDITIONS, ids=lambda c: c.sql)
+def test_condition(conn, condition, dtype):
+    df = ROWS.astype({'EVENT_ID': dtype, 'EVENT_SUB_TYPE': dtype})
+    assert _sql_ids(conn, [condition]) == sorted(qs.apply(df, [condition])['id'])
+
+
+def test_conditions_combined(conn):
+    conditions = [
+        qs.not_startswith('EVENT_ID', 'REG'),
+        qs.not_in('EVENT_SUB_TYPE', ['ACE', 'ADV', 'CELL', 'STAB']),
+        qs.ne('EVENT_SUB_TYPE', 'G'),
+        qs.not_contains('EVENT_ID', '%'),
+    ]
+    assert _sql_ids(conn, conditions) == sorted(qs.apply(ROWS, conditions)['id'])
+
+
+def test_where_without_conditions():
+    assert qs.where("ADDS>0", []) == "(ADDS>0)"
+    assert qs.where(None, []) == ""
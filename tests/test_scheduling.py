@@ -0,0 +1,68 @@
+"""room_conflicts() finds the pairs the old self-merge of meetings found"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.scheduling
+
+
+def _meetings(n, seed):
+    rng = np.random.default_rng(seed)
+    day = pd.Timestamp('1900-01-01')
+    start = day + pd.to_timedelta(rng.integers(8 * 12, 20 * 12, n) * 5, unit='min')
+    end = start + pd.to_timedelta(rng.choice([50, 75, 110, 170], n), unit='min')
+    term = pd.Timestamp('2024-09-01') + pd.to_timedelta(rng.integers(0, 60, n), unit='D')
+    df = pd.DataFrame({
+        'meeting': range(n),
+        'course_id': rng.integers(0, n // 2, n),
+        'building_room_day': rng.choice(['A 101 M', 'A 101 T', 'B 2 M', 'C 7 W', None], n),
+        'START_TIME': start,
+        'END_TIME': end,
+        'START_DATE': term,
+        'END_DATE': term + pd.to_timedelta(rng.integers(0, 120, n), unit='D'),
+    })
+    # some meetings without a time or dates
+    for col in ['START_TIME', 'END_DATE']:
+        df.loc[rng.random(n) < 0.03, col] = pd.NaT
+    return df
+
+
+def _merge_pairs(meetings):
+    """
+    pairs of the old outer self-merge, without meetings missing a room-day
+    key, time or date, which room_conflicts() never pairs
+    """
+    m = meetings.dropna(subset=['building_room_day', 'START_TIME', 'END_TIME', 'START_DATE', 'END_DATE'])
+    c = m.merge(m, how='outer', on='building_room_day', suffixes=('_1', '_2'))
+    c = c.loc[(c['course_id_1'] != c['course_id_2']) &
+        (c['END_DATE_1'] >= c['START_DATE_2']) & (c['END_DATE_2'] >= c['START_DATE_1']) &
+        (c['END_TIME_1'] >= c['START_TIME_2']) & (c['END_TIME_2'] >= c['START_TIME_1'])]
+    return sorted(zip(c['meeting_1'], c['meeting_2']))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_room_conflicts_match_merge(seed):
+    meetings = _meetings(600, seed)
+    c = src.scheduling.room_conflicts(meetings)
+    assert sorted(zip(c['meeting_1'], c['meeting_2'])) == _merge_pairs(meetings)
+
+
+def test_missing_room_key_never_conflicts():
+    meetings = _meetings(300, 0)
+    meetings['building_room_day'] = None
+    assert src.scheduling.room_conflicts(meetings).empty
+
+
+def test_conflicts_listed_both_ways_with_end_points_included():
+    meetings = pd.DataFrame({
+        'meeting': [0, 1, 2],
+        'course_id': [10, 11, 10],
+        'building_room_day': ['A 101 M'] * 3,
+        'START_TIME': pd.to_datetime(['1900-01-01 09:00', '1900-01-01 10:00', '1900-01-01 10:00']),
+        'END_TIME': pd.to_datetime(['1900-01-01 10:00', '1900-01-01 11:00', '1900-01-01 11:00']),
+        'START_DATE': pd.to_datetime(['2024-09-01'] * 3),
+        'END_DATE': pd.to_datetime(['2024-12-15'] * 3),
+    })
+    c = src.scheduling.room_conflicts(meetings)
+    # 0 and 2 are the same course
+    assert sorted(zip(c['meeting_1'], c['meeting_2'])) == [(0, 1), (1, 0), (1, 2), (2, 1)]
@@ -0,0 +1,51 @@
+"""trajectories() gives the values of the old row-wise computation"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.trajectory
+
+
+def _wide(n_students, n_terms, seed):
+    rng = np.random.default_rng(seed)
+    gpa = pd.DataFrame(rng.uniform(0.0, 4.0, (n_students, n_terms)).round(2),
+        columns=[f"term{i + 1}" for i in range(n_terms)])
+    # gaps, students with a single term and students with none
+    gpa = gpa.mask(rng.random(gpa.shape) < 0.3)
+    single = rng.random(n_students) < 0.1
+    gpa.loc[single, gpa.columns[1:]] = np.nan
+    gpa.iloc[:3] = np.nan
+    return gpa
+
+
+def _row_wise(row):
+    """
+    the old row-wise values: diff().mean() over the non-missing values, and
+    the first-to-last and least-squares slopes against the term position
+    """
+    values = row.dropna()
+    pos = np.array([row.index.get_loc(c) for c in values.index], dtype=float)
+    if len(values) < 2:
+        return pd.Series({'num_terms': len(values), 'mean_diff': np.nan, 'slope': np.nan, 'trend': np.nan})
+    return pd.Series({
+        'num_terms': len(values),
+        'mean_diff': pd.Series(values.values).diff().mean(),
+        'slope': (values.iloc[-1] - values.iloc[0]) / (pos[-1] - pos[0]),
+        'trend': np.polyfit(pos, values.to_numpy(), 1)[0],
+    })
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_trajectories_match_row_wise(seed):
+    wide = _wide(500, 12, seed)
+    result = src.trajectory.trajectories(wide)
+    expected = wide.apply(_row_wise, axis=1)
+    expected['num_terms'] = expected['num_terms'].astype(int)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, atol=1e-9)
+
+
+def test_single_term_and_empty_rows_are_nan():
+    wide = pd.DataFrame({'term1': [3.0, np.nan], 'term2': [np.nan, np.nan], 'term3': [np.nan, np.nan]})
+    result = src.trajectory.trajectories(wide)
+    assert result['num_terms'].tolist() == [1, 0]
+    assert result[['mean_diff', 'slope', 'trend']].isna().all().all()